@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Load test for /transcribe and /translate
+Replays synthetic speech and silence chunks the way liveTranscription.ts does:
+every stream uploads a 2 second chunk per cadence tick, translates non-empty
+text, and drops ticks that arrive while its previous chunk is still in flight
+
+Examples:
+    python loadtest.py --stub --streams 4 --chunks 10 --json results.json
+    python loadtest.py --whisper-url https://localhost:9000 --translation-url https://localhost:9001 --insecure
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import platform
+import argparse
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+import urllib3
+
+from synthetic_audio import FORMATS, encode, silence_clip, speech_clip
+
+STUB_SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stub_server.py')
+
+
+def percentiles(values):
+    if not values:
+        return {'count': 0}
+    values = np.asarray(values) * 1000
+    return {
+        'count': len(values),
+        'mean_ms': round(float(values.mean()), 1),
+        'p50_ms': round(float(np.percentile(values, 50)), 1),
+        'p95_ms': round(float(np.percentile(values, 95)), 1),
+        'p99_ms': round(float(np.percentile(values, 99)), 1),
+        'max_ms': round(float(values.max()), 1),
+    }
+
+
+def peak_rss_mb(pid):
+    """High-water resident set size of a local process in MB"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_stub_server(service, stub_args, ready_path, timeout=120):
+    """Launch stub_server.py in a subprocess and wait until it reports ready"""
+    port = free_port()
+    process = subprocess.Popen([sys.executable, STUB_SERVER, service, '--port', str(port), *stub_args],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Stub {service} server exited with code {process.returncode}")
+        try:
+            if requests.get(url + ready_path, timeout=1).status_code == 200:
+                return process, url
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"Stub {service} server did not become ready within {timeout}s")
+
+
+def build_chunks(args):
+    """Pre-encode one distinct clip per (stream, chunk) so the result cache never short-circuits a request"""
+    formats = args.formats.split(',')
+    rng = np.random.default_rng(args.seed)
+    chunks = {}
+    for stream in range(args.streams):
+        fmt = formats[stream % len(formats)]
+        for index in range(args.chunks):
+            seed = args.seed * 100000 + stream * 1000 + index
+            is_speech = rng.random() < args.speech_ratio
+            audio = speech_clip(args.chunk_seconds, seed) if is_speech else silence_clip(args.chunk_seconds, seed)
+            chunks[stream, index] = (fmt, is_speech, encode(audio, fmt))
+    return chunks
+
+
+class Recorder:
+    """Thread-safe collection of per-request measurements"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.transcribe = []
+        self.transcribe_by_format = {}
+        self.translate = []
+        self.rtf = []
+        self.audio_seconds = 0.0
+        self.errors = {}
+        self.dropped = 0
+        self.no_speech = 0
+        self.sent = 0
+
+    def add(self, attribute, value):
+        with self._lock:
+            getattr(self, attribute).append(value)
+
+    def count(self, attribute, amount=1):
+        with self._lock:
+            setattr(self, attribute, getattr(self, attribute) + amount)
+
+    def add_transcribe(self, fmt, elapsed, audio_seconds):
+        with self._lock:
+            self.transcribe.append(elapsed)
+            self.transcribe_by_format.setdefault(fmt, []).append(elapsed)
+            self.rtf.append(elapsed / audio_seconds)
+            self.audio_seconds += audio_seconds
+
+    def error(self, endpoint, reason):
+        with self._lock:
+            key = f"{endpoint}: {reason}"
+            self.errors[key] = self.errors.get(key, 0) + 1
+
+
+def run_stream(stream, args, chunks, whisper_url, translation_url, recorder, session):
+    """Send one stream's chunks on the cadence, dropping ticks missed while a chunk is in flight"""
+    cadence = args.cadence if args.cadence is not None else args.chunk_seconds
+    start = time.perf_counter() + (stream * cadence / max(args.streams, 1))  # stagger stream start
+    index = 0
+    while index < args.chunks:
+        scheduled = start + index * cadence
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+        fmt, _, data = chunks[stream, index]
+        recorder.count('sent')
+        request_start = time.perf_counter()
+        try:
+            response = session.post(
+                f'{whisper_url}/transcribe',
+                files={'audio': (f'audio.{fmt}', data, FORMATS[fmt][3])},
+                data={'language': args.language, 'mode': args.mode},
+                # Labels the stream in the service's logs; per-client admission limits key on the address
+                headers={'X-Client-Id': f'loadtest-{stream}'},
+                timeout=args.timeout
+            )
+            elapsed = time.perf_counter() - request_start
+            if response.status_code != 200:
+                recorder.error('transcribe', response.status_code)
+            else:
+                recorder.add_transcribe(fmt, elapsed, args.chunk_seconds)
+                text = response.json().get('text', '')
+                if not text.strip():
+                    recorder.count('no_speech')
+                elif translation_url:
+                    translate_start = time.perf_counter()
+                    response = session.post(f'{translation_url}/translate', json={
+                        'text': text, 'source_language': args.source_language, 'target_language': 'en'
+                    }, timeout=args.timeout)
+                    if response.status_code == 200:
+                        recorder.add('translate', time.perf_counter() - translate_start)
+                    else:
+                        recorder.error('translate', response.status_code)
+        except requests.RequestException as e:
+            recorder.error('transcribe', type(e).__name__)
+
+        # Like the browser client, chunks recorded while this one was processing are skipped
+        next_index = index + 1
+        while cadence > 0 and next_index < args.chunks and start + next_index * cadence < time.perf_counter():
+            next_index += 1
+        recorder.count('dropped', next_index - index - 1)
+        index = next_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stub', action='store_true', help='Start both services locally with stub models (offline, CPU only)')
+    parser.add_argument('--stub-rtf', default='0.05', help='Stub Whisper seconds of inference per audio second')
+    parser.add_argument('--stub-ms-per-token', default='2', help='Stub translation milliseconds per token')
+    parser.add_argument('--whisper-url', default=os.getenv('WHISPER_URL'))
+    parser.add_argument('--translation-url', default=os.getenv('TRANSLATION_URL'))
+    parser.add_argument('--no-translate', action='store_true', help='Only load /transcribe')
+    parser.add_argument('--insecure', action='store_true', help='Accept self-signed certificates')
+    parser.add_argument('--formats', default='webm,ogg,mp4,wav', help='Upload formats, assigned round-robin to streams')
+    parser.add_argument('--streams', type=int, default=4, help='Concurrent live recordings')
+    parser.add_argument('--chunks', type=int, default=10, help='Chunks per stream')
+    parser.add_argument('--chunk-seconds', type=float, default=2.0, help='Audio per chunk (liveTranscription.ts uses 2s)')
+    parser.add_argument('--cadence', type=float, help='Seconds between chunks per stream (default: chunk length, 0: back-to-back)')
+    parser.add_argument('--speech-ratio', type=float, default=0.8, help='Fraction of chunks containing speech')
+    parser.add_argument('--language', default='auto')
+    parser.add_argument('--source-language', default='gu')
+    parser.add_argument('--mode', default='fast', choices=['fast', 'accurate'])
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='Write results to this JSON file')
+    args = parser.parse_args()
+
+    servers = {}
+    try:
+        if args.stub:
+            servers['whisper'], args.whisper_url = start_stub_server(
+                'whisper', ['--stub-rtf', args.stub_rtf], '/health/ready')
+            if not args.no_translate:
+                servers['translation'], args.translation_url = start_stub_server(
+                    'translation', ['--stub-ms-per-token', args.stub_ms_per_token], '/health')
+        if not args.whisper_url:
+            parser.error('--whisper-url is required unless --stub is given')
+        translation_url = None if args.no_translate else args.translation_url
+
+        print(f"🔍 Encoding {args.streams * args.chunks} chunks ({args.formats})")
+        chunks = build_chunks(args)
+
+        session = requests.Session()
+        session.mount('http', requests.adapters.HTTPAdapter(pool_maxsize=max(args.streams, 10)))
+        if args.insecure:
+            session.verify = False
+            urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+        print(f"🚀 {args.streams} streams x {args.chunks} chunks against {args.whisper_url}")
+        recorder = Recorder()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.streams) as executor:
+            list(executor.map(
+                lambda stream: run_stream(stream, args, chunks, args.whisper_url, translation_url, recorder, session),
+                range(args.streams)
+            ))
+        elapsed = time.perf_counter() - start
+    finally:
+        rss = {name: peak_rss_mb(process.pid) for name, process in servers.items()}
+        for process in servers.values():
+            process.terminate()
+
+    results = {
+        'config': {key: value for key, value in vars(args).items() if key not in ('json',)},
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count()},
+        'elapsed_s': round(elapsed, 2),
+        'chunks_sent': recorder.sent,
+        'chunks_dropped': recorder.dropped,
+        'no_speech_responses': recorder.no_speech,
+        'errors': recorder.errors,
+        'throughput': {
+            'transcribe_requests_per_s': round(len(recorder.transcribe) / elapsed, 2),
+            'audio_seconds_per_s': round(recorder.audio_seconds / elapsed, 2),
+            'translate_requests_per_s': round(len(recorder.translate) / elapsed, 2),
+        },
+        'transcribe_latency': percentiles(recorder.transcribe),
+        'transcribe_latency_by_format': {fmt: percentiles(values) for fmt, values in recorder.transcribe_by_format.items()},
+        'translate_latency': percentiles(recorder.translate),
+        'real_time_factor': {
+            'p50': round(float(np.percentile(recorder.rtf, 50)), 3) if recorder.rtf else None,
+            'p95': round(float(np.percentile(recorder.rtf, 95)), 3) if recorder.rtf else None,
+        },
+        'peak_rss_mb': rss,
+    }
+
+    latency = results['transcribe_latency']
+    print(f"\n/transcribe  p50 {latency.get('p50_ms')} ms  p95 {latency.get('p95_ms')} ms  p99 {latency.get('p99_ms')} ms")
+    latency = results['translate_latency']
+    print(f"/translate   p50 {latency.get('p50_ms')} ms  p95 {latency.get('p95_ms')} ms  p99 {latency.get('p99_ms')} ms")
+    print(f"Throughput: {results['throughput']['audio_seconds_per_s']} audio s/s, "
+          f"RTF p50 {results['real_time_factor']['p50']}, dropped {recorder.dropped}, errors {sum(recorder.errors.values())}")
+    if rss:
+        print(f"Peak RSS: {rss}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✅ Results written to {args.json}")
+    return 1 if recorder.errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Run the Whisper or translation service with a stub model
+The real request path (upload parsing, decoding, VAD, caching, sentence
+splitting, serialization) runs unchanged; only model inference is replaced by
+a sleep proportional to the input, so benchmarks run offline on a CPU-only box
+
+Example:
+    python stub_server.py whisper --port 19000 --stub-rtf 0.05
+    python stub_server.py translation --port 19001 --stub-ms-per-token 2
+"""
+
+import os
+import sys
+import time
+import types
+import argparse
+import logging
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class StubWhisperModel:
+    """Stands in for faster_whisper.WhisperModel; sleeps rtf seconds per second of audio"""
+
+    def __init__(self, rtf):
+        self.rtf = rtf
+
+    def transcribe(self, audio, language=None, **kwargs):
+        from faster_whisper.transcribe import Segment
+
+        duration = len(audio) / 16000
+        time.sleep(duration * self.rtf)
+        segments = []
+        for i, start in enumerate(range(0, max(int(duration), 1), 2)):
+            end = min(start + 2.0, duration)
+            segments.append(Segment(
+                id=i, seek=0, start=float(start), end=end, text=f" stub segment {i}",
+                tokens=[], avg_logprob=-0.2, compression_ratio=1.2, no_speech_prob=0.01,
+                words=None, temperature=0.0
+            ))
+        info = types.SimpleNamespace(
+            language=language or 'gu', language_probability=0.95, duration=duration,
+            duration_after_vad=duration, all_language_probs=[(language or 'gu', 0.95)]
+        )
+        return iter(segments), info
+
+
+class StubTokenizer:
+    """Whitespace tokenizer with the parts of the MarianTokenizer API the service uses"""
+
+    def tokenize(self, text):
+        return text.split()
+
+    def __call__(self, texts, **kwargs):
+        return {'input_ids': [text.split() for text in texts]}
+
+
+class StubTranslationBackend:
+    """Stands in for the MarianMT backends; sleeps per input token and echoes the text"""
+
+    name = 'stub'
+
+    def __init__(self, ms_per_token):
+        self.ms_per_token = ms_per_token
+        self.tokenizer = StubTokenizer()
+
+    def translate(self, input_texts):
+        tokens = sum(len(text.split()) for text in input_texts)
+        time.sleep(tokens * self.ms_per_token / 1000)
+        return [text.split(' ', 1)[-1] for text in input_texts]
+
+    def info(self):
+        return {'backend': self.name, 'device': 'cpu', 'compute_type': 'none'}
+
+
+def serve_whisper(port, rtf):
+    sys.path.insert(0, os.path.join(REPO_ROOT, 'shared'))
+    sys.path.insert(0, os.path.join(REPO_ROOT, 'whisper-service'))
+    import app as whisper_app
+
+    whisper_app.create_whisper_model = lambda model_name: StubWhisperModel(rtf)
+    if not whisper_app.load_model():
+        return 1
+    whisper_app.app.run(host='127.0.0.1', port=port, threaded=True)
+    return 0
+
+
+def serve_translation(port, ms_per_token):
+    sys.path.insert(0, os.path.join(REPO_ROOT, 'shared'))
+    sys.path.insert(0, os.path.join(REPO_ROOT, 'translation-service'))
+    import translation_backends
+
+    # Replace the backend before app.py builds its TranslationService at import time
+    translation_backends.load_backend = lambda *args, **kwargs: StubTranslationBackend(ms_per_token)
+    import app as translation_app
+
+    translation_app.app.run(host='127.0.0.1', port=port, threaded=True)
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('service', choices=['whisper', 'translation'])
+    parser.add_argument('--port', type=int, required=True)
+    parser.add_argument('--stub-rtf', type=float, default=0.05, help='Stub Whisper seconds per audio second')
+    parser.add_argument('--stub-ms-per-token', type=float, default=2.0, help='Stub translation milliseconds per token')
+    args = parser.parse_args()
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    if args.service == 'whisper':
+        return serve_whisper(args.port, args.stub_rtf)
+    return serve_translation(args.port, args.stub_ms_per_token)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+Synthetic test audio for the benchmark harness
+Generates speech-like and silent clips deterministically and encodes them in
+the containers browsers upload (webm/opus, ogg/opus, mp4/aac, wav)
+"""
+
+import io
+
+import av
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+# (container, codec, sample rate, content type) per upload format
+FORMATS = {
+    'webm': ('webm', 'libopus', 48000, 'audio/webm;codecs=opus'),
+    'ogg': ('ogg', 'libopus', 48000, 'audio/ogg;codecs=opus'),
+    'mp4': ('mp4', 'aac', 44100, 'audio/mp4'),
+    'wav': ('wav', 'pcm_s16le', SAMPLE_RATE, 'audio/wav'),
+}
+
+# First three formants (Hz) of a few open and closed vowels
+VOWEL_FORMANTS = [
+    (730, 1090, 2440), (270, 2290, 3010), (300, 870, 2240),
+    (530, 1840, 2480), (570, 840, 2410), (440, 1020, 2240),
+]
+FORMANT_BANDWIDTHS = (80, 90, 120)
+
+
+def _resonator(signal, frequency, bandwidth):
+    """Second-order resonant filter used as a formant"""
+    r = np.exp(-np.pi * bandwidth / SAMPLE_RATE)
+    a1 = -2 * r * np.cos(2 * np.pi * frequency / SAMPLE_RATE)
+    a2 = r * r
+    gain = 1 - r
+    output = np.zeros_like(signal)
+    y1 = y2 = 0.0
+    for i, x in enumerate(signal):
+        y = gain * x - a1 * y1 - a2 * y2
+        output[i] = y
+        y2, y1 = y1, y
+    return output
+
+
+def speech_clip(seconds, seed=0, level=0.5):
+    """Formant-synthesized syllables with pitch jitter and consonant bursts; voice activity detectors treat it as speech"""
+    rng = np.random.default_rng(seed)
+    total = int(seconds * SAMPLE_RATE)
+    audio = np.zeros(total)
+    position = 0
+    while position < total:
+        length = int(rng.uniform(0.12, 0.28) * SAMPLE_RATE)
+        t = np.arange(length) / SAMPLE_RATE
+        pitch = rng.uniform(100, 180) * (1 + 0.05 * np.sin(2 * np.pi * rng.uniform(2, 5) * t))
+        source = (np.cumsum(pitch / SAMPLE_RATE) % 1.0) * 2 - 1 + rng.normal(0, 0.02, length)
+        formants = VOWEL_FORMANTS[rng.integers(len(VOWEL_FORMANTS))]
+        vowel = sum(_resonator(source, f, bw) for f, bw in zip(formants, FORMANT_BANDWIDTHS))
+        vowel *= np.sin(np.pi * np.arange(length) / length) ** 0.7
+
+        burst_length = int(0.04 * SAMPLE_RATE)
+        burst = rng.normal(0, 0.3, burst_length) * np.hanning(burst_length)
+        syllable = np.concatenate([burst, vowel])[:total - position]
+        audio[position:position + len(syllable)] += syllable
+        position += len(syllable) + int(rng.uniform(0.02, 0.08) * SAMPLE_RATE)
+
+    audio *= level / (np.max(np.abs(audio)) + 1e-9)
+    return audio.astype(np.float32)
+
+
+def silence_clip(seconds, seed=0, noise_db=-70):
+    """Near-silent room noise"""
+    rng = np.random.default_rng(seed)
+    return (rng.normal(0, 10 ** (noise_db / 20), int(seconds * SAMPLE_RATE))).astype(np.float32)
+
+
+def encode(audio, fmt):
+    """Encode a 16 kHz mono float32 clip into the given upload format and return the bytes"""
+    container_format, codec, rate, _ = FORMATS[fmt]
+    pcm = (np.clip(audio, -1, 1) * 32767).astype(np.int16)
+    frame = av.AudioFrame.from_ndarray(pcm.reshape(1, -1), format='s16', layout='mono')
+    frame.sample_rate = SAMPLE_RATE
+
+    buffer = io.BytesIO()
+    with av.open(buffer, 'w', format=container_format) as container:
+        stream = container.add_stream(codec, rate=rate, layout='mono')
+        stream.codec_context.open()
+        frame_size = stream.codec_context.frame_size or 1024
+        resampler = av.AudioResampler(format=stream.codec_context.format.name, layout='mono', rate=rate)
+        fifo = av.AudioFifo()
+        for resampled in resampler.resample(frame) + resampler.resample(None):
+            fifo.write(resampled)
+        while fifo.samples:
+            chunk = fifo.read(frame_size, partial=True)
+            container.mux(stream.encode(chunk))
+        container.mux(stream.encode(None))
+    return buffer.getvalue()
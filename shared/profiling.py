@@ -0,0 +1,272 @@
+"""
+On-demand request profiling shared by the Whisper and translation services
+Requests carrying X-Profile (or a PROFILE_SAMPLE_RATE share of all requests) run
+under cProfile or a stack sampler; profiles are written to PROFILE_DIR as .prof
+or collapsed-stack .folded files and summarized by the /admin/profiles endpoints;
+both service images copy this module next to their app.py
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import hmac
+import uuid
+import pstats
+import random
+import cProfile
+import logging
+import threading
+import functools
+from collections import Counter
+
+from flask import Blueprint, abort, jsonify, make_response, request, send_file
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.getenv('PROFILE_DIR', '/app/models/profiles')
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN', '')  # required in X-Profile and by /admin/profiles; empty disables both
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))  # share of requests profiled without a header
+PROFILE_MODE = os.getenv('PROFILE_MODE', 'cprofile')  # 'cprofile' (.prof) or 'stacks' (.folded)
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', '5'))
+PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', '200'))
+SUMMARY_TOP = 25
+
+PROFILE_MODES = {'cprofile': '.prof', 'stacks': '.folded'}
+PROFILE_ID_PATTERN = re.compile(r'^[0-9]{8}T[0-9]{6}-[a-z_]+-[0-9a-f]{8}$')
+
+
+def profile_request_mode():
+    """Profiling mode for the current request, or None; a header check and at most one random draw"""
+    header = request.headers.get('X-Profile')
+    if header is not None and PROFILE_TOKEN:
+        token, _, mode = header.partition(':')
+        if token_matches(token):
+            return mode if mode in PROFILE_MODES else PROFILE_MODE
+    if PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+        return PROFILE_MODE
+    return None
+
+
+def token_matches(token):
+    """Constant-time comparison with PROFILE_TOKEN, so response timing does not reveal it"""
+    return bool(PROFILE_TOKEN) and hmac.compare_digest(token.encode(), PROFILE_TOKEN.encode())
+
+
+def frame_name(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Samples one thread's Python stack on a timer and counts collapsed stacks"""
+
+    def __init__(self, thread_id, interval_seconds):
+        self.thread_id = thread_id
+        self.interval_seconds = interval_seconds
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(frame_name(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+def prune_profiles(directory=PROFILE_DIR, max_files=PROFILE_MAX_FILES):
+    """Delete the oldest profiles beyond max_files"""
+    try:
+        metas = sorted(name for name in os.listdir(directory) if name.endswith('.json'))
+    except OSError:
+        return
+    for name in metas[:max(0, len(metas) - max_files)]:
+        profile_id = name[:-5]
+        for suffix in ('.json', *PROFILE_MODES.values()):
+            try:
+                os.remove(os.path.join(directory, profile_id + suffix))
+            except OSError:
+                pass
+
+
+def save_profile(mode, data, meta):
+    """Write a cProfile.Profile or a stack Counter with its metadata JSON; returns the profile id"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    endpoint = re.sub(r'[^a-z_]', '_', (meta.get('endpoint') or 'unknown').lower())
+    profile_id = f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-{endpoint}-{uuid.uuid4().hex[:8]}"
+    path = os.path.join(PROFILE_DIR, profile_id + PROFILE_MODES[mode])
+    if mode == 'cprofile':
+        data.dump_stats(path)
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in data.most_common():
+                f.write(f"{stack} {count}\n")
+    with open(os.path.join(PROFILE_DIR, profile_id + '.json'), 'w', encoding='utf-8') as f:
+        json.dump(dict(meta, id=profile_id, mode=mode, file=os.path.basename(path)), f)
+    prune_profiles()
+    return profile_id
+
+
+def profiled(view):
+    """Profile a view when the request asks for it or is sampled; otherwise call it directly"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        mode = profile_request_mode()
+        if mode is None:
+            return view(*args, **kwargs)
+
+        meta = {
+            'endpoint': request.endpoint,
+            'path': request.path,
+            'created_at': time.time(),
+            'trigger': 'header' if 'X-Profile' in request.headers else 'sampled'
+        }
+        started = time.perf_counter()
+        if mode == 'cprofile':
+            profiler = cProfile.Profile()
+            profiler.enable()
+        else:
+            profiler = StackSampler(threading.get_ident(), PROFILE_SAMPLE_INTERVAL_MS / 1000)
+            profiler.start()
+
+        def finish():
+            if mode == 'cprofile':
+                profiler.disable()
+                data = profiler
+            else:
+                profiler.stop()
+                data = profiler.stacks
+            duration_ms = (time.perf_counter() - started) * 1000
+            try:
+                profile_id = save_profile(mode, data, dict(meta, duration_ms=round(duration_ms, 1)))
+                logger.info(f"Saved {mode} profile {profile_id} of {meta['path']} ({duration_ms:.0f}ms)")
+            except Exception as e:
+                logger.warning(f"Could not save profile of {meta['path']}: {e}")
+
+        try:
+            response = make_response(view(*args, **kwargs))
+        except BaseException:
+            finish()
+            raise
+        # Streamed bodies do their work while the server iterates them on this thread
+        if response.is_streamed:
+            response.call_on_close(finish)
+        else:
+            finish()
+        return response
+    return wrapper
+
+
+def summarize_cprofile(path, top=SUMMARY_TOP):
+    """Hottest functions of a .prof file by self and cumulative time"""
+    stats = pstats.Stats(path)
+    total = stats.total_tt or 1e-9
+    rows = [{
+        'function': f"{name} ({os.path.basename(filename)}:{line})",
+        'calls': calls,
+        'self_ms': round(self_time * 1000, 2),
+        'cumulative_ms': round(cumulative * 1000, 2),
+        'self_percent': round(self_time / total * 100, 1)
+    } for (filename, line, name), (_, calls, self_time, cumulative, _) in stats.stats.items()]
+    return {
+        'total_ms': round(stats.total_tt * 1000, 1),
+        'by_self_time': sorted(rows, key=lambda row: row['self_ms'], reverse=True)[:top],
+        'by_cumulative_time': sorted(rows, key=lambda row: row['cumulative_ms'], reverse=True)[:top]
+    }
+
+
+def summarize_folded(path, top=SUMMARY_TOP):
+    """Flamegraph view of a .folded file: hottest stacks, leaf frames and inclusive frames"""
+    stacks = Counter()
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            stack, _, count = line.rstrip('\n').rpartition(' ')
+            if stack:
+                stacks[stack] += int(count)
+    total = sum(stacks.values()) or 1
+    leaves, inclusive = Counter(), Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(';')
+        leaves[frames[-1]] += count
+        for frame in set(frames):
+            inclusive[frame] += count
+
+    def ranked(counter):
+        return [{'frame': frame, 'samples': count, 'percent': round(count / total * 100, 1)}
+                for frame, count in counter.most_common(top)]
+
+    return {
+        'samples': sum(stacks.values()),
+        'interval_ms': PROFILE_SAMPLE_INTERVAL_MS,
+        'hottest_stacks': [{'stack': stack.split(';'), 'samples': count, 'percent': round(count / total * 100, 1)}
+                           for stack, count in stacks.most_common(10)],
+        'by_self_samples': ranked(leaves),
+        'by_inclusive_samples': ranked(inclusive)
+    }
+
+
+profiles_blueprint = Blueprint('profiles', __name__, url_prefix='/admin/profiles')
+
+
+@profiles_blueprint.before_request
+def require_profile_token():
+    if not token_matches(request.headers.get('X-Profile-Token', '')):
+        abort(404)
+
+
+def read_meta(profile_id):
+    """Metadata of a saved profile, or None for an unknown or malformed id"""
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    try:
+        with open(os.path.join(PROFILE_DIR, profile_id + '.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_meta(profile_id):
+    meta = read_meta(profile_id)
+    if meta is None:
+        abort(404)
+    return meta
+
+
+@profiles_blueprint.route('', methods=['GET'])
+def list_profiles():
+    """Saved profiles, newest first"""
+    try:
+        names = [name for name in os.listdir(PROFILE_DIR) if name.endswith('.json')]
+    except OSError:
+        names = []
+    # Profiles pruned since listdir() are skipped
+    profiles = [meta for meta in (read_meta(name[:-5]) for name in names) if meta is not None]
+    return jsonify({'profiles': sorted(profiles, key=lambda meta: meta['created_at'], reverse=True)})
+
+
+@profiles_blueprint.route('/<profile_id>', methods=['GET'])
+def profile_summary(profile_id):
+    """Metadata and a flamegraph summary of one profile"""
+    meta = load_meta(profile_id)
+    path = os.path.join(PROFILE_DIR, meta['file'])
+    summary = summarize_cprofile(path) if meta['mode'] == 'cprofile' else summarize_folded(path)
+    return jsonify(dict(meta, summary=summary))
+
+
+@profiles_blueprint.route('/<profile_id>/raw', methods=['GET'])
+def profile_raw(profile_id):
+    """The profile file itself, for snakeviz (.prof) or flamegraph.pl / speedscope (.folded)"""
+    meta = load_meta(profile_id)
+    return send_file(os.path.join(PROFILE_DIR, meta['file']), as_attachment=True, download_name=meta['file'])
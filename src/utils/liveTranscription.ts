@@ -11,6 +11,21 @@ export interface LiveTranscriptionResult {
   isFinal: boolean;
 }
 
+interface PipelineText {
+  text: string;
+  segments: Array<{ id: number; start: number; end: number; text: string }>;
+  error?: string;
+}
+
+interface PipelineResponse {
+  language: string;
+  language_probability: number | null;
+  transcript: PipelineText;
+  whisper_translation: PipelineText | null;
+  marian_translation: PipelineText | null;
+  model: string;
+}
+
 export interface LiveTranscriptionConfig {
   sourceLanguage: string;
   targetLanguage: string;
@@ -36,6 +51,8 @@ export class LiveTranscriptionService {
   private audioChunks: AudioChunk[] = [];
   private isProcessing: boolean = false;
   private sequenceCounter: number = 0;
+  // Lets the Whisper service pin the detected language across this recording's chunks
+  private sessionId: string = LiveTranscriptionService.createSessionId();
   private results: LiveTranscriptionResult[] = [];
   private onResultCallback?: (result: LiveTranscriptionResult) => void;
   private onErrorCallback?: (error: Error) => void;
@@ -233,8 +250,9 @@ export class LiveTranscriptionService {
     try {
       console.log('🎤 Processing real audio blob:', audioBlob.size, 'bytes');
       
-      // Step 1: Transcribe audio to text
-      const originalText = await this.transcribeAudio(audioBlob);
+      // Transcription and translation run server-side in a single /pipeline request
+      const result = await this.transcribeAudio(audioBlob);
+      const originalText = result.transcript?.text || '';
       
       if (!originalText || originalText.trim().length === 0) {
         console.log('⚠️ No speech detected in audio chunk');
@@ -243,33 +261,17 @@ export class LiveTranscriptionService {
 
       console.log('📝 Transcribed text:', originalText);
 
-      // Step 2: Check if translation is needed
-      // If the text is already in English, skip translation
-      const isEnglish = this.isEnglishText(originalText);
-      let translatedText = originalText;
-      
-      if (!isEnglish) {
-        // Only translate if not English and translation service is available
-        try {
-          translatedText = await this.translateText(
-            originalText, 
-            this.config.sourceLanguage, 
-            this.config.targetLanguage
-          );
-          console.log('🔄 Translated text:', translatedText);
-        } catch (error) {
-          console.log('⚠️ Translation failed, using original text:', error);
-          translatedText = originalText;
-        }
-      } else {
-        console.log('✅ Text is already in English, skipping translation');
+      if (result.marian_translation?.error) {
+        console.log('⚠️ Translation failed, using Whisper translation:', result.marian_translation.error);
       }
+      const translatedText = result.marian_translation?.text || result.whisper_translation?.text || originalText;
+      console.log('🔄 Translated text:', translatedText);
 
       return {
         text: translatedText,
         originalText: originalText,
-        language: isEnglish ? 'en' : this.config.sourceLanguage,
-        confidence: 0.85,
+        language: result.language || this.config.sourceLanguage,
+        confidence: result.language_probability ?? 0.85,
         timestamp: Date.now(),
         isPartial: false,
         isFinal: true
@@ -295,9 +297,9 @@ export class LiveTranscriptionService {
   }
 
   /**
-   * Transcribe audio using Whisper model
+   * Transcribe and translate audio with the Whisper service's /pipeline endpoint
    */
-  private async transcribeAudio(audioBlob: Blob): Promise<string> {
+  private async transcribeAudio(audioBlob: Blob): Promise<PipelineResponse> {
     // Validate audio blob before processing
     if (!audioBlob || audioBlob.size === 0) {
       throw new Error('Invalid audio blob: empty or null');
@@ -347,14 +349,22 @@ export class LiveTranscriptionService {
     
     formData.append('audio', typedBlob, filename);
     formData.append('language', 'auto');
+    formData.append('target_language', this.config.targetLanguage);
+    // Whisper's own translation is only needed when MarianMT fails
+    formData.append('whisper_translation', 'fallback');
 
     console.log(`🎤 Sending audio to Whisper: ${filename}, size: ${audioBlob.size} bytes, type: ${contentType}`);
     console.log(`🎤 Original blob type: ${audioBlob.type}`);
     console.log(`🎤 FormData contents:`, Array.from(formData.entries()));
 
-    const response = await fetch(`${this.whisperEndpoint}/transcribe`, {
+    const response = await fetch(`${this.whisperEndpoint}/pipeline`, {
       method: 'POST',
       body: formData,
+      // A chunk that is still queued after two more have been recorded is no longer useful
+      headers: {
+        'X-Deadline-Ms': String(this.config.chunkDuration * 2),
+        'X-Session-Id': this.sessionId
+      },
       // Allow self-signed certificates for development
       // @ts-ignore
       rejectUnauthorized: false
@@ -368,53 +378,9 @@ export class LiveTranscriptionService {
 
     const data = await response.json();
     console.log(`📝 Whisper response:`, data);
-    return data.text || '';
-  }
-
-  /**
-   * Check if text is in English (simple heuristic)
-   */
-  private isEnglishText(text: string): boolean {
-    // Simple heuristic: if text contains mostly Latin characters and common English words
-    const englishWords = ['the', 'and', 'is', 'are', 'was', 'were', 'have', 'has', 'had', 'will', 'would', 'could', 'should', 'can', 'may', 'might', 'must', 'shall', 'do', 'does', 'did', 'be', 'been', 'being', 'a', 'an', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'from', 'up', 'about', 'into', 'through', 'during', 'before', 'after', 'above', 'below', 'between', 'among', 'under', 'over', 'around', 'near', 'far', 'here', 'there', 'where', 'when', 'why', 'how', 'what', 'who', 'which', 'this', 'that', 'these', 'those', 'i', 'you', 'he', 'she', 'it', 'we', 'they', 'me', 'him', 'her', 'us', 'them', 'my', 'your', 'his', 'her', 'its', 'our', 'their'];
-    
-    const words = text.toLowerCase().split(/\s+/);
-    const englishWordCount = words.filter(word => englishWords.includes(word)).length;
-    const totalWords = words.length;
-    
-    // If more than 30% of words are English words, consider it English
-    return totalWords > 0 && (englishWordCount / totalWords) > 0.3;
-  }
-
-  /**
-   * Translate text using local translation model
-   */
-  private async translateText(text: string, sourceLang: string, targetLang: string): Promise<string> {
-    const response = await fetch(`${this.translationEndpoint}/translate`, {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
-      body: JSON.stringify({
-        text: text,
-        source_language: sourceLang,
-        target_language: targetLang,
-        model: 'opus-mt-mul-en'
-      }),
-      // Allow self-signed certificates for development
-      // @ts-ignore
-      rejectUnauthorized: false
-    });
-
-    if (!response.ok) {
-      throw new Error(`Translation API error: ${response.status}`);
-    }
-
-    const data = await response.json();
-    return data.translated_text || text;
+    return data;
   }
 
-
   /**
    * Update transcription configuration
    */
@@ -444,6 +410,13 @@ export class LiveTranscriptionService {
     this.results = [];
     this.audioChunks = [];
     this.sequenceCounter = 0;
+    this.sessionId = LiveTranscriptionService.createSessionId();
+  }
+
+  private static createSessionId(): string {
+    return typeof crypto !== 'undefined' && crypto.randomUUID
+      ? crypto.randomUUID()
+      : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
   }
 
   /**
@@ -97,17 +97,14 @@ export class MultilingualTranscriptionService {
     }
 
     try {
-      // Step 1: Transcribe Gujarati audio to Gujarati text using Whisper
-      const gujaratiText = await this.transcribeAudio(audioBlob, 'gu');
-      
-      // Step 2: Translate Gujarati text to English
-      const englishText = await this.translateText(gujaratiText, 'gu', 'en');
+      // Transcription and translation run server-side in a single /pipeline request
+      const result = await this.transcribeAndTranslate(audioBlob, 'gu', 'en');
 
       return {
-        originalText: gujaratiText,
-        translatedText: englishText,
-        language: 'gu',
-        confidence: 0.85,
+        originalText: result.originalText,
+        translatedText: result.translatedText,
+        language: result.language,
+        confidence: result.confidence,
         timestamp: Date.now()
       };
     } catch (error) {
@@ -117,14 +114,21 @@ export class MultilingualTranscriptionService {
   }
 
   /**
-   * Transcribe audio using Whisper model
+   * Transcribe audio and translate it with MarianMT in one Whisper /pipeline request
    */
-  private async transcribeAudio(audioBlob: Blob, language: string): Promise<string> {
+  private async transcribeAndTranslate(
+    audioBlob: Blob,
+    language: string,
+    targetLanguage: string
+  ): Promise<{ originalText: string; translatedText: string; language: string; confidence: number }> {
     const formData = new FormData();
     formData.append('audio', audioBlob, 'audio.wav');
     formData.append('language', language);
+    formData.append('target_language', targetLanguage);
+    // Whisper's own translation is only needed when MarianMT fails
+    formData.append('whisper_translation', 'fallback');
 
-    const response = await fetch(`${this.whisperEndpoint}/transcribe`, {
+    const response = await fetch(`${this.whisperEndpoint}/pipeline`, {
       method: 'POST',
       body: formData,
     });
@@ -135,32 +139,13 @@ export class MultilingualTranscriptionService {
     }
 
     const data = await response.json();
-    return data.text || '';
-  }
-
-  /**
-   * Translate text using local translation model
-   */
-  private async translateText(text: string, sourceLang: string, targetLang: string): Promise<string> {
-    const response = await fetch(`${this.translationEndpoint}/translate`, {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
-      body: JSON.stringify({
-        text: text,
-        source_language: sourceLang,
-        target_language: targetLang,
-        model: this.config.translationModel
-      }),
-    });
-
-    if (!response.ok) {
-      throw new Error(`Translation API error: ${response.status}`);
-    }
-
-    const data = await response.json();
-    return data.translated_text || text;
+    const originalText = data.transcript?.text || '';
+    return {
+      originalText,
+      translatedText: data.marian_translation?.text || data.whisper_translation?.text || originalText,
+      language: data.language || language,
+      confidence: data.language_probability ?? 0.85
+    };
   }
 
   /**
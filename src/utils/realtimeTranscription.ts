@@ -1,5 +1,5 @@
 // Real-time Transcription Service
-// Connects to the Python real-time transcription service
+// Connects to the streaming session API of the Whisper service
 
 export interface RealtimeTranscriptionConfig {
   endpoint: string;
@@ -11,6 +11,10 @@ export interface TranscriptionResult {
   text: string;
   timestamp: number;
   confidence: number;
+  type?: 'partial' | 'final' | 'end';
+  start?: number;
+  end?: number;
+  language?: string;
 }
 
 export class RealtimeTranscriptionService {
@@ -19,11 +23,13 @@ export class RealtimeTranscriptionService {
   private isRecording: boolean = false;
   private eventSource: EventSource | null = null;
   private reconnectAttempts: number = 0;
+  private sessionId: string | null = null;
+  private stoppedTranscriptions: TranscriptionResult[] = [];
   private transcriptionCallback: ((result: TranscriptionResult) => void) | null = null;
 
   constructor(config: Partial<RealtimeTranscriptionConfig> = {}) {
     this.config = {
-      endpoint: config.endpoint || 'http://127.0.0.1:9002',
+      endpoint: config.endpoint || 'https://localhost:443/api/whisper',
       reconnectInterval: config.reconnectInterval || 5000,
       maxReconnectAttempts: config.maxReconnectAttempts || 5,
       ...config
@@ -55,7 +61,7 @@ export class RealtimeTranscriptionService {
   /**
    * Start real-time transcription
    */
-  async startTranscription(): Promise<void> {
+  async startTranscription(language: string = 'auto', mode: 'fast' | 'accurate' = 'fast'): Promise<void> {
     if (!this.isInitialized) {
       throw new Error('Real-time Transcription Service not initialized');
     }
@@ -71,7 +77,8 @@ export class RealtimeTranscriptionService {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json'
-        }
+        },
+        body: JSON.stringify({ language, mode })
       });
 
       if (!response.ok) {
@@ -81,6 +88,7 @@ export class RealtimeTranscriptionService {
 
       const result = await response.json();
       console.log('Transcription started:', result);
+      this.sessionId = result.session_id;
 
       // Start listening to the SSE stream
       this.startEventStream();
@@ -112,7 +120,8 @@ export class RealtimeTranscriptionService {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json'
-        }
+        },
+        body: JSON.stringify({ session_id: this.sessionId })
       });
 
       if (!response.ok) {
@@ -123,6 +132,9 @@ export class RealtimeTranscriptionService {
       const result = await response.json();
       console.log('Transcription stopped:', result);
       this.isRecording = false;
+      this.sessionId = null;
+      // The server drops the session on stop, so keep its final segments locally
+      this.stoppedTranscriptions = result.transcriptions || [];
 
     } catch (error) {
       console.error('Error stopping transcription:', error);
@@ -131,6 +143,29 @@ export class RealtimeTranscriptionService {
     }
   }
 
+  /**
+   * Send an audio frame (e.g. a MediaRecorder chunk) to the active session
+   */
+  async sendAudio(audioBlob: Blob): Promise<void> {
+    if (!this.isRecording || !this.sessionId) {
+      throw new Error('No transcription session in progress');
+    }
+
+    const formData = new FormData();
+    formData.append('audio', audioBlob, 'frame.webm');
+    formData.append('session_id', this.sessionId);
+
+    const response = await fetch(`${this.config.endpoint}/audio`, {
+      method: 'POST',
+      body: formData
+    });
+
+    if (!response.ok) {
+      const errorData = await response.json().catch(() => ({}));
+      throw new Error(`Failed to send audio: ${errorData.error || response.status}`);
+    }
+  }
+
   /**
    * Get all transcriptions
    */
@@ -139,10 +174,14 @@ export class RealtimeTranscriptionService {
       throw new Error('Real-time Transcription Service not initialized');
     }
 
+    if (!this.sessionId) {
+      return this.stoppedTranscriptions.filter(t => !sinceTimestamp || t.timestamp > sinceTimestamp);
+    }
+
     try {
       const url = sinceTimestamp 
-        ? `${this.config.endpoint}/transcriptions?since=${sinceTimestamp}`
-        : `${this.config.endpoint}/transcriptions`;
+        ? `${this.config.endpoint}/transcriptions?session_id=${this.sessionId}&since=${sinceTimestamp}`
+        : `${this.config.endpoint}/transcriptions?session_id=${this.sessionId}`;
       
       const response = await fetch(url);
       if (!response.ok) {
@@ -168,7 +207,7 @@ export class RealtimeTranscriptionService {
     }
 
     try {
-      const response = await fetch(`${this.config.endpoint}/latest`);
+      const response = await fetch(`${this.config.endpoint}/latest?session_id=${this.sessionId}`);
       if (!response.ok) {
         return null;
       }
@@ -195,7 +234,8 @@ export class RealtimeTranscriptionService {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json'
-        }
+        },
+        body: JSON.stringify({ session_id: this.sessionId })
       });
 
       if (!response.ok) {
@@ -226,7 +266,7 @@ export class RealtimeTranscriptionService {
       this.eventSource.close();
     }
 
-    this.eventSource = new EventSource(`${this.config.endpoint}/stream`);
+    this.eventSource = new EventSource(`${this.config.endpoint}/stream?session_id=${this.sessionId}`);
     
     this.eventSource.onmessage = (event) => {
       try {
@@ -287,6 +327,7 @@ export class RealtimeTranscriptionService {
     return {
       initialized: this.isInitialized,
       recording: this.isRecording,
+      sessionId: this.sessionId,
       endpoint: this.config.endpoint
     };
   }
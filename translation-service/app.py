@@ -1,93 +1,253 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
-from transformers import MarianMTModel, MarianTokenizer
-import torch
 import logging
 import os
+import re
+import sys
+import time
+import atexit
+import signal
+import threading
+from translation_cache import TranslationCache
+from translation_backends import load_backend
+import metrics
+from profiling import profiled, profiles_blueprint, require_profile_token
 
 app = Flask(__name__)
 CORS(app)
+app.register_blueprint(profiles_blueprint)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Batched generation settings
+TRANSLATION_BATCH_SIZE = int(os.getenv('TRANSLATION_BATCH_SIZE', '16'))
+MAX_SEGMENT_TOKENS = int(os.getenv('MAX_SEGMENT_TOKENS', '256'))
+MAX_BATCH_TEXTS = int(os.getenv('MAX_BATCH_TEXTS', '256'))
+
+# Inference backend: 'transformers' (PyTorch fp32) or 'ctranslate2' (converted and quantized once under /app/models)
+TRANSLATION_BACKEND = os.getenv('TRANSLATION_BACKEND', 'transformers')
+CT2_COMPUTE_TYPE = os.getenv('CT2_COMPUTE_TYPE', 'int8')
+CT2_DEVICE = os.getenv('CT2_DEVICE', 'auto')
+CT2_INTER_THREADS = int(os.getenv('CT2_INTER_THREADS', '1'))
+CT2_INTRA_THREADS = int(os.getenv('CT2_INTRA_THREADS', '0'))  # 0 = CTranslate2 default
+
+# Translation cache settings (TRANSLATION_CACHE_ENTRIES=0 disables the cache)
+TRANSLATION_CACHE_ENTRIES = int(os.getenv('TRANSLATION_CACHE_ENTRIES', '10000'))
+TRANSLATION_CACHE_MAX_MB = float(os.getenv('TRANSLATION_CACHE_MAX_MB', '64'))
+TRANSLATION_CACHE_TTL = float(os.getenv('TRANSLATION_CACHE_TTL', '0'))  # seconds, 0 = never expire
+TRANSLATION_CACHE_FILE = os.getenv('TRANSLATION_CACHE_FILE', '')  # e.g. /app/models/translation_cache.jsonl
+TRANSLATION_CACHE_SAVE_SECONDS = float(os.getenv('TRANSLATION_CACHE_SAVE_SECONDS', '60'))  # 0 = only on shutdown
+
+# Sentence boundaries: Latin terminators, Devanagari/Gujarati danda, and line breaks
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?।॥])\s+|\n+')
+
 class TranslationService:
     def __init__(self):
-        self.models = {}
-        self.tokenizers = {}
+        self.backend = None
         self.model_name = os.getenv('MODEL_NAME', 'Helsinki-NLP/opus-mt-mul-en')
+        self.cache = TranslationCache(
+            max_entries=TRANSLATION_CACHE_ENTRIES,
+            max_bytes=int(TRANSLATION_CACHE_MAX_MB * 1024 * 1024),
+            ttl=TRANSLATION_CACHE_TTL,
+            path=TRANSLATION_CACHE_FILE or None
+        )
         self.load_models()
     
     def load_models(self):
         """Load translation models"""
         try:
-            logger.info(f"Loading model: {self.model_name}")
+            logger.info(f"Loading model: {self.model_name} ({TRANSLATION_BACKEND} backend)")
             logger.info("This may take several minutes on first run...")
             
-            # Set cache directories
-            cache_dir = "/app/models/transformers"
-            
-            self.tokenizers[self.model_name] = MarianTokenizer.from_pretrained(
+            start = time.perf_counter()
+            self.backend = load_backend(
+                TRANSLATION_BACKEND,
                 self.model_name,
-                cache_dir=cache_dir
-            )
-            self.models[self.model_name] = MarianMTModel.from_pretrained(
-                self.model_name,
-                cache_dir=cache_dir
+                compute_type=CT2_COMPUTE_TYPE,
+                device=CT2_DEVICE,
+                inter_threads=CT2_INTER_THREADS,
+                intra_threads=CT2_INTRA_THREADS
             )
             
-            logger.info("✅ Models loaded successfully")
+            metrics.MODEL_LOAD_SECONDS.labels(self.backend.name).set(time.perf_counter() - start)
+            logger.info(f"✅ Models loaded successfully ({self.backend.info()})")
         except Exception as e:
             logger.error(f"❌ Error loading models: {e}")
             raise e
     
-    def translate(self, text, source_lang="gu", target_lang="en"):
-        """Translate text from source to target language"""
+    @property
+    def cache_model_name(self):
+        """Model identity used in cache keys; quantized output can differ slightly from fp32"""
+        return f"{self.model_name}:{self.backend.name}"
+    
+    def split_sentences(self, text):
+        """Split text into sentences, breaking sentences longer than MAX_SEGMENT_TOKENS at word boundaries"""
+        tokenizer = self.backend.tokenizer
+        segments = []
+        for sentence in SENTENCE_BOUNDARY.split(text):
+            sentence = sentence.strip()
+            if not sentence:
+                continue
+            if len(tokenizer.tokenize(sentence)) <= MAX_SEGMENT_TOKENS:
+                segments.append(sentence)
+                continue
+            
+            piece = []
+            piece_tokens = 0
+            for word in sentence.split():
+                word_tokens = len(tokenizer.tokenize(word))
+                if piece and piece_tokens + word_tokens > MAX_SEGMENT_TOKENS:
+                    segments.append(" ".join(piece))
+                    piece, piece_tokens = [], 0
+                piece.append(word)
+                piece_tokens += word_tokens
+            if piece:
+                segments.append(" ".join(piece))
+        return segments
+    
+    def generate(self, segments, target_lang="en"):
+        """Translate a list of segments in length-sorted, padded batches and return them in input order"""
+        tokenizer = self.backend.tokenizer
+        
+        # Prepare inputs with language code
+        input_texts = [f">>{target_lang}<< {segment}" for segment in segments]
+        lengths = [len(ids) for ids in tokenizer(input_texts)["input_ids"]]
+        
+        # Sorting by token length keeps padding inside each batch minimal
+        order = sorted(range(len(input_texts)), key=lambda i: lengths[i])
+        translations = [None] * len(input_texts)
+        for start in range(0, len(order), TRANSLATION_BATCH_SIZE):
+            batch_indices = order[start:start + TRANSLATION_BATCH_SIZE]
+            outputs = self.backend.translate([input_texts[i] for i in batch_indices])
+            for i, translated in zip(batch_indices, outputs):
+                translations[i] = translated
+        return translations
+    
+    def translate_batch(self, texts, source_lang="gu", target_lang="en", timings=None, fallback=True):
+        """Translate many texts at once, splitting long ones into sentences and reassembling in order
+
+        Stage durations in milliseconds are added to the timings dict when one is given.
+        On failure the original texts are returned, or the error is raised when
+        fallback is False.
+        """
+        timings = {} if timings is None else timings
         try:
-            if self.model_name not in self.models:
+            if self.backend is None:
                 raise ValueError("Model not loaded")
             
-            tokenizer = self.tokenizers[self.model_name]
-            model = self.models[self.model_name]
+            stage_start = time.perf_counter()
+            segments = []
+            owners = []
+            for text_index, text in enumerate(texts):
+                for segment in self.split_sentences(text):
+                    segments.append(segment)
+                    owners.append(text_index)
+            timings['split_ms'] = (time.perf_counter() - stage_start) * 1000
             
-            # Prepare input with language code
-            input_text = f">>{target_lang}<< {text}"
-            inputs = tokenizer(input_text, return_tensors="pt", padding=True, truncation=True, max_length=512)
+            # Serve repeated phrases from the cache and generate each missing segment once
+            translations = {}
+            missing = []
+            for segment in dict.fromkeys(segments):
+                cached = self.cache.get(segment, source_lang, target_lang, self.cache_model_name)
+                if cached is None:
+                    missing.append(segment)
+                else:
+                    translations[segment] = cached
+            metrics.SEGMENTS.labels(self.backend.name, 'hit').inc(len(translations))
+            metrics.SEGMENTS.labels(self.backend.name, 'miss').inc(len(missing))
             
-            # Generate translation
-            with torch.no_grad():
-                outputs = model.generate(
-                    **inputs,
-                    max_length=512,
-                    num_beams=4,
-                    early_stopping=True,
-                    do_sample=False
-                )
+            if missing:
+                start = time.perf_counter()
+                with metrics.queued(self.backend.name):
+                    generated = self.generate(missing, target_lang)
+                timings['inference_ms'] = (time.perf_counter() - start) * 1000
+                cost_ms = timings['inference_ms'] / len(missing)
+                for segment, translated in zip(missing, generated):
+                    translations[segment] = translated
+                    self.cache.put(segment, source_lang, target_lang, self.cache_model_name, translated, cost_ms)
             
-            translated = tokenizer.decode(outputs[0], skip_special_tokens=True)
-            return translated
+            pieces = [[] for _ in texts]
+            for text_index, segment in zip(owners, segments):
+                pieces[text_index].append(translations[segment])
+            return [" ".join(parts) for parts in pieces]
             
         except Exception as e:
             logger.error(f"Translation error: {e}")
-            return text  # Return original text if translation fails
+            if not fallback:
+                raise
+            return list(texts)  # Return original texts if translation fails
+    
+    def translate(self, text, source_lang="gu", target_lang="en", timings=None):
+        """Translate text from source to target language"""
+        return self.translate_batch([text], source_lang, target_lang, timings)[0]
 
 # Initialize service
 logger.info("🚀 Starting Translation Service...")
 translation_service = TranslationService()
+atexit.register(translation_service.cache.save)
+translation_service.cache.start_autosave(TRANSLATION_CACHE_SAVE_SECONDS)
+
+def handle_sigterm(signum, frame):
+    # docker stop sends SIGTERM, which skips atexit handlers unless it is turned into a normal exit
+    logger.info("Received SIGTERM, saving translation cache and exiting")
+    sys.exit(0)
+
+if threading.current_thread() is threading.main_thread():
+    signal.signal(signal.SIGTERM, handle_sigterm)
+
+@app.before_request
+def track_request_start():
+    g.metrics_endpoint = request.endpoint or 'unknown'
+    metrics.IN_FLIGHT.labels(g.metrics_endpoint).inc()
+
+@app.after_request
+def track_request_outcome(response):
+    metrics.REQUESTS.labels(request.endpoint or 'unknown', str(response.status_code)).inc()
+    return response
+
+@app.teardown_request
+def track_request_end(exc):
+    endpoint = g.pop('metrics_endpoint', None)
+    if endpoint is not None:
+        metrics.IN_FLIGHT.labels(endpoint).dec()
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    body, content_type = metrics.render_metrics()
+    return Response(body, content_type=content_type)
 
 @app.route('/health', methods=['GET'])
 def health_check():
     return jsonify({
         "status": "healthy",
         "service": "translation",
-        "model": translation_service.model_name
+        "model": translation_service.model_name,
+        "backend": translation_service.backend.info(),
+        "cache": translation_service.cache.stats()
     })
 
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(translation_service.cache.stats())
+
+@app.route('/cache/clear', methods=['POST'])
+def cache_clear():
+    """Drop every cached translation; needs the same X-Profile-Token as /admin/profiles"""
+    require_profile_token()
+    translation_service.cache.clear()
+    # Persist right away so the cleared entries do not come back on the next restart
+    translation_service.cache.save()
+    return jsonify({"status": "cleared"})
+
 @app.route('/translate', methods=['POST'])
+@profiled
 def translate_text():
     try:
+        stage_start = time.perf_counter()
         data = request.json
+        timings = {'receive_ms': (time.perf_counter() - stage_start) * 1000}
         text = data.get('text', '')
         source_lang = data.get('source_language', 'gu')
         target_lang = data.get('target_language', 'en')
@@ -96,19 +256,62 @@ def translate_text():
             return jsonify({"error": "No text provided"}), 400
         
         logger.info(f"Translating: {text[:50]}... ({source_lang} -> {target_lang})")
-        translated_text = translation_service.translate(text, source_lang, target_lang)
+        translated_text = translation_service.translate(text, source_lang, target_lang, timings)
         
-        return jsonify({
+        stage_start = time.perf_counter()
+        response = jsonify({
             "original_text": text,
             "translated_text": translated_text,
             "source_language": source_lang,
             "target_language": target_lang
         })
+        timings['serialize_ms'] = (time.perf_counter() - stage_start) * 1000
+        metrics.observe_stages(timings, 'translate', translation_service.backend.name)
+        return response
         
     except Exception as e:
         logger.error(f"Translation endpoint error: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/translate_batch', methods=['POST'])
+@profiled
+def translate_batch():
+    try:
+        stage_start = time.perf_counter()
+        data = request.json or {}
+        timings = {'receive_ms': (time.perf_counter() - stage_start) * 1000}
+        texts = data.get('texts', [])
+        source_lang = data.get('source_language', 'gu')
+        target_lang = data.get('target_language', 'en')
+        
+        if not isinstance(texts, list) or not texts:
+            return jsonify({"error": "No texts provided"}), 400
+        if not all(isinstance(text, str) for text in texts):
+            return jsonify({"error": "All texts must be strings"}), 400
+        if len(texts) > MAX_BATCH_TEXTS:
+            return jsonify({"error": f"Too many texts: {len(texts)} (maximum {MAX_BATCH_TEXTS})"}), 400
+        
+        logger.info(f"Translating batch of {len(texts)} texts ({source_lang} -> {target_lang})")
+        # Callers such as the Whisper /pipeline must see a failure rather than untranslated text
+        translated_texts = translation_service.translate_batch(texts, source_lang, target_lang, timings, fallback=False)
+        
+        stage_start = time.perf_counter()
+        response = jsonify({
+            "translations": [
+                {"original_text": text, "translated_text": translated}
+                for text, translated in zip(texts, translated_texts)
+            ],
+            "source_language": source_lang,
+            "target_language": target_lang
+        })
+        timings['serialize_ms'] = (time.perf_counter() - stage_start) * 1000
+        metrics.observe_stages(timings, 'translate_batch', translation_service.backend.name)
+        return response
+        
+    except Exception as e:
+        logger.error(f"Batch translation endpoint error: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/languages', methods=['GET'])
 def supported_languages():
     return jsonify({
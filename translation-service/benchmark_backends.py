@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Translation Backend Benchmark
+Compares the transformers (PyTorch fp32) and CTranslate2 (quantized) MarianMT
+backends on latency, resident memory and BLEU against the transformers output
+
+Example:
+    python benchmark_backends.py --input sentences.txt --batch-size 16 --json results.json
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import argparse
+from collections import Counter
+
+import numpy as np
+
+from translation_backends import CTranslate2Backend, TransformersBackend
+
+# Short consultation-style sentences used when no --input file is given
+SAMPLE_SENTENCES = [
+    "મને ત્રણ દિવસથી તાવ છે.",
+    "તમે કઈ દવા લો છો?",
+    "મારા માથામાં ખૂબ દુખાવો થાય છે.",
+    "રાત્રે ઊંઘ આવતી નથી.",
+    "मुझे दो दिन से खांसी है।",
+    "क्या आपको कोई एलर्जी है?",
+    "खाना खाने के बाद पेट में दर्द होता है।",
+    "আমার বুকে ব্যথা করছে।",
+    "எனக்கு சர்க்கரை நோய் உள்ளது.",
+    "నాకు జ్వరం వచ్చింది.",
+    "मला चक्कर येत आहे.",
+    "ਮੈਨੂੰ ਸਾਹ ਲੈਣ ਵਿੱਚ ਤਕਲੀਫ਼ ਹੈ।",
+]
+
+
+def rss_mb():
+    """Current resident set size of this process in MB"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def corpus_bleu(hypotheses, references, max_order=4):
+    """Corpus BLEU (whitespace tokens, uniform weights, brevity penalty) on a 0-100 scale"""
+    matches = [0] * max_order
+    totals = [0] * max_order
+    hyp_length = ref_length = 0
+    for hypothesis, reference in zip(hypotheses, references):
+        hyp_tokens, ref_tokens = hypothesis.split(), reference.split()
+        hyp_length += len(hyp_tokens)
+        ref_length += len(ref_tokens)
+        for order in range(1, max_order + 1):
+            hyp_ngrams = Counter(tuple(hyp_tokens[i:i + order]) for i in range(len(hyp_tokens) - order + 1))
+            ref_ngrams = Counter(tuple(ref_tokens[i:i + order]) for i in range(len(ref_tokens) - order + 1))
+            matches[order - 1] += sum((hyp_ngrams & ref_ngrams).values())
+            totals[order - 1] += max(len(hyp_tokens) - order + 1, 0)
+
+    if hyp_length == 0 or min(matches) == 0:
+        return 0.0
+    log_precision = sum(math.log(m / t) for m, t in zip(matches, totals)) / max_order
+    brevity_penalty = 1.0 if hyp_length > ref_length else math.exp(1 - ref_length / hyp_length)
+    return round(100 * brevity_penalty * math.exp(log_precision), 2)
+
+
+def run_backend(name, create_backend, sentences, batch_size, repeats, target_lang):
+    """Load a backend, then time batched translation of the sentences"""
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    backend = create_backend()
+    load_seconds = time.perf_counter() - start
+    rss_loaded = rss_mb()
+
+    inputs = [f">>{target_lang}<< {sentence}" for sentence in sentences]
+    backend.translate(inputs[:batch_size])  # Warm up so one-time initialization is not counted
+
+    latencies = []
+    outputs = []
+    for _ in range(repeats):
+        outputs = []
+        for offset in range(0, len(inputs), batch_size):
+            batch_start = time.perf_counter()
+            outputs.extend(backend.translate(inputs[offset:offset + batch_size]))
+            latencies.append(time.perf_counter() - batch_start)
+
+    total = sum(latencies)
+    result = {
+        'backend': name,
+        **backend.info(),
+        'load_seconds': round(load_seconds, 2),
+        'model_rss_mb': round(rss_loaded - rss_before, 1),
+        'peak_rss_mb': round(rss_mb(), 1),
+        'sentences_per_s': round(len(inputs) * repeats / total, 2),
+        'p50_batch_ms': round(float(np.percentile(latencies, 50)) * 1000, 1),
+        'p95_batch_ms': round(float(np.percentile(latencies, 95)) * 1000, 1),
+    }
+    del backend
+    return result, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default=os.getenv('MODEL_NAME', 'Helsinki-NLP/opus-mt-mul-en'))
+    parser.add_argument('--input', help='Text file with one source sentence per line (default: built-in samples)')
+    parser.add_argument('--target-language', default='en')
+    parser.add_argument('--batch-size', type=int, default=int(os.getenv('TRANSLATION_BATCH_SIZE', '16')))
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--compute-type', default='int8', help='CTranslate2 quantization')
+    parser.add_argument('--device', default='cpu', help='CTranslate2 device (cpu, cuda or auto)')
+    parser.add_argument('--json', help='Write results to this JSON file')
+    args = parser.parse_args()
+
+    if args.input:
+        with open(args.input, encoding='utf-8') as f:
+            sentences = [line.strip() for line in f if line.strip()]
+    else:
+        sentences = SAMPLE_SENTENCES
+
+    print(f"🔍 Benchmarking {args.model} on {len(sentences)} sentences (batch size {args.batch_size})")
+    # Baseline first: its output is the reference for the parity score
+    baseline, references = run_backend(
+        'transformers', lambda: TransformersBackend(args.model),
+        sentences, args.batch_size, args.repeats, args.target_language
+    )
+    candidate, hypotheses = run_backend(
+        'ctranslate2', lambda: CTranslate2Backend(args.model, compute_type=args.compute_type, device=args.device),
+        sentences, args.batch_size, args.repeats, args.target_language
+    )
+    candidate['bleu_vs_transformers'] = corpus_bleu(hypotheses, references)
+    candidate['exact_match_rate'] = round(
+        sum(h.strip() == r.strip() for h, r in zip(hypotheses, references)) / len(references), 3)
+    candidate['speedup'] = round(candidate['sentences_per_s'] / baseline['sentences_per_s'], 2)
+
+    print(f"{'backend':>12} {'compute':>8} {'sent/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'model MB':>9}")
+    for result in (baseline, candidate):
+        print(f"{result['backend']:>12} {result['compute_type']:>8} {result['sentences_per_s']:>8} "
+              f"{result['p50_batch_ms']:>9} {result['p95_batch_ms']:>9} {result['model_rss_mb']:>9}")
+    print(f"\nSpeedup: {candidate['speedup']}x, BLEU vs transformers: {candidate['bleu_vs_transformers']}, "
+          f"exact matches: {candidate['exact_match_rate']:.0%}")
+
+    differing = [(s, r, h) for s, r, h in zip(sentences, references, hypotheses) if r.strip() != h.strip()]
+    for sentence, reference, hypothesis in differing[:5]:
+        print(f"\n  {sentence}\n    transformers: {reference}\n    ctranslate2:  {hypothesis}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'model': args.model, 'sentences': len(sentences), 'batch_size': args.batch_size,
+                       'results': [baseline, candidate]}, f, indent=2, ensure_ascii=False)
+        print(f"\n✅ Results written to {args.json}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""
+Prometheus metrics for the translation service
+Per-stage latency histograms, segment and cache counters, in-flight requests,
+generation queue depth and model load time, labelled by backend
+"""
+
+import os
+from contextlib import contextmanager
+
+# prometheus_client writes per-process files into this directory as soon as metrics are created
+if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+    os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+
+STAGE_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+STAGE_SECONDS = Histogram(
+    'translation_stage_seconds', 'Time spent in each translation stage',
+    ['stage', 'endpoint', 'backend'], buckets=STAGE_BUCKETS
+)
+SEGMENTS = Counter(
+    'translation_segments_total', 'Sentence segments translated, by cache result', ['backend', 'cache']
+)
+REQUESTS = Counter(
+    'translation_requests_total', 'Requests by endpoint and outcome', ['endpoint', 'outcome']
+)
+IN_FLIGHT = Gauge(
+    'translation_requests_in_flight', 'Requests currently being handled', ['endpoint'],
+    multiprocess_mode='livesum'
+)
+QUEUE_DEPTH = Gauge(
+    'translation_generate_queue_depth', 'Requests waiting for or running model generation', ['backend'],
+    multiprocess_mode='livesum'
+)
+MODEL_LOAD_SECONDS = Gauge(
+    'translation_model_load_seconds', 'Time taken to load the translation model', ['backend'],
+    multiprocess_mode='max'
+)
+
+
+def observe_stages(timings, endpoint, backend):
+    """Record stage timings given in milliseconds, e.g. {'split_ms': 1.2}"""
+    for stage, value_ms in timings.items():
+        STAGE_SECONDS.labels(stage[:-3], endpoint, backend).observe(value_ms / 1000)
+
+
+@contextmanager
+def queued(backend):
+    gauge = QUEUE_DEPTH.labels(backend)
+    gauge.inc()
+    try:
+        yield
+    finally:
+        gauge.dec()
+
+
+def render_metrics():
+    """Text exposition of all metrics; aggregates across worker processes when PROMETHEUS_MULTIPROC_DIR is set"""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
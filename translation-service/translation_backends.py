@@ -0,0 +1,140 @@
+"""
+Translation backends for the MarianMT model
+'transformers' runs MarianMTModel.generate in PyTorch, 'ctranslate2' converts
+the same checkpoint once to an int8 CTranslate2 model cached under /app/models
+"""
+
+import os
+import shutil
+import logging
+
+from transformers import MarianTokenizer
+
+logger = logging.getLogger(__name__)
+
+TRANSFORMERS_CACHE_DIR = "/app/models/transformers"
+CTRANSLATE2_MODELS_DIR = "/app/models/ctranslate2"
+
+# Decoding settings shared by both backends so their output stays comparable
+NUM_BEAMS = 4
+MAX_LENGTH = 512
+
+
+class TransformersBackend:
+    """MarianMTModel.generate on PyTorch"""
+
+    name = 'transformers'
+
+    def __init__(self, model_name, cache_dir=TRANSFORMERS_CACHE_DIR):
+        import torch
+        from transformers import MarianMTModel
+
+        self._torch = torch
+        self.model_name = model_name
+        self.tokenizer = MarianTokenizer.from_pretrained(model_name, cache_dir=cache_dir)
+        self.model = MarianMTModel.from_pretrained(model_name, cache_dir=cache_dir)
+
+    def translate(self, input_texts):
+        """Translate one padded batch of prefixed input texts"""
+        inputs = self.tokenizer(
+            input_texts,
+            return_tensors="pt", padding=True, truncation=True, max_length=MAX_LENGTH
+        )
+        with self._torch.no_grad():
+            outputs = self.model.generate(
+                **inputs,
+                max_length=MAX_LENGTH,
+                num_beams=NUM_BEAMS,
+                early_stopping=True,
+                do_sample=False
+            )
+        return self.tokenizer.batch_decode(outputs, skip_special_tokens=True)
+
+    def info(self):
+        return {'backend': self.name, 'device': 'cpu', 'compute_type': 'float32'}
+
+
+def ctranslate2_model_dir(model_name, compute_type, models_dir=CTRANSLATE2_MODELS_DIR):
+    return os.path.join(models_dir, f"{model_name.replace('/', '--')}-{compute_type}")
+
+
+def convert_to_ctranslate2(model_name, output_dir, compute_type, cache_dir=TRANSFORMERS_CACHE_DIR):
+    """Convert a Hugging Face Marian checkpoint to CTranslate2, writing to a temp dir first so a crash never leaves half a model"""
+    from huggingface_hub import snapshot_download
+    from ctranslate2.converters import TransformersConverter
+
+    logger.info(f"Converting {model_name} to CTranslate2 ({compute_type}) at {output_dir}")
+    model_path = snapshot_download(model_name, cache_dir=cache_dir)
+    tmp_dir = f"{output_dir}.tmp"
+    TransformersConverter(model_path).convert(tmp_dir, quantization=compute_type, force=True)
+    if os.path.exists(output_dir):
+        shutil.rmtree(output_dir)
+    os.replace(tmp_dir, output_dir)
+    return output_dir
+
+
+class CTranslate2Backend:
+    """Quantized Marian model served by a CTranslate2 Translator"""
+
+    name = 'ctranslate2'
+
+    def __init__(self, model_name, compute_type='int8', device='auto', inter_threads=1, intra_threads=0,
+                 models_dir=CTRANSLATE2_MODELS_DIR, cache_dir=TRANSFORMERS_CACHE_DIR):
+        import ctranslate2
+
+        self.model_name = model_name
+        self.compute_type = compute_type
+        self.device = device
+        if self.device == 'auto':
+            self.device = 'cuda' if ctranslate2.get_cuda_device_count() > 0 else 'cpu'
+
+        self.model_dir = ctranslate2_model_dir(model_name, compute_type, models_dir)
+        if not os.path.exists(os.path.join(self.model_dir, 'model.bin')):
+            convert_to_ctranslate2(model_name, self.model_dir, compute_type, cache_dir)
+        else:
+            logger.info(f"Using cached CTranslate2 model at {self.model_dir}")
+
+        self.tokenizer = MarianTokenizer.from_pretrained(model_name, cache_dir=cache_dir)
+        self.translator = ctranslate2.Translator(
+            self.model_dir,
+            device=self.device,
+            compute_type=compute_type,
+            inter_threads=inter_threads,
+            intra_threads=intra_threads
+        )
+
+    def translate(self, input_texts):
+        """Translate one batch of prefixed input texts"""
+        source = [
+            self.tokenizer.convert_ids_to_tokens(self.tokenizer.encode(text, truncation=True, max_length=MAX_LENGTH))
+            for text in input_texts
+        ]
+        results = self.translator.translate_batch(
+            source,
+            beam_size=NUM_BEAMS,
+            max_decoding_length=MAX_LENGTH
+        )
+        return [
+            self.tokenizer.decode(self.tokenizer.convert_tokens_to_ids(result.hypotheses[0]), skip_special_tokens=True)
+            for result in results
+        ]
+
+    def info(self):
+        return {
+            'backend': self.name,
+            'device': self.device,
+            'compute_type': self.compute_type,
+            'model_dir': self.model_dir
+        }
+
+
+def load_backend(name, model_name, **ctranslate2_options):
+    """Create the configured backend, falling back to transformers if CTranslate2 cannot be loaded"""
+    if name == 'ctranslate2':
+        try:
+            return CTranslate2Backend(model_name, **ctranslate2_options)
+        except Exception as e:
+            logger.error(f"❌ Could not load CTranslate2 backend: {e}, falling back to transformers")
+    elif name != 'transformers':
+        raise ValueError(f"Unknown translation backend '{name}' (expected 'transformers' or 'ctranslate2')")
+    return TransformersBackend(model_name)
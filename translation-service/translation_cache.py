@@ -0,0 +1,208 @@
+"""
+Bounded LRU cache for translated segments
+Keyed on normalized text, language pair and model name, with entry and
+memory budgets, optional TTL and optional on-disk persistence
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text):
+    """Canonical form used for cache keys: NFC with collapsed whitespace"""
+    return " ".join(unicodedata.normalize('NFC', text).split())
+
+
+class TranslationCache:
+    """Thread-safe LRU cache of translations with hit/miss/eviction stats"""
+
+    def __init__(self, max_entries=10000, max_bytes=64 * 1024 * 1024, ttl=0, path=None, save_every=100):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.path = path
+        self.save_every = save_every
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._unsaved = 0
+        # Saves run on a background thread so a request never writes the file; _save_lock keeps one writer at a time
+        self._save_lock = threading.Lock()
+        self._save_requested = threading.Event()
+        self._saver = None
+        self._autosave_seconds = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.saved_ms = 0.0
+        if self.path:
+            self.load()
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    @staticmethod
+    def make_key(text, source_lang, target_lang, model_name):
+        return (normalize_text(text), source_lang, target_lang, model_name)
+
+    @staticmethod
+    def _entry_size(key, value):
+        return sum(sys.getsizeof(part) for part in key) + sys.getsizeof(value)
+
+    def get(self, text, source_lang, target_lang, model_name):
+        """Return the cached translation or None"""
+        if not self.enabled:
+            return None
+        key = self.make_key(text, source_lang, target_lang, model_name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl and time.time() - entry[2] > self.ttl:
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.saved_ms += entry[1]
+            return entry[0]
+
+    def put(self, text, source_lang, target_lang, model_name, translation, cost_ms, created_at=None):
+        """Store a translation along with the milliseconds it took to generate"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._insert(self.make_key(text, source_lang, target_lang, model_name),
+                         translation, cost_ms, created_at or time.time())
+            self._unsaved += 1
+            save_now = self.path and self._unsaved >= self.save_every
+        if save_now:
+            self._request_save()
+
+    def _insert(self, key, translation, cost_ms, created_at):
+        size = self._entry_size(key, translation)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (translation, cost_ms, created_at, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry[3]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'memory_bytes': self._bytes,
+                'max_memory_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'saved_ms': round(self.saved_ms, 1),
+                'persistence_file': self.path
+            }
+
+    def save(self):
+        """Write the cache to disk atomically as JSON lines (oldest first, so LRU order survives a reload)"""
+        if not self.path:
+            return
+        with self._save_lock:
+            # Only the snapshot holds the cache lock; serializing and writing do not block lookups
+            with self._lock:
+                rows = [list(key) + list(entry[:3]) for key, entry in self._entries.items()]
+                self._unsaved = 0
+            tmp_path = f"{self.path}.tmp"
+            try:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    for row in rows:
+                        f.write(json.dumps(row, ensure_ascii=False) + "\n")
+                os.replace(tmp_path, self.path)
+                logger.info(f"Saved {len(rows)} cached translations to {self.path}")
+            except OSError as e:
+                logger.warning(f"Could not save translation cache to {self.path}: {e}")
+
+    def save_if_changed(self):
+        """Save only when entries were added since the last save"""
+        with self._lock:
+            changed = self._unsaved > 0
+        if changed:
+            self.save()
+
+    def start_autosave(self, interval_seconds):
+        """Save changes every interval_seconds on a daemon thread, so a killed process loses at most that much"""
+        if not self.path or interval_seconds <= 0:
+            return
+        self._autosave_seconds = interval_seconds
+        self._start_saver()
+        # Wake a saver already waiting without a timeout so the interval takes effect
+        self._save_requested.set()
+
+    def _request_save(self):
+        """Ask the background saver to write the cache now, after save_every inserts"""
+        self._start_saver()
+        self._save_requested.set()
+
+    def _start_saver(self):
+        with self._lock:
+            if self._saver is not None:
+                return
+            self._saver = threading.Thread(target=self._run_saver, name='translation-cache-saver', daemon=True)
+        self._saver.start()
+
+    def _run_saver(self):
+        while True:
+            # Wakes on a save request, or every autosave interval once start_autosave was called
+            self._save_requested.wait(self._autosave_seconds)
+            self._save_requested.clear()
+            self.save_if_changed()
+
+    def load(self):
+        """Load a previously saved cache, skipping entries that are expired or malformed"""
+        if not self.enabled or not os.path.exists(self.path):
+            return
+        loaded = 0
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        text, source_lang, target_lang, model_name, translation, cost_ms, created_at = json.loads(line)
+                    except ValueError:
+                        continue
+                    if self.ttl and time.time() - created_at > self.ttl:
+                        continue
+                    with self._lock:
+                        self._insert(self.make_key(text, source_lang, target_lang, model_name),
+                                     translation, cost_ms, created_at)
+                    loaded += 1
+            logger.info(f"Loaded {loaded} cached translations from {self.path}")
+        except OSError as e:
+            logger.warning(f"Could not load translation cache from {self.path}: {e}")
@@ -0,0 +1,297 @@
+"""
+Admission control and priority scheduling for inference requests
+A bounded queue in front of decode and inference sheds load with 429 instead of
+letting work pile up, limits how many requests one client can have in flight,
+drops queued requests whose client deadline has already passed and serves
+interactive work ahead of batch work without starving it
+"""
+
+import os
+import math
+import time
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_MAX_ACTIVE = int(os.getenv('ADMISSION_MAX_ACTIVE', '0'))  # 0 = one per model worker (see app.py)
+ADMISSION_MAX_QUEUE = int(os.getenv('ADMISSION_MAX_QUEUE', '8'))  # requests waiting for a slot before 429
+ADMISSION_MAX_PER_CLIENT = int(os.getenv('ADMISSION_MAX_PER_CLIENT', '4'))  # 0 = unlimited
+ADMISSION_MAX_DEADLINE_MS = float(os.getenv('ADMISSION_MAX_DEADLINE_MS', '600000'))
+# Starvation guard: batch work is served once it has waited this long, or after this many interactive grants in a row
+ADMISSION_BATCH_MAX_WAIT_SECONDS = float(os.getenv('ADMISSION_BATCH_MAX_WAIT_SECONDS', '10'))
+ADMISSION_INTERACTIVE_BURST = int(os.getenv('ADMISSION_INTERACTIVE_BURST', '8'))
+SERVICE_TIME_SMOOTHING = 0.2  # weight of the newest request in the average service time
+INITIAL_SERVICE_SECONDS = 2.0
+WAIT_SAMPLES = 1024  # recent queue waits kept per class for percentiles
+
+INTERACTIVE = 'interactive'
+BATCH = 'batch'
+PRIORITIES = (INTERACTIVE, BATCH)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed; retry_after is a whole number of seconds"""
+
+    def __init__(self, message, reason, retry_after):
+        super().__init__(message)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class DeadlineExpired(Exception):
+    """Raised when a request's deadline passes while it waits for a slot"""
+
+
+def parse_deadline(value, received_at=None):
+    """Convert an X-Deadline-Ms header (milliseconds the client will wait) to a monotonic deadline"""
+    if value is None or value == '':
+        return None
+    try:
+        budget_ms = float(value)
+    except ValueError:
+        budget_ms = math.nan
+    if not math.isfinite(budget_ms) or budget_ms <= 0:
+        raise ValueError(f"Invalid X-Deadline-Ms: {value!r} (expected positive milliseconds)")
+    received_at = time.monotonic() if received_at is None else received_at
+    return received_at + min(budget_ms, ADMISSION_MAX_DEADLINE_MS) / 1000
+
+
+class Ticket:
+    """An admitted request; holds its active slots until released"""
+
+    def __init__(self, controller, client_id, deadline, priority, slots=1):
+        self.controller = controller
+        self.client_id = client_id
+        self.deadline = deadline
+        self.priority = priority
+        self.slots = slots
+        self.enqueued_at = time.monotonic()
+        self.started_at = None
+        self.released = False
+
+    def remaining(self):
+        return None if self.deadline is None else self.deadline - time.monotonic()
+
+    def expired(self, stage):
+        """True (and counted) once the deadline has passed; stage names where it was noticed"""
+        if self.deadline is None or time.monotonic() < self.deadline:
+            return False
+        self.controller.count_expired(stage)
+        return True
+
+    def checkpoint(self):
+        """Between units of batch work: hand the slot to waiting interactive requests, then queue for it again"""
+        if self.priority == BATCH and not self.released:
+            self.controller.yield_slot(self)
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.controller.release(self)
+
+
+class WaitStats:
+    """Queue wait times of one priority class"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.recent = deque(maxlen=WAIT_SAMPLES)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total_seconds += seconds
+        self.recent.append(seconds)
+
+    def as_dict(self):
+        recent = sorted(self.recent)
+        return {
+            'grants': self.count,
+            'mean_wait_ms': round(self.total_seconds / self.count * 1000, 1) if self.count else None,
+            'p95_wait_ms': round(recent[min(len(recent) - 1, int(len(recent) * 0.95))] * 1000, 1) if recent else None,
+            'max_wait_ms': round(recent[-1] * 1000, 1) if recent else None
+        }
+
+
+class AdmissionController:
+    """Per-class FIFO queues of requests waiting for the max_active inference slots
+
+    Interactive requests are granted first. The oldest batch request is
+    granted instead once it has waited ADMISSION_BATCH_MAX_WAIT_SECONDS or
+    after ADMISSION_INTERACTIVE_BURST interactive grants in a row.
+    """
+
+    def __init__(self, max_active, max_queue=ADMISSION_MAX_QUEUE, max_per_client=ADMISSION_MAX_PER_CLIENT,
+                 on_change=None, on_wait=None):
+        self.max_active = max(1, max_active)
+        self.max_queue = max(0, max_queue)
+        self.max_per_client = max_per_client
+        self.on_change = on_change
+        self.on_wait = on_wait
+        self.condition = threading.Condition()
+        self.waiting = {priority: [] for priority in PRIORITIES}
+        self.active = 0
+        self.clients = {}
+        self.interactive_streak = 0
+        self.service_seconds = INITIAL_SERVICE_SECONDS
+        self.admitted = 0
+        self.yields = 0
+        self.starvation_grants = 0
+        self.waits = {priority: WaitStats() for priority in PRIORITIES}
+        self.shed = {'queue_full': 0, 'client_limit': 0}
+        self.expired = {'queued': 0, 'decoded': 0}
+
+    @property
+    def waiting_count(self):
+        return sum(len(tickets) for tickets in self.waiting.values())
+
+    def retry_after(self):
+        """Seconds until the current backlog should have drained"""
+        backlog = self.waiting_count + self.active
+        return max(1, math.ceil(backlog * self.service_seconds / self.max_active))
+
+    def admit(self, client_id, deadline=None, priority=INTERACTIVE, limits=True, slots=1):
+        """Wait for active slots and return a Ticket
+
+        slots is the number of inferences the request runs at once (capped at
+        max_active). Raises AdmissionRejected when the queue or the client's
+        allowance is full and DeadlineExpired when the deadline passes while
+        waiting. Internal work (limits=False) is never shed.
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority '{priority}'. Use {' or '.join(PRIORITIES)}")
+        with self.condition:
+            if limits and self.max_per_client > 0 and self.clients.get(client_id, 0) >= self.max_per_client:
+                self._shed('client_limit')
+                raise AdmissionRejected(
+                    f"Too many concurrent requests from this client (limit {self.max_per_client})",
+                    'client_limit', self.retry_after())
+            # Waiting batch work never causes interactive requests to be shed
+            queued = len(self.waiting[INTERACTIVE]) if priority == INTERACTIVE else self.waiting_count
+            if limits and self.active >= self.max_active and queued >= self.max_queue:
+                self._shed('queue_full')
+                raise AdmissionRejected(
+                    f"Inference queue is full ({self.max_queue} waiting)", 'queue_full', self.retry_after())
+
+            ticket = Ticket(self, client_id, deadline, priority, max(1, min(slots, self.max_active)))
+            self.clients[client_id] = self.clients.get(client_id, 0) + 1
+            try:
+                self._wait_for_slot(ticket)
+            except BaseException:
+                self._forget_client(client_id)
+                raise
+            self.admitted += 1
+            return ticket
+
+    def yield_slot(self, ticket):
+        """Give up ticket's slots if an interactive request is waiting and queue (first in its class) again"""
+        with self.condition:
+            if not self.waiting[INTERACTIVE]:
+                return
+            self.yields += 1
+            self.active -= ticket.slots
+            ticket.enqueued_at = time.monotonic()
+            try:
+                self._wait_for_slot(ticket, front=True)
+            except BaseException:
+                ticket.released = True
+                self._forget_client(ticket.client_id)
+                raise
+
+    def _next_ticket(self):
+        interactive, batch = self.waiting[INTERACTIVE], self.waiting[BATCH]
+        if batch and (not interactive
+                      or time.monotonic() - batch[0].enqueued_at >= ADMISSION_BATCH_MAX_WAIT_SECONDS
+                      or self.interactive_streak >= ADMISSION_INTERACTIVE_BURST):
+            return batch[0]
+        return interactive[0] if interactive else None
+
+    def _wait_for_slot(self, ticket, front=False):
+        queue = self.waiting[ticket.priority]
+        if front:
+            queue.insert(0, ticket)
+        else:
+            queue.append(ticket)
+        self.condition.notify_all()
+        self._changed()
+        try:
+            while self.active + ticket.slots > self.max_active or self._next_ticket() is not ticket:
+                remaining = ticket.remaining()
+                if remaining is not None and remaining <= 0 and ticket.started_at is None:
+                    self.expired['queued'] += 1
+                    raise DeadlineExpired("Request deadline passed while queued")
+                self.condition.wait(remaining if ticket.started_at is None else None)
+        except BaseException:
+            queue.remove(ticket)
+            self.condition.notify_all()
+            self._changed()
+            raise
+
+        queue.remove(ticket)
+        if ticket.priority == BATCH:
+            if self.waiting[INTERACTIVE]:
+                self.starvation_grants += 1
+            self.interactive_streak = 0
+        elif self.waiting[BATCH]:
+            self.interactive_streak += 1
+        else:
+            self.interactive_streak = 0
+        self.active += ticket.slots
+        waited = time.monotonic() - ticket.enqueued_at
+        self.waits[ticket.priority].add(waited)
+        if self.on_wait is not None:
+            self.on_wait(ticket.priority, waited)
+        ticket.started_at = time.monotonic()
+        self.condition.notify_all()
+        self._changed()
+
+    def release(self, ticket):
+        with self.condition:
+            self.active -= ticket.slots
+            self._forget_client(ticket.client_id)
+            elapsed = time.monotonic() - ticket.started_at
+            self.service_seconds += SERVICE_TIME_SMOOTHING * (elapsed - self.service_seconds)
+            self.condition.notify_all()
+            self._changed()
+
+    def count_expired(self, stage):
+        with self.condition:
+            self.expired[stage] = self.expired.get(stage, 0) + 1
+
+    def _shed(self, reason):
+        self.shed[reason] += 1
+        logger.warning(f"Shedding request ({reason}): {self.active} active, {self.waiting_count} waiting")
+
+    def _forget_client(self, client_id):
+        count = self.clients.get(client_id, 0) - 1
+        if count > 0:
+            self.clients[client_id] = count
+        else:
+            self.clients.pop(client_id, None)
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change(self.active, {priority: len(tickets) for priority, tickets in self.waiting.items()})
+
+    def stats(self):
+        with self.condition:
+            return {
+                'active': self.active,
+                'waiting': self.waiting_count,
+                'max_active': self.max_active,
+                'max_queue': self.max_queue,
+                'max_per_client': self.max_per_client,
+                'clients': len(self.clients),
+                'admitted': self.admitted,
+                'shed': dict(self.shed),
+                'expired': dict(self.expired),
+                'avg_service_seconds': round(self.service_seconds, 3),
+                'priorities': {
+                    priority: dict(self.waits[priority].as_dict(), waiting=len(self.waiting[priority]))
+                    for priority in PRIORITIES
+                },
+                'batch_yields': self.yields,
+                'starvation_grants': self.starvation_grants
+            }
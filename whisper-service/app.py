@@ -5,14 +5,34 @@ Provides REST API for audio transcription using Faster Whisper with CUDA support
 """
 
 import os
-import tempfile
+import json
+import time
+import socket
 import logging
-import subprocess
-from flask import Flask, request, jsonify
+import functools
+import ipaddress
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, g, request, jsonify, make_response, stream_with_context
 from flask_cors import CORS
 from faster_whisper import WhisperModel
-import torch
-from pydub import AudioSegment
+from audio_processing import (
+    SAMPLE_RATE, PcmFormatError, decode_audio_bytes, decode_pcm_bytes, gate_speech, guess_audio_extension,
+    pcm_sample_format, vad_stats
+)
+from batching import BatchScheduler
+from streaming import ListenerLimit, ListenerLimitError, SessionError, SessionLimitError, SessionManager
+from result_cache import ResultCache, audio_digest
+from model_pool import ModelPool
+from jobs import JobManager, JobNotFoundError
+from pipeline import TranslationClient, TranslationServiceError
+from language_sessions import LanguageSessionStore, mean_logprob
+from admission import (
+    ADMISSION_MAX_ACTIVE, BATCH, INTERACTIVE, PRIORITIES, AdmissionController, AdmissionRejected, DeadlineExpired, parse_deadline
+)
+import metrics
+from profiling import profiled, profiles_blueprint
+from startup import WARMUP_ENABLED, StartupState, detect_device, warm_up
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -20,257 +40,784 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 CORS(app)
+app.register_blueprint(profiles_blueprint)
 
-# Global model variable
+# Global model variable (the default WHISPER_MODEL, pinned in the pool)
 model = None
 
+# Device and compute type chosen once at startup and shared by every pooled model
+device = "cpu"
+compute_type = "int8"
+device_info = {}
+
+# Startup progress reported by /health/live and /health/ready
+startup_state = StartupState()
+
+# Models are loaded lazily on first use and evicted LRU past MODEL_MEMORY_BUDGET_MB (0 = no limit)
+DEFAULT_MODEL = os.getenv('WHISPER_MODEL', 'small')
+MODE_MODELS = {
+    'fast': os.getenv('WHISPER_MODEL_FAST', DEFAULT_MODEL),
+    'accurate': os.getenv('WHISPER_MODEL_ACCURATE', DEFAULT_MODEL)
+}
+MODEL_MEMORY_BUDGET_MB = float(os.getenv('MODEL_MEMORY_BUDGET_MB', '0'))
+AVAILABLE_MODELS = ['tiny', 'tiny.en', 'base', 'base.en', 'small', 'small.en', 'medium', 'medium.en', 'large', 'large-v2', 'large-v3']
+# Models a request may name explicitly; each one is downloaded and loaded on first use (default: the routed models)
+ALLOWED_MODELS = [name.strip() for name in os.getenv('ALLOWED_MODELS', '').split(',') if name.strip()] or sorted(
+    {DEFAULT_MODEL, *MODE_MODELS.values()})
+# Loaded, warmed up and pinned before the service reports ready: the default model and the one live
+# chunks (mode=fast) use; other routed models load on first use and are subject to LRU eviction
+STARTUP_MODELS = list(dict.fromkeys([DEFAULT_MODEL, MODE_MODELS['fast']]))
+model_pool = None
+
+# CPU threads per model instance; with several server workers keep workers * threads <= cores
+WHISPER_CPU_THREADS = int(os.getenv('WHISPER_CPU_THREADS', '0'))  # 0 = CTranslate2 default
+# Concurrent transcribe() calls a model runs in parallel (long-recording jobs use JOB_WORKERS threads)
+WHISPER_NUM_WORKERS = int(os.getenv('WHISPER_NUM_WORKERS', '1'))
+
+# /pipeline runs Whisper's translate task next to the native transcription on these threads
+PIPELINE_WORKERS = int(os.getenv('PIPELINE_WORKERS', '4'))
+pipeline_executor = ThreadPoolExecutor(max_workers=PIPELINE_WORKERS, thread_name_prefix='pipeline')
+translation_client = TranslationClient()
+
+WHISPER_TASKS = ('transcribe', 'translate')
+
+# Long recordings above this size are rejected by /jobs
+JOB_MAX_UPLOAD_MB = float(os.getenv('JOB_MAX_UPLOAD_MB', '200'))
+
+# Micro-batching across concurrent requests (disabled when BATCH_MAX_SIZE is 1)
+BATCH_MAX_SIZE = int(os.getenv('BATCH_MAX_SIZE', '1'))
+BATCH_MAX_WAIT_MS = float(os.getenv('BATCH_MAX_WAIT_MS', '50'))
+batch_scheduler = None
+
+# Admission control in front of decode and inference: by default one active request per
+# model worker (or a full micro-batch), ADMISSION_MAX_QUEUE more waiting, the rest get 429.
+# Interactive work (live chunks, streaming sessions) is granted slots ahead of batch work
+# (mode=accurate, long-recording jobs)
+admission = AdmissionController(ADMISSION_MAX_ACTIVE or max(WHISPER_NUM_WORKERS, BATCH_MAX_SIZE),
+                                on_change=metrics.observe_admission, on_wait=metrics.observe_queue_wait)
+
+# Peers whose X-Real-IP header names the client (addresses, CIDRs or hostnames such as the nginx
+# service); anyone else could set it, so per-client limits use the peer address for them
+TRUSTED_PROXIES = [entry.strip() for entry in os.getenv('TRUSTED_PROXIES', '').split(',') if entry.strip()]
+TRUSTED_PROXY_REFRESH_SECONDS = 60
+
+# Content-addressed cache of /transcribe results (RESULT_CACHE_ENTRIES=0 disables it)
+result_cache = ResultCache(
+    max_entries=int(os.getenv('RESULT_CACHE_ENTRIES', '512')),
+    max_bytes=int(float(os.getenv('RESULT_CACHE_MAX_MB', '32')) * 1024 * 1024)
+)
+
+def create_whisper_model(model_name):
+    """Instantiate a Faster Whisper model on the configured device"""
+    with metrics.time_model_load(model_name):
+        return _create_whisper_model(model_name)
+
+def _create_whisper_model(model_name):
+    global compute_type
+    try:
+        return WhisperModel(
+            model_name, 
+            device=device, 
+            compute_type=compute_type,
+            cpu_threads=WHISPER_CPU_THREADS,
+            num_workers=WHISPER_NUM_WORKERS,
+            download_root="/app/models",  # Cache models in Docker volume
+            local_files_only=False  # Allow downloading if not cached
+        )
+    except Exception as e:
+        if compute_type == "float16" and device == "cuda":
+            logger.warning(f"Failed to load with float16: {e}, trying int8")
+            compute_type = "int8"
+            model_pool.compute_type = compute_type
+            return WhisperModel(
+                model_name, 
+                device=device, 
+                compute_type=compute_type,
+                cpu_threads=WHISPER_CPU_THREADS,
+                num_workers=WHISPER_NUM_WORKERS,
+                download_root="/app/models",
+                local_files_only=False
+            )
+        raise e
+
 def load_model():
     """Load the Faster Whisper model with CUDA support"""
-    global model
+    global model, model_pool, batch_scheduler, device, compute_type, device_info
     try:
-        model_name = os.getenv('WHISPER_MODEL', 'small')
-        device = "cuda" if torch.cuda.is_available() else "cpu"
+        model_name = DEFAULT_MODEL
         
-        # Check if CUDA device supports float16
-        if device == "cuda":
-            try:
-                # Test if float16 is supported
-                test_tensor = torch.tensor([1.0], dtype=torch.float16, device="cuda")
-                compute_type = "float16"
-                logger.info("CUDA device supports float16")
-            except Exception as e:
-                logger.warning(f"CUDA device does not support float16: {e}, falling back to int8")
-                compute_type = "int8"
-        else:
-            compute_type = "int8"
+        # Device capability is probed once and cached for the health endpoints
+        with startup_state.timed('detect_device'):
+            device_info = detect_device()
+            device = device_info['device']
+            compute_type = device_info['compute_type']
         
-        logger.info(f"Loading Faster Whisper model: {model_name}")
+        logger.info(f"Loading Faster Whisper models: {', '.join(STARTUP_MODELS)}")
         logger.info(f"Device: {device}, Compute type: {compute_type}")
-        logger.info(f"CUDA available: {torch.cuda.is_available()}")
+        logger.info(f"CUDA available: {device_info['cuda_available']} ({device_info['cuda_device_count']} devices)")
+        logger.info(f"Mode routing: {MODE_MODELS}, memory budget: {MODEL_MEMORY_BUDGET_MB or 'unlimited'} MB")
         
-        if torch.cuda.is_available():
-            logger.info(f"CUDA device: {torch.cuda.get_device_name(0)}")
-            logger.info(f"CUDA memory: {torch.cuda.get_device_properties(0).total_memory / 1024**3:.1f} GB")
+        # The interactive model is loaded, pinned and warmed before ready, so the first live chunk
+        # after a ready report does not pay a cold load and the LRU budget never evicts it
+        for name in STARTUP_MODELS:
+            startup_state.set_model_state(name, 'pending')
+        model_pool = ModelPool(create_whisper_model, budget_mb=MODEL_MEMORY_BUDGET_MB,
+                               compute_type=compute_type, pinned=STARTUP_MODELS)
+        for name in STARTUP_MODELS:
+            startup_state.set_model_state(name, 'loading')
+            with startup_state.timed(f'load_model:{name}'):
+                loaded = model_pool.get(name)
+            logger.info(f"Faster Whisper model {name} loaded successfully on {device}")
+            if name == model_name:
+                model = loaded
+            if WARMUP_ENABLED:
+                startup_state.set_model_state(name, 'warming_up')
+                with startup_state.timed(f'warm_up:{name}'):
+                    warm_up(loaded)
+            startup_state.set_model_state(name, 'ready')
         
-        try:
-            model = WhisperModel(
-                model_name, 
-                device=device, 
-                compute_type=compute_type,
-                download_root="/app/models",  # Cache models in Docker volume
-                local_files_only=False  # Allow downloading if not cached
-            )
-        except Exception as e:
-            if compute_type == "float16" and device == "cuda":
-                logger.warning(f"Failed to load with float16: {e}, trying int8")
-                compute_type = "int8"
-                model = WhisperModel(
-                    model_name, 
-                    device=device, 
-                    compute_type=compute_type,
-                    download_root="/app/models",
-                    local_files_only=False
-                )
-            else:
-                raise e
+        if BATCH_MAX_SIZE > 1:
+            batch_scheduler = BatchScheduler(model_pool.get, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS)
         
-        logger.info(f"Faster Whisper model {model_name} loaded successfully on {device}")
+        startup_state.mark_ready()
         return True
     except Exception as e:
         logger.error(f"Failed to load model: {e}")
+        startup_state.mark_failed(e)
         return False
 
+def start_model_loading(on_failure=None):
+    """Load and warm up the model in the background so liveness probes answer during startup"""
+    def run():
+        if not load_model() and on_failure is not None:
+            on_failure()
+    
+    thread = threading.Thread(target=run, name='model-loader', daemon=True)
+    thread.start()
+    return thread
+
+def model_not_ready():
+    """Error response for requests that arrive before the model is loaded"""
+    if startup_state.failed:
+        return jsonify({'error': f"Model failed to load: {startup_state.error}"}), 500
+    response = jsonify({'error': 'Model is still loading', 'startup': startup_state.as_dict()})
+    response.headers['Retry-After'] = '5'
+    return response, 503
+
+def resolve_model_name(mode, requested=None):
+    """Pick the model for a request: an explicit model field, otherwise the mode's routed model"""
+    if requested:
+        if requested not in AVAILABLE_MODELS:
+            raise ValueError(f"Unknown model '{requested}'. Available models: {', '.join(AVAILABLE_MODELS)}")
+        if requested not in ALLOWED_MODELS:
+            raise ValueError(f"Model '{requested}' is not enabled. Allowed models: {', '.join(ALLOWED_MODELS)}")
+        return requested
+    return MODE_MODELS.get(mode, DEFAULT_MODEL)
+
+@app.before_request
+def track_request_start():
+    g.metrics_endpoint = request.endpoint or 'unknown'
+    metrics.IN_FLIGHT.labels(g.metrics_endpoint).inc()
+
+@app.after_request
+def track_request_outcome(response):
+    metrics.REQUESTS.labels(request.endpoint or 'unknown', str(response.status_code)).inc()
+    return response
+
+@app.teardown_request
+def track_request_end(exc):
+    endpoint = g.pop('metrics_endpoint', None)
+    if endpoint is not None:
+        metrics.IN_FLIGHT.labels(endpoint).dec()
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus text exposition of request, stage and model metrics"""
+    body, content_type = metrics.render_metrics()
+    return Response(body, content_type=content_type)
+
+@app.route('/health/live', methods=['GET'])
+def liveness_check():
+    """Liveness probe: the process is serving and model loading has not failed"""
+    if startup_state.failed:
+        return jsonify({'status': 'failed', 'error': startup_state.error}), 503
+    return jsonify({'status': 'alive', 'phase': startup_state.phase})
+
+@app.route('/health/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: the default and every mode-routed model are loaded and warmed up"""
+    status = startup_state.as_dict()
+    return jsonify(status), 200 if status['ready'] else 503
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    device = "cuda" if torch.cuda.is_available() else "cpu"
     return jsonify({
-        'status': 'healthy',
+        'status': 'healthy' if startup_state.ready else startup_state.phase,
         'model_loaded': model is not None,
-        'model_name': os.getenv('WHISPER_MODEL', 'small'),
+        'model_name': DEFAULT_MODEL,
         'device': device,
-        'cuda_available': torch.cuda.is_available(),
-        'faster_whisper': True
+        'cuda_available': device_info.get('cuda_available', False),
+        'device_info': device_info,
+        'startup': startup_state.as_dict(),
+        'faster_whisper': True,
+        'model_pool': model_pool.stats() if model_pool is not None else None,
+        'batching': batch_scheduler.stats() if batch_scheduler is not None else None,
+        'streaming': session_manager.stats(),
+        'event_streams': sse_listeners.stats(),
+        'vad': vad_stats.as_dict(),
+        'result_cache': result_cache.stats(),
+        'jobs': job_manager.stats(),
+        'admission': admission.stats(),
+        'language_sessions': language_sessions.stats()
     })
 
+def get_transcribe_kwargs(mode):
+    """Decoding parameters for the requested transcription mode"""
+    if mode == 'accurate':
+        return {
+            "beam_size": 5,
+            "best_of": 5,
+            "condition_on_previous_text": True,
+            "word_timestamps": False
+        }
+    # fast mode
+    return {
+        "beam_size": 1,
+        "condition_on_previous_text": False,
+        "word_timestamps": False
+    }
+
+def run_transcription(audio, language, mode, task="translate", model_name=None):
+    """Run Faster Whisper on a decoded 16 kHz float32 array and return (segments, info)
+
+    Only interactive work reaches the micro-batcher; batch-class requests use
+    transcribe_yielding, since a batch in flight cannot hand its slot over.
+    """
+    model_name = model_name or resolve_model_name(mode)
+    if batch_scheduler is not None:
+        try:
+            return batch_scheduler.submit(audio, language, mode, task, model_name).result()
+        except Exception as batch_error:
+            logger.error(f"Batched transcribe error: {batch_error}, retrying unbatched")
+    
+    model = model_pool.get(model_name)
+    language_kwargs = {} if language == 'auto' else {"language": language}
+    try:
+        segments, info = model.transcribe(audio, task=task, **language_kwargs, **get_transcribe_kwargs(mode))
+    except Exception as transcribe_error:
+        logger.error(f"Faster Whisper transcribe error: {transcribe_error}")
+        # Fallback to simpler parameters
+        segments, info = model.transcribe(audio, task=task, **language_kwargs)
+
+    # Convert generator to list first
+    return list(segments), info
+
+def iter_transcription(audio, language, mode, task="translate", model_name=None, word_timestamps=False):
+    """Like run_transcription, but returns faster-whisper's lazy segment generator
+
+    Segments are decoded as the generator is consumed, so streamed responses can
+    send each one as soon as it exists. The micro-batcher only returns complete
+    results and is bypassed.
+    """
+    model = model_pool.get(model_name or resolve_model_name(mode))
+    language_kwargs = {} if language == 'auto' else {"language": language}
+    transcribe_kwargs = dict(get_transcribe_kwargs(mode), word_timestamps=word_timestamps)
+    try:
+        return model.transcribe(audio, task=task, **language_kwargs, **transcribe_kwargs)
+    except Exception as transcribe_error:
+        logger.error(f"Faster Whisper transcribe error: {transcribe_error}")
+        return model.transcribe(audio, task=task, word_timestamps=word_timestamps, **language_kwargs)
+
+def transcribe_yielding(audio, language, mode, task, model_name, ticket, word_timestamps=False):
+    """Decode batch work segment by segment, letting waiting interactive requests take the slot in between
+
+    faster-whisper only decodes the next window when its generator is
+    consumed, so pausing between segments pauses the model work as well.
+    """
+    segments, info = iter_transcription(audio, language, mode, task=task, model_name=model_name,
+                                        word_timestamps=word_timestamps)
+    segments_list = []
+    for segment in segments:
+        segments_list.append(segment)
+        ticket.checkpoint()
+    return segments_list, info
+
+def format_segment(segment, index, speech_map=None):
+    """Convert one Faster Whisper segment to the JSON segment format
+
+    When VAD removed silence before inference, speech_map restores the
+    timestamps to the timeline of the uploaded audio.
+    """
+    def original_time(seconds):
+        return speech_map.get_original_time(seconds) if speech_map is not None else seconds
+
+    formatted = {
+        'id': index,
+        'start': original_time(getattr(segment, 'start', 0.0)),
+        'end': original_time(getattr(segment, 'end', 0.0)),
+        'text': segment.text.strip() if hasattr(segment, 'text') else str(segment)
+    }
+    words = getattr(segment, 'words', None)
+    if words:
+        formatted['words'] = [{
+            'start': original_time(word.start),
+            'end': original_time(word.end),
+            'word': word.word,
+            'probability': round(word.probability, 3)
+        } for word in words]
+    return formatted
+
+def format_segments(segments_list, speech_map=None):
+    """Convert Faster Whisper segments to the JSON segment format"""
+    return [format_segment(segment, i, speech_map) for i, segment in enumerate(segments_list)]
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+def wants_ndjson():
+    """True when the client asked for a streamed NDJSON response with its Accept header"""
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+def ndjson_response(records, headers=None):
+    return Response(
+        stream_with_context(json.dumps(record) + "\n" for record in records),
+        mimetype=NDJSON_MIMETYPE,
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no', **(headers or {})}
+    )
+
+def result_records(result):
+    """NDJSON records of an already complete /transcribe result (cache hits, skipped chunks)"""
+    for segment in result['segments']:
+        yield dict(segment, type='segment')
+    yield {
+        'type': 'summary',
+        'text': result['text'],
+        'language': result['language'],
+        'segments': len(result['segments']),
+        'model': result['model'],
+        **({'skipped': result['skipped']} if 'skipped' in result else {}),
+        **({'language_session': result['language_session']} if 'language_session' in result else {})
+    }
+
+def stream_transcription(speech_audio, speech_map, language, mode, task, model_name, word_timestamps,
+                         timings, duration_ms, language_session=None):
+    """NDJSON records for /transcribe: each segment as faster-whisper yields it, then a summary
+
+    Only the segment texts are kept for the summary; streamed results are not cached.
+    """
+    stage_start = time.perf_counter()
+    ticket = g.get('admission_ticket')
+    texts = []
+    scored_segments = []
+    first_segment_ms = None
+    try:
+        with metrics.queued(model_name):
+            segments, info = iter_transcription(speech_audio, language, mode, task=task, model_name=model_name,
+                                                word_timestamps=word_timestamps)
+            for index, segment in enumerate(segments):
+                if first_segment_ms is None:
+                    first_segment_ms = (time.perf_counter() - stage_start) * 1000
+                record = format_segment(segment, index, speech_map)
+                texts.append(record['text'])
+                if language_session is not None:
+                    scored_segments.append(segment)
+                yield dict(record, type='segment')
+                if ticket is not None:
+                    ticket.checkpoint()
+    except Exception as e:
+        logger.error(f"Streaming transcription error: {e}")
+        yield {'type': 'error', 'error': str(e)}
+        return
+    timings['inference_ms'] = (time.perf_counter() - stage_start) * 1000
+
+    detected_language = info.language if hasattr(info, 'language') else language
+    session_info = {}
+    if language_session is not None:
+        language_session.observe(mean_logprob(scored_segments))
+        session_info['language_session'] = language_session.as_dict()
+    yield {
+        'type': 'summary',
+        'text': " ".join(text for text in texts if text),
+        'language': detected_language,
+        'language_probability': getattr(info, 'language_probability', None),
+        'segments': len(texts),
+        'model': model_name,
+        'first_segment_ms': round(first_segment_ms, 1) if first_segment_ms is not None else None,
+        **session_info
+    }
+
+    timings['total_ms'] = sum(timings.values())
+    logger.info(f"Streamed transcription completed. Language: {detected_language}, Segments: {len(texts)}")
+    logger.info("Stage timings: " + ", ".join(f"{stage}={value:.1f}ms" for stage, value in timings.items()))
+    metrics.observe_stages(timings, model_name, mode)
+    metrics.observe_audio(model_name, mode, duration_ms / 1000, len(speech_audio) / SAMPLE_RATE,
+                          timings['inference_ms'] / 1000)
+
+def read_audio_upload():
+    """Read the audio of a /transcribe or /pipeline request
+
+    Containers come as a multipart 'audio' file. Raw PCM, declared by its
+    content type or an X-Audio-Format header, may also be the whole request
+    body with the other parameters in the query string. Returns (audio_bytes,
+    params, content_type, filename, pcm_format); audio_bytes is None when the
+    request holds no audio. The upload is read once per request, so admission
+    control can look it up in the result cache before the view runs.
+    """
+    if 'audio_upload' not in g:
+        g.audio_upload = _read_audio_upload()
+    return g.audio_upload
+
+def _read_audio_upload():
+    audio_format = request.headers.get('X-Audio-Format')
+    audio_file = request.files.get('audio')
+    if audio_file is not None:
+        content_type = audio_file.content_type or request.content_type or ''
+        return (audio_file.read(), request.form, content_type, audio_file.filename or 'audio',
+                pcm_sample_format(content_type, audio_format))
+    pcm_format = pcm_sample_format(request.content_type, audio_format)
+    if pcm_format is None:
+        return None, request.form, request.content_type or '', None, None
+    return request.get_data(), request.args, request.content_type or '', 'body', pcm_format
+
+def prepare_audio(audio_bytes, timings, pcm_format=None):
+    """Decode an upload and gate it with VAD, adding decode and VAD timings
+
+    Returns (duration_ms, speech_audio, speech_map); speech_audio is empty when
+    the upload holds no speech. Raw PCM is mapped without demuxing or resampling.
+    """
+    # Decode to 16 kHz mono float32 PCM
+    stage_start = time.perf_counter()
+    audio = decode_pcm_bytes(audio_bytes, pcm_format) if pcm_format else decode_audio_bytes(audio_bytes)
+    timings['decode_ms'] = (time.perf_counter() - stage_start) * 1000
+    
+    # Validate audio duration
+    duration_ms = len(audio) * 1000 / SAMPLE_RATE
+    if duration_ms < 100:  # Less than 0.1 seconds
+        raise Exception(f"Audio too short: {duration_ms:.0f}ms (minimum 100ms)")
+    
+    # Skip silent chunks and strip silence before the encoder sees it
+    stage_start = time.perf_counter()
+    speech_audio, speech_map = gate_speech(audio)
+    timings['vad_ms'] = (time.perf_counter() - stage_start) * 1000
+    return duration_ms, speech_audio, speech_map
+
+# Pinned languages of chunked sessions (X-Session-Id with language=auto)
+language_sessions = LanguageSessionStore()
+
+def language_session_id(language):
+    """Session id from X-Session-Id or a session_id field, only for language=auto"""
+    session_id = (request.headers.get('X-Session-Id') or request.form.get('session_id')
+                  or request.args.get('session_id'))
+    if language != 'auto' or not session_id:
+        return None
+    return session_id[:128]
+
+def get_language_session(language):
+    """The language session named by the request, or None"""
+    session_id = language_session_id(language)
+    return None if session_id is None else language_sessions.get(session_id)
+
+def choose_session_language(language_session, speech_audio, model_name, timings):
+    """Pinned language of the session, detecting it first when no pin is in effect"""
+    stage_start = time.perf_counter()
+    try:
+        language = language_session.choose_language(speech_audio, lambda audio: detect_language(audio, model_name))
+    except Exception as e:
+        logger.warning(f"Language detection for session {language_session.session_id} failed: {e}")
+        language = 'auto'
+    timings['language_ms'] = (time.perf_counter() - stage_start) * 1000
+    return language
+
+@functools.lru_cache(maxsize=1)
+def trusted_proxy_networks(period):
+    """TRUSTED_PROXIES as networks; hostnames are resolved again every TRUSTED_PROXY_REFRESH_SECONDS (period)"""
+    networks = []
+    for entry in TRUSTED_PROXIES:
+        try:
+            networks.append(ipaddress.ip_network(entry, strict=False))
+            continue
+        except ValueError:
+            pass
+        try:
+            addresses = {info[4][0] for info in socket.getaddrinfo(entry, None)}
+        except socket.gaierror as e:
+            logger.warning(f"Cannot resolve trusted proxy {entry}: {e}")
+            continue
+        networks.extend(ipaddress.ip_network(address) for address in addresses)
+    return networks
+
+def is_trusted_proxy(address):
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    period = int(time.monotonic() // TRUSTED_PROXY_REFRESH_SECONDS)
+    return any(ip in network for network in trusted_proxy_networks(period))
+
+def get_client_id():
+    """Key for per-client limits: the peer address, or the X-Real-IP it forwarded if it is a trusted proxy
+
+    X-Client-Id is only a label for logs; callers can set it freely, so it
+    never selects a separate allowance.
+    """
+    address = request.remote_addr or 'unknown'
+    if TRUSTED_PROXIES and is_trusted_proxy(address):
+        address = request.headers.get('X-Real-IP') or address
+    return address
+
+def client_label():
+    """Client address plus the X-Client-Id it sent, for logs"""
+    label = request.headers.get('X-Client-Id')
+    return f"{get_client_id()} ({label})" if label else get_client_id()
+
+def request_priority():
+    """Scheduling class: batch for mode=accurate, otherwise interactive
+
+    An X-Priority header or priority field can only lower the class to
+    batch; asking for interactive does not lift accurate work out of it.
+    """
+    mode = request.args.get('mode') or request.form.get('mode', 'fast')
+    priority = BATCH if mode == 'accurate' else INTERACTIVE
+    requested = (request.headers.get('X-Priority') or request.args.get('priority')
+                 or request.form.get('priority') or '').lower()
+    if requested == BATCH or (requested and requested not in PRIORITIES):
+        # Unknown classes are passed on so admission answers 400
+        return requested
+    return priority
+
+def admission_controlled(view=None, slots=None, cached=None):
+    """Run a view only once admission control grants it an inference slot
+
+    slots, when given, is called before admission and returns how many
+    inferences the request runs at once. cached, when given, returns a
+    response for requests the result cache can answer, which then skip
+    admission. Streamed responses keep their slots until the body has been sent.
+    """
+    if view is None:
+        return functools.partial(admission_controlled, slots=slots, cached=cached)
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if cached is not None and model is not None:
+            response = cached()
+            if response is not None:
+                return response
+        try:
+            deadline = parse_deadline(request.headers.get('X-Deadline-Ms'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        try:
+            ticket = admission.admit(get_client_id(), deadline, priority=request_priority(),
+                                     slots=slots() if slots is not None else 1)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except AdmissionRejected as e:
+            metrics.SHED.labels(e.reason).inc()
+            logger.info(f"Rejected request from {client_label()}: {e.reason}")
+            response = jsonify({'error': str(e), 'reason': e.reason})
+            response.status_code = 429
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response
+        except DeadlineExpired as e:
+            metrics.EXPIRED.labels('queued').inc()
+            return jsonify({'error': str(e)}), 504
+
+        g.admission_ticket = ticket
+        if deadline_expired('queued'):
+            ticket.release()
+            return jsonify({'error': 'Request deadline passed while queued'}), 504
+        try:
+            response = make_response(view(*args, **kwargs))
+        except BaseException:
+            ticket.release()
+            raise
+        if response.is_streamed:
+            response.call_on_close(ticket.release)
+        else:
+            ticket.release()
+        return response
+    return wrapper
+
+def deadline_expired(stage):
+    """True once the admitted request's X-Deadline-Ms has passed; counted under stage"""
+    ticket = g.get('admission_ticket')
+    if ticket is None or not ticket.expired(stage):
+        return False
+    metrics.EXPIRED.labels(stage).inc()
+    logger.info(f"Dropping request after {stage}: deadline passed")
+    return True
+
+def session_variant(variant, language):
+    """Results of language=auto chunks depend on the session's pinned language, so sessions never share them"""
+    session_id = language_session_id(language)
+    return variant if session_id is None else f"{variant}:session={session_id}"
+
+def transcribe_cache_key(audio_bytes, params):
+    """Result-cache key of a /transcribe upload; raises ValueError for an invalid task or model"""
+    mode = params.get('mode', 'fast')
+    task = params.get('task', 'translate')
+    if task not in WHISPER_TASKS:
+        raise ValueError(f"Unknown task '{task}'. Use 'transcribe' or 'translate'")
+    word_timestamps = params.get('word_timestamps', 'false').lower() == 'true'
+    language = params.get('language', 'auto')
+    return ResultCache.make_key(audio_digest(audio_bytes), resolve_model_name(mode, params.get('model')), mode,
+                                language, session_variant(f"{task}:words" if word_timestamps else task, language))
+
+def cached_response(cached_result, stream=False):
+    # The stored language_session is a snapshot from when the result was cached
+    if 'language_session' in cached_result:
+        language_session = get_language_session('auto')
+        if language_session is not None:
+            cached_result = dict(cached_result, language_session=language_session.as_dict())
+    response = ndjson_response(result_records(cached_result)) if stream else jsonify(cached_result)
+    response.headers['X-Cache'] = 'HIT'
+    return response
+
+def cached_upload_response(make_key, stream=False):
+    """Cached response for the request's upload, or None on a miss or an upload the view must reject"""
+    try:
+        audio_bytes, params, _, _, _ = read_audio_upload()
+        if audio_bytes is None or len(audio_bytes) < 100:
+            return None
+        cache_key = make_key(audio_bytes, params)
+        cached_result = result_cache.get(cache_key)
+    except (ValueError, PcmFormatError):
+        return None
+    if cached_result is None:
+        g.result_cache_missed = cache_key
+        return None
+    logger.info(f"Returning cached result for {len(audio_bytes)} byte upload without queueing")
+    return cached_response(cached_result, stream)
+
+def lookup_cached_result(cache_key):
+    """The view's own cache lookup; it still finds results stored while the request was queued,
+    without counting the miss already counted before admission a second time"""
+    return result_cache.get(cache_key, count_miss=g.get('result_cache_missed') != cache_key)
+
+def cached_transcription():
+    """Retried /transcribe uploads are answered from the cache without waiting for an inference slot"""
+    return cached_upload_response(transcribe_cache_key, wants_ndjson())
+
 @app.route('/transcribe', methods=['POST'])
+@admission_controlled(cached=cached_transcription)
+@profiled
 def transcribe():
     """Transcribe audio file"""
     try:
         if model is None:
-            return jsonify({'error': 'Model not loaded'}), 500
+            return model_not_ready()
+        
+        audio_file = request.files.get('audio')
+        if audio_file is not None and audio_file.filename == '':
+            return jsonify({'error': 'No audio file selected'}), 400
+        
+        timings = {}
+        stage_start = time.perf_counter()
         
-        if 'audio' not in request.files:
+        # Keep the upload in memory; the decoder reads the container (or maps raw PCM) straight from bytes
+        audio_bytes, params, content_type, original_filename, pcm_format = read_audio_upload()
+        if audio_bytes is None:
             return jsonify({'error': 'No audio file provided'}), 400
+        file_extension = f".{pcm_format}" if pcm_format else guess_audio_extension(content_type, original_filename)
+        file_size = len(audio_bytes)
+        timings['receive_ms'] = (time.perf_counter() - stage_start) * 1000
+        logger.info(f"Received audio upload: {original_filename} (type: {content_type}, format: {file_extension}, size: {file_size} bytes)")
         
-        audio_file = request.files['audio']
-        if audio_file.filename == '':
-            return jsonify({'error': 'No audio file selected'}), 400
+        # Validate file size
+        if file_size == 0:
+            raise Exception("Uploaded audio file is empty")
+        if file_size < 100:
+            raise Exception(f"Audio file too small: {file_size} bytes (minimum 100 bytes)")
         
-        # Save uploaded file temporarily with proper extension based on content type
-        original_filename = audio_file.filename or 'audio'
+        language = params.get('language', 'auto')
+        mode = params.get('mode', 'fast')
+        stream = wants_ndjson()
+        word_timestamps = params.get('word_timestamps', 'false').lower() == 'true'
+        task = params.get('task', 'translate')  # 'transcribe' keeps the source language
+        try:
+            # Retried uploads of the same audio and settings are answered from the cache
+            cache_key = transcribe_cache_key(audio_bytes, params)
+            model_name = resolve_model_name(mode, params.get('model'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        cached_result = lookup_cached_result(cache_key)
+        if cached_result is not None:
+            logger.info(f"Returning cached transcription for {file_size} byte upload")
+            return cached_response(cached_result, stream)
         
-        # Determine file extension based on content type or filename
-        content_type = request.content_type or ''
-        logger.info(f"Request content type: {content_type}")
-        logger.info(f"Original filename: {original_filename}")
+        duration_ms, speech_audio, speech_map = prepare_audio(audio_bytes, timings, pcm_format)
+        if deadline_expired('decoded'):
+            return jsonify({'error': 'Request deadline passed before inference'}), 504
+        if len(speech_audio) == 0:
+            logger.info(f"No speech in {duration_ms:.0f}ms chunk, skipping inference (vad_ms={timings['vad_ms']:.1f})")
+            result = {
+                'text': '',
+                'language': language,
+                'segments': [],
+                'model': model_name,
+                'skipped': 'no_speech'
+            }
+            result_cache.put(cache_key, result)
+            metrics.observe_stages(timings, model_name, mode)
+            metrics.observe_audio(model_name, mode, duration_ms / 1000, 0)
+            return ndjson_response(result_records(result)) if stream else jsonify(result)
         
-        if 'webm' in content_type or 'webm' in original_filename.lower():
-            file_extension = '.webm'
-        elif 'mp4' in content_type or 'mp4' in original_filename.lower():
-            file_extension = '.mp4'
-        elif 'wav' in content_type or 'wav' in original_filename.lower():
-            file_extension = '.wav'
-        elif 'ogg' in content_type or 'ogg' in original_filename.lower():
-            file_extension = '.ogg'
-        else:
-            file_extension = '.webm'  # Default to webm for browser audio
+        # Chunks of a session reuse its pinned language instead of detecting it on every clip
+        language_session = get_language_session(language)
+        if language_session is not None:
+            language = choose_session_language(language_session, speech_audio, model_name, timings)
         
-        logger.info(f"Determined file extension: {file_extension}")
+        if stream:
+            return ndjson_response(stream_transcription(speech_audio, speech_map, language, mode, task, model_name,
+                                                        word_timestamps, timings, duration_ms, language_session))
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as tmp_file:
-            audio_file.save(tmp_file.name)
-            file_size = os.path.getsize(tmp_file.name)
-            logger.info(f"Saved audio file: {tmp_file.name} (type: {content_type}, size: {file_size} bytes)")
-            
-            # Validate file size
-            if file_size == 0:
-                raise Exception("Uploaded audio file is empty")
-            if file_size < 100:
-                raise Exception(f"Audio file too small: {file_size} bytes (minimum 100 bytes)")
-            
-            # Always convert to WAV for Whisper compatibility
-            wav_file_path = tmp_file.name.replace(file_extension, '.wav')
-            try:
-                # Convert to WAV using pydub with explicit format detection
-                if file_extension.lower() == '.webm':
-                    logger.info("Converting WebM to WAV...")
-                    audio = AudioSegment.from_file(tmp_file.name, format="webm")
-                elif file_extension.lower() == '.mp4':
-                    logger.info("Converting MP4 to WAV...")
-                    audio = AudioSegment.from_file(tmp_file.name, format="mp4")
-                elif file_extension.lower() == '.ogg':
-                    logger.info("Converting OGG to WAV...")
-                    audio = AudioSegment.from_file(tmp_file.name, format="ogg")
-                else:
-                    logger.info("Auto-detecting audio format...")
-                    audio = AudioSegment.from_file(tmp_file.name)
-                
-                # Validate audio duration
-                duration_ms = len(audio)
-                if duration_ms < 100:  # Less than 0.1 seconds
-                    raise Exception(f"Audio too short: {duration_ms}ms (minimum 100ms)")
-                
-                logger.info(f"Audio duration: {duration_ms}ms, channels: {audio.channels}, frame_rate: {audio.frame_rate}")
-                
-                # Export as WAV with specific parameters for Whisper
-                audio.export(wav_file_path, format="wav", parameters=["-ac", "1", "-ar", "16000"])
-                wav_size = os.path.getsize(wav_file_path)
-                logger.info(f"Converted {file_extension} to WAV format: {wav_file_path} (size: {wav_size} bytes)")
-                
-                # Verify the converted file is valid
-                if wav_size == 0:
-                    raise Exception("Converted WAV file is empty")
-                if wav_size < 100:
-                    raise Exception(f"Converted WAV file too small: {wav_size} bytes")
-                    
-            except Exception as e:
-                logger.error(f"Could not convert audio format with pydub: {e}")
-                # Try FFmpeg directly as fallback
-                try:
-                    logger.info("Trying FFmpeg direct conversion...")
-                    ffmpeg_cmd = [
-                        'ffmpeg', '-i', tmp_file.name,
-                        '-ac', '1',  # mono
-                        '-ar', '16000',  # 16kHz sample rate
-                        '-y',  # overwrite output file
-                        wav_file_path
-                    ]
-                    result = subprocess.run(ffmpeg_cmd, capture_output=True, text=True)
-                    if result.returncode == 0:
-                        wav_size = os.path.getsize(wav_file_path)
-                        logger.info(f"FFmpeg conversion successful: {wav_file_path} (size: {wav_size} bytes)")
-                        if wav_size == 0:
-                            raise Exception("FFmpeg converted file is empty")
-                    else:
-                        logger.error(f"FFmpeg conversion failed: {result.stderr}")
-                        raise Exception(f"FFmpeg conversion failed: {result.stderr}")
-                except Exception as ffmpeg_error:
-                    logger.error(f"FFmpeg conversion also failed: {ffmpeg_error}")
-                    # Use original file as last resort only if it's already WAV
-                    if file_extension.lower() == '.wav':
-                        wav_file_path = tmp_file.name
-                        logger.info(f"Using original WAV file as last resort: {wav_file_path}")
-                    else:
-                        raise Exception(f"All audio conversion methods failed. Original error: {e}, FFmpeg error: {ffmpeg_error}")
-            
-            # Transcribe using Fast Whisper
-            language = request.form.get('language', 'auto')
-            logger.info(f"Transcribing with language: {language}")
-            mode = request.form.get('mode', 'fast')
-            
-            # Faster Whisper transcribe method with safer parameters
-            try:
-                if mode == 'accurate':
-                    transcribe_kwargs = {
-                        "beam_size": 5,
-                        "best_of": 5,
-                        "condition_on_previous_text": True,
-                        "word_timestamps": False
-                    }
-                else:  # fast mode
-                    transcribe_kwargs = {
-                        "beam_size": 1,
-                        "condition_on_previous_text": False,
-                        "word_timestamps": False
-                    }
-
-                # Handle auto vs fixed language - always translate to English
-                if language == 'auto':
-                    segments, info = model.transcribe(wav_file_path, task="translate", **transcribe_kwargs)
-                else:
-                    segments, info = model.transcribe(wav_file_path, language=language, task="translate", **transcribe_kwargs)
-            except Exception as transcribe_error:
-                logger.error(f"Faster Whisper transcribe error: {transcribe_error}")
-                # Fallback to simpler parameters - always translate to English
-                if language == 'auto':
-                    segments, info = model.transcribe(wav_file_path, task="translate")
-                else:
-                    segments, info = model.transcribe(wav_file_path, language=language, task="translate")
-            
-            # Convert generator to list first
-            segments_list = list(segments)
-            
-            # Combine segments into full text
-            full_text = " ".join([segment.text for segment in segments_list])
-            detected_language = info.language if hasattr(info, 'language') else language
-            
-            logger.info(f"Transcription segments count: {len(segments_list)}")
-            logger.info(f"Detected language: {detected_language}")
-            
-            # Convert segments to list format for compatibility
-            formatted_segments = []
-            for i, segment in enumerate(segments_list):
-                formatted_segments.append({
-                    'id': i,
-                    'start': getattr(segment, 'start', 0.0),
-                    'end': getattr(segment, 'end', 0.0),
-                    'text': segment.text.strip() if hasattr(segment, 'text') else str(segment)
-                })
-            
-            # Clean up temp files
-            os.unlink(tmp_file.name)
-            if wav_file_path != tmp_file.name and os.path.exists(wav_file_path):
-                os.unlink(wav_file_path)
-            
-            logger.info(f"Transcription completed. Language: {detected_language}, Text length: {len(full_text)}")
-            
-            return jsonify({
-                'text': full_text,
-                'language': detected_language,
-                'segments': formatted_segments
-            })
+        # Transcribe using Fast Whisper - translates to English unless task=transcribe
+        speech_ms = len(speech_audio) * 1000 / SAMPLE_RATE
+        logger.info(f"Transcribing {speech_ms:.0f}ms of speech ({duration_ms:.0f}ms uploaded) with model: {model_name}, language: {language}, mode: {mode}")
+        
+        stage_start = time.perf_counter()
+        ticket = g.get('admission_ticket')
+        with metrics.queued(model_name):
+            if ticket is not None and ticket.priority == BATCH:
+                segments_list, info = transcribe_yielding(speech_audio, language, mode, task, model_name, ticket,
+                                                          word_timestamps=word_timestamps)
+            elif word_timestamps:
+                segments, info = iter_transcription(speech_audio, language, mode, task=task, model_name=model_name,
+                                                    word_timestamps=True)
+                segments_list = list(segments)
+            else:
+                segments_list, info = run_transcription(speech_audio, language, mode, task=task, model_name=model_name)
+        timings['inference_ms'] = (time.perf_counter() - stage_start) * 1000
+        
+        # Combine segments into full text
+        full_text = " ".join([segment.text for segment in segments_list])
+        detected_language = info.language if hasattr(info, 'language') else language
+        formatted_segments = format_segments(segments_list, speech_map)
+        
+        result = {
+            'text': full_text,
+            'language': detected_language,
+            'segments': formatted_segments,
+            'model': model_name
+        }
+        if language_session is not None:
+            language_session.observe(mean_logprob(segments_list))
+            result['language_session'] = language_session.as_dict()
+        result_cache.put(cache_key, result)
+        
+        stage_start = time.perf_counter()
+        response = jsonify(result)
+        timings['serialize_ms'] = (time.perf_counter() - stage_start) * 1000
+        
+        timings['total_ms'] = sum(timings.values())
+        logger.info(f"Transcription completed. Language: {detected_language}, Segments: {len(segments_list)}, Text length: {len(full_text)}")
+        logger.info("Stage timings: " + ", ".join(f"{stage}={value:.1f}ms" for stage, value in timings.items()))
+        metrics.observe_stages(timings, model_name, mode)
+        metrics.observe_audio(model_name, mode, duration_ms / 1000, speech_ms / 1000, timings['inference_ms'] / 1000)
+        return response
             
+    except PcmFormatError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Transcription error: {e}")
         logger.error(f"Error type: {type(e).__name__}")
@@ -278,44 +825,430 @@ def transcribe():
         logger.error(f"Traceback: {traceback.format_exc()}")
         return jsonify({'error': str(e)}), 500
 
+def whisper_stage(speech_audio, speech_map, language, mode, task, model_name, ticket=None):
+    """Run one Whisper task for /pipeline; returns (result, inference milliseconds)
+
+    Batch-class requests decode segment by segment and yield their slots in
+    between, bypassing the micro-batcher, which cannot pause a batch.
+    """
+    stage_start = time.perf_counter()
+    with metrics.queued(model_name):
+        if ticket is not None and ticket.priority == BATCH:
+            segments_list, info = transcribe_yielding(speech_audio, language, mode, task, model_name, ticket)
+        else:
+            segments_list, info = run_transcription(speech_audio, language, mode, task=task, model_name=model_name)
+    return {
+        'text': " ".join(segment.text.strip() for segment in segments_list).strip(),
+        'language': getattr(info, 'language', language),
+        'language_probability': getattr(info, 'language_probability', None),
+        'logprob': mean_logprob(segments_list),
+        'segments': format_segments(segments_list, speech_map)
+    }, (time.perf_counter() - stage_start) * 1000
+
+PIPELINE_WHISPER_TRANSLATION = ('true', 'false', 'fallback')
+
+def pipeline_cache_key(audio_bytes, params):
+    """Result-cache key of a /pipeline upload; raises ValueError for invalid fields"""
+    mode = params.get('mode', 'fast')
+    target_language = params.get('target_language', 'en')
+    # Whisper translates only into English and the MarianMT model is opus-mt-mul-en
+    if target_language != 'en':
+        raise ValueError(f"Unsupported target_language '{target_language}'. Only 'en' is supported")
+    whisper_translation = params.get('whisper_translation', 'true').lower()
+    if whisper_translation not in PIPELINE_WHISPER_TRANSLATION:
+        raise ValueError(f"Unknown whisper_translation '{whisper_translation}'. "
+                         f"Use {', '.join(PIPELINE_WHISPER_TRANSLATION)}")
+    use_marian = params.get('marian', 'true').lower() == 'true' and translation_client.enabled
+    language = params.get('language', 'auto')
+    return ResultCache.make_key(audio_digest(audio_bytes), resolve_model_name(mode, params.get('model')), mode,
+                                language, session_variant(f"pipeline:{target_language}:{use_marian}:{whisper_translation}",
+                                                          language))
+
+def cached_pipeline():
+    """Retried /pipeline uploads are answered from the cache without waiting for inference slots"""
+    return cached_upload_response(pipeline_cache_key)
+
+def pipeline_slots():
+    """/pipeline holds a second slot while Whisper's translate pass decodes next to the transcription
+
+    Batch work runs its two passes one after the other, yielding its single
+    slot between segments, so no pass decodes while the slot is handed over.
+    """
+    if request_priority() == BATCH:
+        return 1
+    whisper_translation = request.args.get('whisper_translation') or request.form.get('whisper_translation', 'true')
+    language = request.args.get('language') or request.form.get('language', 'auto')
+    return 2 if whisper_translation.lower() == 'true' and language != 'en' else 1
+
+@app.route('/pipeline', methods=['POST'])
+@admission_controlled(slots=pipeline_slots, cached=cached_pipeline)
+@profiled
+def transcribe_pipeline():
+    """Native transcript, Whisper's English translation and an optional MarianMT translation in one request
+
+    whisper_translation=true runs Whisper's translate pass next to the
+    transcription, false skips it and fallback runs it only when MarianMT
+    gives no translation.
+    """
+    try:
+        if model is None:
+            return model_not_ready()
+        
+        timings = {}
+        stage_start = time.perf_counter()
+        audio_bytes, params, _, _, pcm_format = read_audio_upload()
+        if audio_bytes is None:
+            return jsonify({'error': 'No audio file provided'}), 400
+        timings['receive_ms'] = (time.perf_counter() - stage_start) * 1000
+        if len(audio_bytes) < 100:
+            return jsonify({'error': f"Audio file too small: {len(audio_bytes)} bytes (minimum 100 bytes)"}), 400
+        
+        language = params.get('language', 'auto')
+        mode = params.get('mode', 'fast')
+        target_language = params.get('target_language', 'en')
+        use_marian = params.get('marian', 'true').lower() == 'true' and translation_client.enabled
+        whisper_translation = params.get('whisper_translation', 'true').lower()
+        try:
+            cache_key = pipeline_cache_key(audio_bytes, params)
+            model_name = resolve_model_name(mode, params.get('model'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        cached_result = lookup_cached_result(cache_key)
+        if cached_result is not None:
+            return cached_response(cached_result)
+        
+        duration_ms, speech_audio, speech_map = prepare_audio(audio_bytes, timings, pcm_format)
+        if deadline_expired('decoded'):
+            return jsonify({'error': 'Request deadline passed before inference'}), 504
+        result = {
+            'language': language,
+            'language_probability': None,
+            'transcript': {'text': '', 'segments': []},
+            'whisper_translation': None,
+            'marian_translation': None,
+            'model': model_name
+        }
+        if len(speech_audio) == 0:
+            result['skipped'] = 'no_speech'
+            result_cache.put(cache_key, result)
+            metrics.observe_stages(timings, model_name, mode)
+            metrics.observe_audio(model_name, mode, duration_ms / 1000, 0)
+            return jsonify(result)
+        
+        language_session = get_language_session(language)
+        if language_session is not None:
+            language = choose_session_language(language_session, speech_audio, model_name, timings)
+        
+        # Whisper's translate pass decodes on another thread while this one transcribes, but only under
+        # the request's own second slot; batch work, or a request capped at one slot, runs it afterwards
+        pipeline_start = time.perf_counter()
+        ticket = g.get('admission_ticket')
+        translate_now = whisper_translation == 'true' and language != 'en'
+        translate_future = None
+        if translate_now and ticket is not None and ticket.slots >= 2:
+            translate_future = pipeline_executor.submit(
+                whisper_stage, speech_audio, speech_map, language, mode, 'translate', model_name, ticket)
+        transcript, timings['transcribe_ms'] = whisper_stage(
+            speech_audio, speech_map, language, mode, 'transcribe', model_name, ticket)
+        detected_language = transcript.pop('language')
+        result['language'] = detected_language
+        result['language_probability'] = transcript.pop('language_probability')
+        logprob = transcript.pop('logprob')
+        result['transcript'] = transcript
+        if language_session is not None:
+            language_session.observe(logprob)
+            result['language_session'] = language_session.as_dict()
+        
+        # MarianMT translates the native segments while Whisper's translation is still decoding
+        if use_marian and detected_language != target_language and transcript['segments']:
+            stage_start = time.perf_counter()
+            try:
+                translated = translation_client.translate_batch(
+                    [segment['text'] for segment in transcript['segments']], detected_language, target_language)
+                result['marian_translation'] = {
+                    'text': " ".join(text for text in translated if text),
+                    'segments': [dict(segment, text=text) for segment, text in zip(transcript['segments'], translated)]
+                }
+            except TranslationServiceError as e:
+                logger.warning(f"Pipeline MarianMT stage failed: {e}")
+                result['marian_translation'] = {'error': str(e)}
+            timings['marian_ms'] = (time.perf_counter() - stage_start) * 1000
+        
+        whisper_translated = None
+        marian_failed = result['marian_translation'] is None or 'error' in result['marian_translation']
+        if translate_future is not None:
+            whisper_translated, timings['translate_ms'] = translate_future.result()
+        elif detected_language == target_language:
+            result['whisper_translation'] = dict(transcript)
+        elif (translate_now or whisper_translation == 'fallback' and marian_failed) and transcript['segments']:
+            whisper_translated, timings['translate_ms'] = whisper_stage(
+                speech_audio, speech_map, detected_language, mode, 'translate', model_name, ticket)
+        if whisper_translated is not None:
+            result['whisper_translation'] = {'text': whisper_translated['text'], 'segments': whisper_translated['segments']}
+        timings['pipeline_ms'] = (time.perf_counter() - pipeline_start) * 1000
+        
+        if not (result['marian_translation'] or {}).get('error'):
+            result_cache.put(cache_key, result)
+        
+        stage_start = time.perf_counter()
+        response = jsonify(result)
+        timings['serialize_ms'] = (time.perf_counter() - stage_start) * 1000
+        
+        logger.info("Pipeline stage timings: " + ", ".join(f"{stage}={value:.1f}ms" for stage, value in timings.items()))
+        metrics.observe_stages(timings, model_name, mode)
+        metrics.observe_audio(model_name, mode, duration_ms / 1000, len(speech_audio) / SAMPLE_RATE,
+                              timings['pipeline_ms'] / 1000)
+        return response
+    
+    except PcmFormatError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Pipeline error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+def transcribe_stream_buffer(audio, language, mode, task, initial_prompt):
+    """Transcribe a streaming session's unconfirmed tail with word timestamps"""
+    transcribe_kwargs = dict(get_transcribe_kwargs(mode), word_timestamps=True, condition_on_previous_text=False)
+    language_kwargs = {} if language == 'auto' else {"language": language}
+    model = model_pool.get(resolve_model_name(mode))
+    ticket = admission.admit('streaming', priority=INTERACTIVE, limits=False)
+    try:
+        segments, info = model.transcribe(audio, task=task, initial_prompt=initial_prompt or None,
+                                          **language_kwargs, **transcribe_kwargs)
+        return list(segments), info
+    finally:
+        ticket.release()
+
+session_manager = SessionManager(transcribe_stream_buffer)
+sse_listeners = ListenerLimit()
+
+def get_session_id():
+    """Read the session id from the X-Session-Id header, query string, form or JSON body"""
+    data = request.get_json(silent=True) or {}
+    return (request.headers.get('X-Session-Id') or request.args.get('session_id')
+            or request.form.get('session_id') or data.get('session_id'))
+
+@app.errorhandler(SessionError)
+def handle_session_error(e):
+    status = 503 if isinstance(e, SessionLimitError) else 404
+    return jsonify({'error': str(e)}), status
+
+@app.errorhandler(ListenerLimitError)
+def handle_listener_limit(e):
+    return jsonify({'error': str(e)}), 503
+
+@app.route('/start', methods=['POST'])
+def start_session():
+    """Start a streaming transcription session"""
+    if model is None:
+        return model_not_ready()
+    
+    data = request.get_json(silent=True) or {}
+    session = session_manager.create(
+        session_id=get_session_id(),
+        language=data.get('language', 'auto'),
+        mode=data.get('mode', 'fast'),
+        task=data.get('task', 'translate')
+    )
+    return jsonify({'status': 'started', **session.summary()})
+
+@app.route('/audio', methods=['POST'])
+def stream_audio():
+    """Append an audio frame to a streaming session"""
+    if model is None:
+        return model_not_ready()
+    
+    try:
+        session_id = get_session_id()
+        if not session_id:
+            return jsonify({'error': 'No session_id provided'}), 400
+        
+        # Frames come either as a multipart 'audio' file or as the raw request body
+        audio_file = request.files.get('audio')
+        data = audio_file.read() if audio_file is not None else request.get_data()
+        if not data:
+            return jsonify({'error': 'No audio data provided'}), 400
+        
+        session, final_events = session_manager.add_frame(session_id, data)
+        return jsonify({**session.summary(), 'final': final_events})
+    
+    except SessionError:
+        raise
+    except Exception as e:
+        logger.error(f"Streaming audio error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/stop', methods=['POST'])
+def stop_session():
+    """Flush and close a streaming session"""
+    session_id = get_session_id()
+    if not session_id:
+        return jsonify({'error': 'No session_id provided'}), 400
+    
+    session = session_manager.stop(session_id)
+    return jsonify({'status': 'stopped', **session.summary(), 'transcriptions': session.transcriptions})
+
+@app.route('/stream', methods=['GET'])
+def stream_events():
+    """Server-Sent Events stream of partial and final segments for a session"""
+    session = session_manager.get(get_session_id())
+    return Response(
+        stream_with_context(sse_listeners.open(session.events())),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/transcriptions', methods=['GET'])
+def list_transcriptions():
+    """Confirmed segments of a session, optionally only those after ?since=<timestamp ms>"""
+    session = session_manager.get(get_session_id())
+    since = request.args.get('since', type=int)
+    transcriptions = [t for t in session.transcriptions if since is None or t['timestamp'] > since]
+    return jsonify({'session_id': session.session_id, 'transcriptions': transcriptions})
+
+@app.route('/latest', methods=['GET'])
+def latest_transcription():
+    """Most recent confirmed segment of a session"""
+    session = session_manager.get(get_session_id())
+    if not session.transcriptions:
+        return jsonify({'message': 'No transcriptions yet'})
+    return jsonify(session.transcriptions[-1])
+
+@app.route('/clear', methods=['POST'])
+def clear_transcriptions():
+    """Forget the confirmed segments kept for a session"""
+    session = session_manager.get(get_session_id())
+    session.transcriptions = []
+    return jsonify({'status': 'cleared', 'session_id': session.session_id})
+
+def detect_language(audio, model_name):
+    """Detect the spoken language of decoded audio; returns (language, probability)"""
+    language, probability, _ = model_pool.get(model_name).detect_language(audio)
+    return language, probability
+
+def transcribe_job_piece(audio, language, mode, task, model_name):
+    """Job pieces are batch work: queued behind live requests and yielding between segments"""
+    ticket = admission.admit('jobs', priority=BATCH, limits=False)
+    try:
+        with metrics.queued(model_name):
+            return transcribe_yielding(audio, language, mode, task, model_name, ticket)
+    finally:
+        ticket.release()
+
+job_manager = JobManager(transcribe_job_piece, detect_language)
+
+@app.errorhandler(JobNotFoundError)
+def handle_job_not_found(e):
+    return jsonify({'error': str(e)}), 404
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Queue a long recording for asynchronous transcription and return its job id"""
+    if model is None:
+        return model_not_ready()
+    
+    # Recordings come either as a multipart 'audio' file or as the raw request body
+    audio_file = request.files.get('audio')
+    data = audio_file.read() if audio_file is not None else request.get_data()
+    if len(data) < 100:
+        return jsonify({'error': 'No audio data provided'}), 400
+    if len(data) > JOB_MAX_UPLOAD_MB * 1024 * 1024:
+        return jsonify({'error': f"Recording too large: {len(data)} bytes (maximum {JOB_MAX_UPLOAD_MB:.0f} MB)"}), 413
+    
+    params = request.form if audio_file is not None else request.args
+    mode = params.get('mode', 'accurate')
+    task = params.get('task', 'translate')
+    if task not in WHISPER_TASKS:
+        return jsonify({'error': f"Unknown task '{task}'. Use 'transcribe' or 'translate'"}), 400
+    try:
+        model_name = resolve_model_name(mode, params.get('model'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    job = job_manager.submit(data, params.get('language', 'auto'), mode, task, model_name)
+    return jsonify({
+        **job.status_dict(),
+        'status_url': f"/jobs/{job.job_id}",
+        'events_url': f"/jobs/{job.job_id}/events",
+        'result_url': f"/jobs/{job.job_id}/result"
+    }), 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Progress of a job"""
+    return jsonify(job_manager.get(job_id).status_dict())
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def delete_job(job_id):
+    """Delete a finished job and its stored result"""
+    if not job_manager.delete(job_id):
+        return jsonify({'error': 'Job is still running'}), 409
+    return jsonify({'status': 'deleted', 'job_id': job_id})
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    """Stitched transcription of a completed job"""
+    result = job_manager.result(job_id)
+    if result is None:
+        return jsonify({'error': 'Job has not completed', **job_manager.get(job_id).status_dict()}), 409
+    return jsonify(result)
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """Server-Sent Events stream of a job's progress, including each piece's segments as it finishes"""
+    job = job_manager.get(job_id)
+    return Response(
+        stream_with_context(sse_listeners.open(job.events())),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/models', methods=['GET'])
 def list_models():
     """List available Whisper models"""
-    available_models = ['tiny', 'tiny.en', 'base', 'base.en', 'small', 'small.en', 'medium', 'medium.en', 'large', 'large-v2', 'large-v3']
     return jsonify({
-        'models': available_models,
-        'current_model': os.getenv('WHISPER_MODEL', 'small'),
+        'models': AVAILABLE_MODELS,
+        'allowed_models': ALLOWED_MODELS,
+        'current_model': DEFAULT_MODEL,
+        'mode_models': MODE_MODELS,
+        'loaded_models': model_pool.stats()['loaded'] if model_pool is not None else {},
         'faster_whisper': True,
-        'cuda_available': torch.cuda.is_available()
+        'cuda_available': device_info.get('cuda_available', False)
     })
 
 @app.route('/test', methods=['GET'])
 def test_endpoint():
     """Test endpoint for debugging"""
-    device = "cuda" if torch.cuda.is_available() else "cpu"
     return jsonify({
         'status': 'ok',
         'model_loaded': model is not None,
-        'model_name': os.getenv('WHISPER_MODEL', 'small'),
+        'model_name': DEFAULT_MODEL,
         'device': device,
-        'cuda_available': torch.cuda.is_available(),
+        'cuda_available': device_info.get('cuda_available', False),
         'faster_whisper': True,
         'ffmpeg_available': True
     })
 
 if __name__ == '__main__':
-    # Load model on startup
-    if load_model():
-        logger.info("Starting Whisper service on port 9000")
-        # Run with SSL support if certificates are available
-        ssl_context = None
-        if os.path.exists('/app/ssl/server.crt') and os.path.exists('/app/ssl/server.key'):
-            ssl_context = ('/app/ssl/server.crt', '/app/ssl/server.key')
-            logger.info("SSL certificates found, enabling HTTPS")
-        else:
-            logger.info("No SSL certificates found, running HTTP only")
-        
-        app.run(host='0.0.0.0', port=9000, debug=False, ssl_context=ssl_context)
-    else:
+    # Multi-worker production serving; each gunicorn worker loads its own model (see gunicorn.conf.py)
+    if os.getenv('WHISPER_SERVER', 'flask') == 'gunicorn':
+        logger.info("Starting Whisper service with gunicorn")
+        os.execvp('gunicorn', ['gunicorn', '--config', 'gunicorn.conf.py', 'app:app'])
+    
+    # Load model in the background; /health/ready reports when it is warmed up
+    def exit_on_failure():
         logger.error("Failed to load model. Exiting.")
-        exit(1)
+        os._exit(1)
+    
+    start_model_loading(on_failure=exit_on_failure)
+    
+    logger.info("Starting Whisper service on port 9000")
+    # Run with SSL support if certificates are available
+    ssl_context = None
+    if os.path.exists('/app/ssl/server.crt') and os.path.exists('/app/ssl/server.key'):
+        ssl_context = ('/app/ssl/server.crt', '/app/ssl/server.key')
+        logger.info("SSL certificates found, enabling HTTPS")
+    else:
+        logger.info("No SSL certificates found, running HTTP only")
+    
+    app.run(host='0.0.0.0', port=9000, debug=False, ssl_context=ssl_context)
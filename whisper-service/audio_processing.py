@@ -0,0 +1,234 @@
+"""
+Audio processing helpers for the Whisper service
+Decodes uploaded audio bytes straight into 16 kHz mono float32 NumPy arrays
+and gates them with voice activity detection before inference
+"""
+
+import io
+import os
+import logging
+import threading
+import subprocess
+
+import numpy as np
+from faster_whisper.audio import decode_audio
+from faster_whisper.vad import SpeechTimestampsMap, VadOptions, get_speech_timestamps
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+# 'pyav' decodes in-process (bundled FFmpeg libraries), 'ffmpeg' pipes through the CLI
+AUDIO_DECODER = os.getenv('AUDIO_DECODER', 'pyav')
+
+# Voice activity gating applied to decoded PCM before the model sees it
+VAD_ENABLED = os.getenv('VAD_ENABLED', 'true').lower() == 'true'
+VAD_ENERGY_THRESHOLD_DB = float(os.getenv('VAD_ENERGY_THRESHOLD_DB', '-60'))  # below this RMS the chunk is silent
+VAD_THRESHOLD = float(os.getenv('VAD_THRESHOLD', '0.5'))  # Silero speech probability
+VAD_MIN_SPEECH_MS = int(os.getenv('VAD_MIN_SPEECH_MS', '250'))
+VAD_MIN_SILENCE_MS = int(os.getenv('VAD_MIN_SILENCE_MS', '500'))  # internal silences longer than this are dropped
+VAD_SPEECH_PAD_MS = int(os.getenv('VAD_SPEECH_PAD_MS', '200'))
+
+
+# Raw PCM uploads (16 kHz mono, little-endian) skip container demuxing and resampling
+PCM_SAMPLE_FORMATS = {'s16le': np.dtype('<i2'), 'f32le': np.dtype('<f4')}
+PCM_MAX_SECONDS = float(os.getenv('PCM_MAX_SECONDS', '600'))
+PCM_FLOAT_PEAK_LIMIT = 2.0  # float32 samples beyond this are not normalized audio (likely int16 sent as float)
+
+
+class AudioDecodeError(Exception):
+    """Raised when uploaded audio cannot be decoded by any decoder"""
+
+
+class PcmFormatError(AudioDecodeError):
+    """Raised when a raw PCM upload is declared or shaped incorrectly"""
+
+
+def guess_audio_extension(content_type, filename):
+    """Guess the container extension from the request content type or filename"""
+    content_type = content_type or ''
+    filename = (filename or '').lower()
+    for extension in ('webm', 'mp4', 'wav', 'ogg'):
+        if extension in content_type or extension in filename:
+            return f'.{extension}'
+    return '.webm'  # Default to webm for browser audio
+
+
+def pcm_sample_format(content_type, audio_format=None):
+    """Sample format of a raw PCM upload, or None for container formats
+
+    PCM is declared either by an X-Audio-Format header value (s16le, f32le,
+    optionally prefixed with pcm_) or by a content type such as
+    audio/pcm;format=f32le;rate=16000;channels=1. Only 16 kHz mono is accepted.
+    """
+    params = {}
+    media_type, *options = (content_type or '').split(';')
+    for option in options:
+        name, _, value = option.partition('=')
+        params[name.strip().lower()] = value.strip().strip('"').lower()
+
+    if audio_format:
+        sample_format = audio_format.strip().lower()
+        sample_format = sample_format[4:] if sample_format.startswith('pcm_') else sample_format
+    elif media_type.strip().lower() in ('audio/pcm', 'audio/x-pcm', 'audio/raw'):
+        sample_format = params.get('format', 's16le')
+    else:
+        return None
+
+    if sample_format not in PCM_SAMPLE_FORMATS:
+        raise PcmFormatError(f"Unsupported PCM sample format '{sample_format}'. Use s16le or f32le")
+    if params.get('rate', str(SAMPLE_RATE)) != str(SAMPLE_RATE):
+        raise PcmFormatError(f"Raw PCM must be sampled at {SAMPLE_RATE} Hz, got {params['rate']}")
+    if params.get('channels', '1') != '1':
+        raise PcmFormatError(f"Raw PCM must be mono, got {params['channels']} channels")
+    return sample_format
+
+
+def decode_pcm_bytes(data, sample_format):
+    """Map raw 16 kHz mono PCM onto a float32 array
+
+    f32le payloads are returned as a read-only view of data without copying;
+    s16le payloads are converted (and scaled) in a single pass.
+    """
+    dtype = PCM_SAMPLE_FORMATS[sample_format]
+    if len(data) % dtype.itemsize:
+        raise PcmFormatError(f"PCM payload of {len(data)} bytes is not a whole number of {sample_format} samples")
+    samples = np.frombuffer(data, dtype=dtype)
+    if samples.size == 0:
+        raise PcmFormatError("PCM payload is empty")
+    if samples.size > PCM_MAX_SECONDS * SAMPLE_RATE:
+        raise PcmFormatError(f"PCM payload of {samples.size / SAMPLE_RATE:.0f}s exceeds {PCM_MAX_SECONDS:.0f}s")
+
+    if sample_format == 's16le':
+        audio = samples.astype(np.float32)
+        audio *= 1 / 32768
+        return audio
+
+    peak = max(float(samples.max()), -float(samples.min()))
+    if not np.isfinite(peak) or peak > PCM_FLOAT_PEAK_LIMIT:
+        raise PcmFormatError(f"f32le samples must be finite and within [-1, 1] (peak {peak}); "
+                             f"was the audio sent as s16le?")
+    # A no-op on little-endian hosts
+    return samples.astype(np.float32, copy=False)
+
+
+def decode_with_pyav(data):
+    """Decode audio bytes in-process with PyAV"""
+    return decode_audio(io.BytesIO(data), sampling_rate=SAMPLE_RATE)
+
+
+def decode_with_ffmpeg(data):
+    """Decode audio bytes with a single ffmpeg process reading stdin and writing raw float32 to stdout"""
+    ffmpeg_cmd = [
+        'ffmpeg', '-nostdin', '-hide_banner', '-loglevel', 'error',
+        '-i', 'pipe:0',
+        '-f', 'f32le',  # raw little-endian float32 samples
+        '-ac', '1',  # mono
+        '-ar', str(SAMPLE_RATE),  # 16kHz sample rate
+        'pipe:1'
+    ]
+    result = subprocess.run(ffmpeg_cmd, input=data, capture_output=True)
+    if result.returncode != 0:
+        raise AudioDecodeError(f"FFmpeg decode failed: {result.stderr.decode(errors='replace').strip()}")
+    return np.frombuffer(result.stdout, dtype=np.float32)
+
+
+def decode_audio_bytes(data):
+    """Decode an uploaded audio payload into a 16 kHz mono float32 array without touching disk"""
+    decoders = [('pyav', decode_with_pyav), ('ffmpeg', decode_with_ffmpeg)]
+    if AUDIO_DECODER == 'ffmpeg':
+        decoders.reverse()
+
+    errors = []
+    for name, decoder in decoders:
+        try:
+            audio = decoder(data)
+            if audio.size == 0:
+                raise AudioDecodeError("Decoded audio is empty")
+            return audio
+        except Exception as e:
+            logger.warning(f"Could not decode audio with {name}: {e}")
+            errors.append(f"{name}: {e}")
+
+    raise AudioDecodeError(f"All audio decoders failed. {'; '.join(errors)}")
+
+
+class VadStats:
+    """Thread-safe counters for skipped and trimmed audio"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.chunks_total = 0
+        self.chunks_skipped = 0
+        self.audio_seconds = 0.0
+        self.skipped_seconds = 0.0
+        self.trimmed_seconds = 0.0
+
+    def record(self, duration, speech_duration):
+        with self._lock:
+            self.chunks_total += 1
+            self.audio_seconds += duration
+            if speech_duration == 0:
+                self.chunks_skipped += 1
+                self.skipped_seconds += duration
+            else:
+                self.trimmed_seconds += duration - speech_duration
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'enabled': VAD_ENABLED,
+                'chunks_total': self.chunks_total,
+                'chunks_skipped': self.chunks_skipped,
+                'audio_seconds': round(self.audio_seconds, 3),
+                'skipped_seconds': round(self.skipped_seconds, 3),
+                'trimmed_seconds': round(self.trimmed_seconds, 3)
+            }
+
+
+vad_stats = VadStats()
+
+
+def rms_dbfs(audio):
+    """Root-mean-square level of a float32 signal in dB relative to full scale"""
+    rms = np.sqrt(np.mean(np.square(audio, dtype=np.float64)))
+    return 20 * np.log10(max(rms, 1e-10))
+
+
+def find_speech(audio):
+    """Speech regions of a 16 kHz signal as [{'start': sample, 'end': sample}, ...]"""
+    vad_options = VadOptions(
+        threshold=VAD_THRESHOLD,
+        min_speech_duration_ms=VAD_MIN_SPEECH_MS,
+        min_silence_duration_ms=VAD_MIN_SILENCE_MS,
+        speech_pad_ms=VAD_SPEECH_PAD_MS
+    )
+    return get_speech_timestamps(audio, vad_options)
+
+
+def gate_speech(audio):
+    """Strip silence from decoded PCM before inference
+
+    Returns (speech_audio, speech_map). speech_audio is empty when the chunk holds
+    no speech; speech_map converts timestamps in speech_audio back to the original
+    timeline and is None when nothing was removed.
+    """
+    duration = len(audio) / SAMPLE_RATE
+    if not VAD_ENABLED:
+        return audio, None
+
+    # Cheap energy check first so digital silence never reaches the VAD model
+    if rms_dbfs(audio) < VAD_ENERGY_THRESHOLD_DB:
+        vad_stats.record(duration, 0)
+        return audio[:0], None
+
+    speech_chunks = find_speech(audio)
+    if not speech_chunks:
+        vad_stats.record(duration, 0)
+        return audio[:0], None
+
+    speech_audio = np.concatenate([audio[chunk['start']:chunk['end']] for chunk in speech_chunks])
+    vad_stats.record(duration, len(speech_audio) / SAMPLE_RATE)
+    if len(speech_audio) == len(audio):
+        return audio, None
+    return speech_audio, SpeechTimestampsMap(speech_chunks, SAMPLE_RATE)
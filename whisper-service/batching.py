@@ -0,0 +1,202 @@
+"""
+Dynamic micro-batching for the Whisper service
+Collects concurrent transcription requests for a short window and runs them
+together through faster-whisper's BatchedInferencePipeline
+"""
+
+import time
+import logging
+import threading
+import dataclasses
+from collections import defaultdict, deque, namedtuple
+from concurrent.futures import Future
+
+import numpy as np
+from faster_whisper import BatchedInferencePipeline
+from faster_whisper.audio import pad_or_trim
+
+from audio_processing import SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+# Whisper decodes at most 30 seconds of audio per window
+MAX_CLIP_SECONDS = 30
+
+BatchInfo = namedtuple('BatchInfo', ['language', 'language_probability', 'duration', 'batch_size'])
+
+
+class BatchRequest:
+    """A single transcription request waiting in the batch queue"""
+
+    def __init__(self, audio, language, mode, task, model_name):
+        self.audio = audio
+        self.language = language
+        self.mode = mode
+        self.task = task
+        self.model_name = model_name
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+
+    @property
+    def key(self):
+        # Requests only share a batch when their decoding settings match
+        return (self.model_name, self.mode, self.language, self.task)
+
+
+class BatchScheduler:
+    """Queue requests per (model, mode, language, task) and flush them as batches from a worker thread"""
+
+    def __init__(self, get_model, max_batch_size=8, max_wait_ms=50):
+        self.get_model = get_model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queues = {}
+        self._cond = threading.Condition()
+        self._stats = {'batches': 0, 'requests': 0, 'largest_batch': 0}
+        self._worker = threading.Thread(target=self._run, name='batch-scheduler', daemon=True)
+        self._worker.start()
+        logger.info(f"Batch scheduler started (max_batch_size={max_batch_size}, max_wait_ms={max_wait_ms})")
+
+    def submit(self, audio, language, mode, task, model_name):
+        """Queue a decoded 16 kHz float32 array and return a Future resolving to (segments, info)"""
+        batch_request = BatchRequest(audio, language, mode, task, model_name)
+        with self._cond:
+            self._queues.setdefault(batch_request.key, deque()).append(batch_request)
+            self._cond.notify()
+        return batch_request.future
+
+    def stats(self):
+        """Batching counters for the health endpoint"""
+        with self._cond:
+            pending = sum(len(queue) for queue in self._queues.values())
+            stats = dict(self._stats, pending=pending)
+        stats['average_batch_size'] = round(stats['requests'] / stats['batches'], 2) if stats['batches'] else 0.0
+        return stats
+
+    def _next_batch(self):
+        """Block until a batch is full or the oldest request has waited max_wait"""
+        with self._cond:
+            while True:
+                ready = [(queue[0].enqueued_at, key) for key, queue in self._queues.items() if queue]
+                if not ready:
+                    self._cond.wait()
+                    continue
+
+                oldest, key = min(ready)
+                queue = self._queues[key]
+                remaining = oldest + self.max_wait - time.monotonic()
+                if len(queue) >= self.max_batch_size or remaining <= 0:
+                    batch = [queue.popleft() for _ in range(min(len(queue), self.max_batch_size))]
+                    if not queue:
+                        del self._queues[key]
+                    return key, batch
+                self._cond.wait(remaining)
+
+    def _run(self):
+        while True:
+            key, batch = self._next_batch()
+            batch = [batch_request for batch_request in batch if batch_request.future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                self._run_batch(key, batch)
+            except Exception as e:
+                logger.error(f"Batch of {len(batch)} failed: {e}")
+                for batch_request in batch:
+                    if not batch_request.future.done():
+                        batch_request.future.set_exception(e)
+
+    def _run_batch(self, key, batch):
+        model_name, mode, language, task = key
+        start = time.perf_counter()
+        model = self.get_model(model_name)
+
+        if language == 'auto':
+            detected = self._detect_languages(model, batch)
+        else:
+            detected = [(language, 1.0)] * len(batch)
+
+        # Auto-detected requests are decoded in sub-batches that share a detected language
+        groups = {}
+        for batch_request, (request_language, probability) in zip(batch, detected):
+            groups.setdefault(request_language, []).append((batch_request, probability))
+
+        for request_language, group in groups.items():
+            self._transcribe_group(model, group, request_language, mode, task)
+
+        with self._cond:
+            self._stats['batches'] += 1
+            self._stats['requests'] += len(batch)
+            self._stats['largest_batch'] = max(self._stats['largest_batch'], len(batch))
+        logger.info(f"Batch of {len(batch)} ({model_name}, {mode}, {language}, {task}) finished in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    def _detect_languages(self, model, batch):
+        """Detect the language of every request with a single batched encoder pass"""
+        feature_extractor = model.feature_extractor
+        features = np.stack([
+            pad_or_trim(feature_extractor(batch_request.audio[:feature_extractor.n_samples]))
+            for batch_request in batch
+        ])
+        encoder_output = model.encode(features)
+        results = model.model.detect_language(encoder_output)
+        # Language tokens look like '<|gu|>'
+        return [(token_probs[0][0][2:-2], token_probs[0][1]) for token_probs in results]
+
+    def _transcribe_group(self, model, group, language, mode, task):
+        """Concatenate the group's audio and decode every <=30s clip in one batched pipeline call"""
+        clips = []
+        clips_by_frame = defaultdict(list)
+        offset = 0
+        for index, (batch_request, _) in enumerate(group):
+            duration = len(batch_request.audio) / SAMPLE_RATE
+            clip_start = 0.0
+            while clip_start < duration:
+                clip_end = min(clip_start + MAX_CLIP_SECONDS, duration)
+                clips.append({'start': offset + clip_start, 'end': offset + clip_end})
+                # The pipeline tags each segment with the frame offset of its clip; a clip shorter than
+                # one frame shares that frame with the next clip, which segment start times tell apart
+                start_sample = int((offset + clip_start) * SAMPLE_RATE)
+                frame = int(start_sample / SAMPLE_RATE * model.frames_per_second)
+                clips_by_frame[frame].append((start_sample / SAMPLE_RATE, index, offset))
+                clip_start = clip_end
+            offset += duration
+
+        audio = np.concatenate([batch_request.audio for batch_request, _ in group])
+        beam_size = 5 if mode == 'accurate' else 1
+        segments, _ = BatchedInferencePipeline(model=model).transcribe(
+            audio,
+            language=language,
+            task=task,
+            beam_size=beam_size,
+            clip_timestamps=clips,
+            without_timestamps=False,
+            batch_size=self.max_batch_size,
+        )
+
+        results = [[] for _ in group]
+        for segment in segments:
+            index, request_offset = self._clip_owner(clips_by_frame[segment.seek], segment.start)
+            results[index].append(dataclasses.replace(
+                segment,
+                start=round(segment.start - request_offset, 3),
+                end=round(segment.end - request_offset, 3),
+            ))
+
+        for (batch_request, probability), request_segments in zip(group, results):
+            info = BatchInfo(
+                language=language,
+                language_probability=probability,
+                duration=len(batch_request.audio) / SAMPLE_RATE,
+                batch_size=len(group),
+            )
+            batch_request.future.set_result((request_segments, info))
+
+    @staticmethod
+    def _clip_owner(candidates, segment_start):
+        """(request index, request offset) of the last clip sharing the segment's frame that starts at or before it"""
+        # Segment start times are rounded to milliseconds
+        owner = candidates[0]
+        for clip_start, index, offset in candidates:
+            if clip_start <= segment_start + 0.0005:
+                owner = (clip_start, index, offset)
+        return owner[1:]
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Micro-batching Benchmark for Whisper Service
+Measures transcription throughput of the BatchScheduler for a range of batch sizes
+
+Example:
+    python benchmark_batching.py --model small --audio sample.webm --requests 32 --batch-sizes 1,2,4,8
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from faster_whisper import WhisperModel
+
+from audio_processing import SAMPLE_RATE, decode_audio_bytes
+from batching import BatchScheduler
+
+
+def load_clip(path, seconds):
+    """Load a real recording if given, otherwise synthesize a voiced-like test signal"""
+    if path:
+        with open(path, 'rb') as f:
+            audio = decode_audio_bytes(f.read())
+        return audio[:int(seconds * SAMPLE_RATE)]
+
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    envelope = 0.5 * (1 + np.sin(2 * np.pi * 3 * t))  # syllable-rate amplitude modulation
+    tone = np.sin(2 * np.pi * 180 * t) + 0.5 * np.sin(2 * np.pi * 360 * t)
+    noise = np.random.default_rng(0).normal(0, 0.05, t.shape)
+    return (0.3 * envelope * tone + noise).astype(np.float32)
+
+
+def run_benchmark(model, clip, batch_size, requests, concurrency, max_wait_ms, language, mode):
+    """Fire `requests` concurrent submissions at a scheduler and time them"""
+    scheduler = BatchScheduler(lambda model_name: model, max_batch_size=batch_size, max_wait_ms=max_wait_ms)
+
+    # Warm up so one-time initialization is not counted
+    scheduler.submit(clip, language, mode, 'translate', 'benchmark').result()
+
+    latencies = []
+
+    def one_request(_):
+        start = time.perf_counter()
+        scheduler.submit(clip, language, mode, 'translate', 'benchmark').result()
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one_request, range(requests)))
+    elapsed = time.perf_counter() - start
+
+    audio_seconds = requests * len(clip) / SAMPLE_RATE
+    stats = scheduler.stats()
+    return {
+        'batch_size': batch_size,
+        'requests': requests,
+        'elapsed_s': round(elapsed, 3),
+        'requests_per_s': round(requests / elapsed, 2),
+        'audio_seconds_per_s': round(audio_seconds / elapsed, 2),
+        'p50_latency_ms': round(float(np.percentile(latencies, 50)) * 1000, 1),
+        'p95_latency_ms': round(float(np.percentile(latencies, 95)) * 1000, 1),
+        'average_batch_size': stats['average_batch_size'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default=os.getenv('WHISPER_MODEL', 'small'))
+    parser.add_argument('--device', default='auto')
+    parser.add_argument('--compute-type', default='default')
+    parser.add_argument('--audio', help='Audio file to use instead of the synthetic signal')
+    parser.add_argument('--clip-seconds', type=float, default=2.0, help='Clip length (live chunks are 2s)')
+    parser.add_argument('--requests', type=int, default=32)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--batch-sizes', default='1,2,4,8')
+    parser.add_argument('--max-wait-ms', type=float, default=50)
+    parser.add_argument('--language', default='gu')
+    parser.add_argument('--mode', default='fast', choices=['fast', 'accurate'])
+    parser.add_argument('--json', help='Write results to this JSON file')
+    args = parser.parse_args()
+
+    print(f"🔍 Loading model {args.model} ({args.device}, {args.compute_type})")
+    model = WhisperModel(args.model, device=args.device, compute_type=args.compute_type,
+                         download_root=os.getenv('WHISPER_DOWNLOAD_ROOT', '/app/models'))
+    clip = load_clip(args.audio, args.clip_seconds)
+
+    results = []
+    print(f"{'batch':>5} {'req/s':>8} {'audio s/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'avg batch':>10}")
+    for batch_size in [int(size) for size in args.batch_sizes.split(',')]:
+        result = run_benchmark(model, clip, batch_size, args.requests, args.concurrency,
+                               args.max_wait_ms, args.language, args.mode)
+        results.append(result)
+        print(f"{result['batch_size']:>5} {result['requests_per_s']:>8} {result['audio_seconds_per_s']:>10} "
+              f"{result['p50_latency_ms']:>9} {result['p95_latency_ms']:>9} {result['average_batch_size']:>10}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'model': args.model, 'mode': args.mode, 'clip_seconds': args.clip_seconds,
+                       'results': results}, f, indent=2)
+        print(f"\n✅ Results written to {args.json}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
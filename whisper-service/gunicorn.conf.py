@@ -0,0 +1,84 @@
+"""
+Gunicorn configuration for the Whisper service
+Runs WHISPER_WORKERS processes, each loading its own model with
+WHISPER_CPU_THREADS inference threads and serving WORKER_THREADS requests
+concurrently from its own connection queue
+
+Start with: gunicorn --config gunicorn.conf.py app:app
+(or WHISPER_SERVER=gunicorn python app.py)
+"""
+
+import os
+
+from gunicorn.arbiter import Arbiter
+
+bind = '0.0.0.0:9000'
+
+# One process per worker; the model is loaded after fork because CTranslate2
+# and CUDA state cannot be shared across fork()
+workers = int(os.getenv('WHISPER_WORKERS', '1'))
+worker_class = 'gthread'
+threads = int(os.getenv('WORKER_THREADS', '4'))
+worker_connections = int(os.getenv('WORKER_MAX_CONNECTIONS', '100'))
+backlog = int(os.getenv('WORKER_BACKLOG', '256'))
+preload_app = False
+
+# Long uploads can keep a worker thread busy for minutes; SIGTERM lets
+# in-flight requests finish for graceful_timeout seconds before exiting
+timeout = int(os.getenv('WORKER_TIMEOUT', '300'))
+graceful_timeout = int(os.getenv('WORKER_GRACEFUL_TIMEOUT', '30'))
+keepalive = 5
+
+# Run with SSL support if certificates are available
+if os.path.exists('/app/ssl/server.crt') and os.path.exists('/app/ssl/server.key'):
+    certfile = '/app/ssl/server.crt'
+    keyfile = '/app/ssl/server.key'
+
+accesslog = '-'
+errorlog = '-'
+loglevel = 'info'
+
+
+def on_starting(server):
+    """Download the startup models once in the master so workers do not race on the cache"""
+    from faster_whisper.utils import download_model
+
+    # Metric files from a previous run would be summed into the new workers' values
+    multiproc_dir = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if multiproc_dir:
+        os.makedirs(multiproc_dir, exist_ok=True)
+        for name in os.listdir(multiproc_dir):
+            os.remove(os.path.join(multiproc_dir, name))
+
+    # Every worker loads the default and the mode=fast model before reporting ready
+    default_model = os.getenv('WHISPER_MODEL', 'small')
+    model_names = dict.fromkeys([default_model, os.getenv('WHISPER_MODEL_FAST', default_model)])
+    for model_name in model_names:
+        server.log.info(f"Ensuring model files for {model_name} are cached before forking {workers} workers")
+        download_model(model_name, cache_dir='/app/models')
+
+
+def post_fork(server, worker):
+    # Keep OpenMP pools in each worker to the configured size so workers do not oversubscribe cores
+    cpu_threads = os.getenv('WHISPER_CPU_THREADS', '0')
+    if cpu_threads != '0':
+        os.environ['OMP_NUM_THREADS'] = cpu_threads
+
+
+def post_worker_init(worker):
+    """Load this worker's model in the background; a failure stops the whole server instead of respawning forever"""
+    import app
+
+    def exit_on_failure():
+        worker.log.error("Failed to load model. Exiting.")
+        os._exit(Arbiter.WORKER_BOOT_ERROR)
+
+    app.start_model_loading(on_failure=exit_on_failure)
+    worker.log.info(f"Worker {worker.pid} accepting requests, model loading")
+
+
+def child_exit(server, worker):
+    """Drop a dead worker's live gauges (in-flight requests, queue depth) from the aggregated metrics"""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
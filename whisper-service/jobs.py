@@ -0,0 +1,404 @@
+"""
+Asynchronous transcription jobs for long recordings
+Audio is split at silences into pieces that are transcribed in parallel,
+stitched back on the global timeline and kept on local disk until they expire
+"""
+
+import os
+import json
+import time
+import uuid
+import queue
+import shutil
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+
+from audio_processing import SAMPLE_RATE, VAD_ENABLED, decode_audio_bytes, find_speech
+
+logger = logging.getLogger(__name__)
+
+JOBS_DIR = os.getenv('JOBS_DIR', '/app/models/jobs')
+JOB_TTL_SECONDS = float(os.getenv('JOB_TTL_SECONDS', '86400'))  # finished jobs are deleted after this
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))  # pieces transcribed in parallel across all jobs
+JOB_MAX_ACTIVE = int(os.getenv('JOB_MAX_ACTIVE', '2'))  # jobs decoded and split at the same time
+JOB_MAX_PIECE_SECONDS = float(os.getenv('JOB_MAX_PIECE_SECONDS', '120'))
+JOB_LANGUAGE_DETECTION_SECONDS = 30
+JOB_KEEPALIVE_SECONDS = 15
+JOB_EXPIRY_INTERVAL_SECONDS = 60
+
+FINISHED_STATUSES = ('completed', 'failed')
+
+
+class JobNotFoundError(Exception):
+    """Raised for unknown or expired job ids"""
+
+
+def split_at_silence(speech_chunks, total_samples, max_piece_seconds=JOB_MAX_PIECE_SECONDS):
+    """Group VAD speech regions into (start, end) sample ranges of at most max_piece_seconds
+
+    Pieces begin and end on speech region boundaries, so every cut falls in a
+    silence; a single region longer than the limit is cut into fixed windows.
+    """
+    max_samples = int(max_piece_seconds * SAMPLE_RATE)
+    groups = []
+    for chunk in speech_chunks:
+        start, end = chunk['start'], min(chunk['end'], total_samples)
+        if groups and end - groups[-1][0] <= max_samples:
+            groups[-1][1] = end
+        else:
+            groups.append([start, end])
+
+    pieces = []
+    for start, end in groups:
+        while end - start > max_samples:
+            pieces.append((start, start + max_samples))
+            start += max_samples
+        pieces.append((start, end))
+    return pieces
+
+
+def process_start_time(pid):
+    """Start time of a process in clock ticks since boot (Linux), or None when it cannot be read"""
+    try:
+        with open(f"/proc/{pid}/stat", encoding='utf-8') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        return int(fields[19])  # field 22 of /proc/<pid>/stat; fields after the command name start at 3
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def process_identity():
+    """Identify the worker process running a job; a pid reused after a restart has another start time"""
+    pid = os.getpid()
+    return {'pid': pid, 'started': process_start_time(pid)}
+
+
+def process_alive(owner):
+    """True while the worker process recorded in owner is still running"""
+    pid = (owner or {}).get('pid')
+    if not isinstance(pid, int):
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    except OSError:
+        return False
+    started = process_start_time(pid)
+    return started is None or owner.get('started') is None or started == owner['started']
+
+
+def write_json(path, data):
+    """Write JSON atomically so readers never see a partial file"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class Job:
+    """State of one long-recording transcription"""
+
+    def __init__(self, job_id, language, mode, task, model_name, job_dir):
+        self.job_id = job_id
+        self.language = language
+        self.mode = mode
+        self.task = task
+        self.model_name = model_name
+        self.job_dir = job_dir
+        self.status = 'queued'
+        self.error = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.duration = None
+        self.detected_language = None
+        self.language_probability = None
+        self.pieces_total = 0
+        self.pieces_done = 0
+        self.piece_segments = []
+        self.lock = threading.Lock()
+        self.subscribers = []
+
+    @property
+    def status_path(self):
+        return os.path.join(self.job_dir, 'status.json')
+
+    @property
+    def result_path(self):
+        return os.path.join(self.job_dir, 'result.json')
+
+    def status_dict(self):
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'error': self.error,
+            'mode': self.mode,
+            'model': self.model_name,
+            'language': self.detected_language or self.language,
+            'language_probability': self.language_probability,
+            'duration': self.duration,
+            'pieces_total': self.pieces_total,
+            'pieces_done': self.pieces_done,
+            'progress': round(self.pieces_done / self.pieces_total, 3) if self.pieces_total else (
+                1.0 if self.status == 'completed' else 0.0),
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+            'expires_at': self.updated_at + JOB_TTL_SECONDS if self.status in FINISHED_STATUSES else None
+        }
+
+    def update(self, event_type='status', **changes):
+        """Apply changes, persist the status file and notify event subscribers"""
+        segments = changes.pop('segments', None)
+        with self.lock:
+            for name, value in changes.items():
+                setattr(self, name, value)
+            self.updated_at = time.time()
+            status = self.status_dict()
+            # The owning worker lets sibling gunicorn workers tell a running job from one cut off by a restart
+            write_json(self.status_path, dict(status, worker=process_identity()))
+            event = dict(status, type=event_type)
+            if segments is not None:
+                event['segments'] = segments
+            for subscriber in self.subscribers:
+                try:
+                    subscriber.put_nowait(event)
+                except queue.Full:
+                    pass
+
+    def events(self):
+        """Server-Sent Events generator of status and progress events until the job finishes"""
+        subscriber = queue.Queue(maxsize=1024)
+        with self.lock:
+            self.subscribers.append(subscriber)
+            current = dict(self.status_dict(), type='status')
+        try:
+            yield "retry: 2000\n\n"
+            yield f"data: {json.dumps(current)}\n\n"
+            if current['status'] in FINISHED_STATUSES:
+                return
+            while True:
+                try:
+                    event = subscriber.get(timeout=JOB_KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {json.dumps(event)}\n\n"
+                if event['status'] in FINISHED_STATUSES:
+                    break
+        finally:
+            with self.lock:
+                if subscriber in self.subscribers:
+                    self.subscribers.remove(subscriber)
+
+
+class StoredJob:
+    """Job read back from disk: finished, running in another worker, or cut off by a restart"""
+
+    def __init__(self, job_dir, status):
+        self.job_dir = job_dir
+        self.status = status['status']
+        self._status = status
+
+    @property
+    def result_path(self):
+        return os.path.join(self.job_dir, 'result.json')
+
+    def status_dict(self):
+        return dict(self._status)
+
+    def events(self):
+        yield "retry: 2000\n\n"
+        yield f"data: {json.dumps(dict(self._status, type='status'))}\n\n"
+
+
+class JobManager:
+    """Runs long-recording jobs and serves their status and results from memory or disk"""
+
+    def __init__(self, transcribe_fn, detect_language_fn, jobs_dir=JOBS_DIR, workers=JOB_WORKERS,
+                 max_active=JOB_MAX_ACTIVE):
+        self.transcribe_fn = transcribe_fn
+        self.detect_language_fn = detect_language_fn
+        self.jobs_dir = jobs_dir
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.piece_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job-piece')
+        self.job_executor = ThreadPoolExecutor(max_workers=max_active, thread_name_prefix='job')
+        self.workers = workers
+        self._last_expiry = 0.0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.expired = 0
+
+    def submit(self, data, language, mode, task, model_name):
+        """Queue uploaded audio bytes and return the new Job"""
+        self.expire()
+        job_id = uuid.uuid4().hex
+        job_dir = os.path.join(self.jobs_dir, job_id)
+        os.makedirs(job_dir, exist_ok=True)
+        job = Job(job_id, language, mode, task, model_name, job_dir)
+        job.update()
+        with self.lock:
+            self.jobs[job_id] = job
+            self.submitted += 1
+        self.job_executor.submit(self._run, job, data)
+        logger.info(f"Job {job_id} queued ({len(data)} bytes, mode: {mode}, model: {model_name})")
+        return job
+
+    def get(self, job_id):
+        """Return a running or finished job; finished jobs survive restarts on disk"""
+        self.expire()
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job is not None:
+            return job
+
+        # Job ids are uuid4 hex, anything else must not reach the filesystem
+        if not job_id or len(job_id) != 32 or any(c not in '0123456789abcdef' for c in job_id):
+            raise JobNotFoundError(f"Unknown job: {job_id}")
+        job_dir = os.path.join(self.jobs_dir, job_id)
+        try:
+            with open(os.path.join(job_dir, 'status.json'), encoding='utf-8') as f:
+                status = json.load(f)
+        except (OSError, ValueError):
+            raise JobNotFoundError(f"Unknown job: {job_id}")
+        owner = status.pop('worker', None)
+        if status['status'] not in FINISHED_STATUSES and not process_alive(owner):
+            # The process running it has gone away
+            status.update(status='failed', error='Job was interrupted by a service restart')
+        return StoredJob(job_dir, status)
+
+    def result(self, job_id):
+        """Stitched result of a completed job, or None while it is still running"""
+        job = self.get(job_id)
+        if job.status != 'completed':
+            return None
+        with open(job.result_path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def delete(self, job_id):
+        job = self.get(job_id)
+        if job.status not in FINISHED_STATUSES:
+            return False
+        with self.lock:
+            self.jobs.pop(job_id, None)
+        shutil.rmtree(job.job_dir, ignore_errors=True)
+        return True
+
+    def _run(self, job, data):
+        futures = []
+        try:
+            job.update(status='decoding')
+            audio = decode_audio_bytes(data)
+            del data
+            speech_chunks = find_speech(audio) if VAD_ENABLED else [{'start': 0, 'end': len(audio)}]
+            pieces = split_at_silence(speech_chunks, len(audio))
+            job.update(duration=round(len(audio) / SAMPLE_RATE, 3), pieces_total=len(pieces))
+            logger.info(f"Job {job.job_id}: {job.duration:.0f}s of audio split into {len(pieces)} pieces")
+
+            language = job.language
+            if language == 'auto' and pieces:
+                language = self._detect_language(job, audio, pieces)
+
+            job.piece_segments = [None] * len(pieces)
+            job.update(status='transcribing')
+            futures = {
+                self.piece_executor.submit(self.transcribe_fn, audio[start:end], language, job.mode, job.task,
+                                           job.model_name): (index, start)
+                for index, (start, end) in enumerate(pieces)
+            }
+            for future in as_completed(futures):
+                index, start = futures[future]
+                segments, _ = future.result()
+                offset = start / SAMPLE_RATE
+                piece_segments = [{
+                    'start': round(offset + segment.start, 3),
+                    'end': round(offset + segment.end, 3),
+                    'text': segment.text.strip()
+                } for segment in segments]
+                job.piece_segments[index] = piece_segments
+                job.update('progress', pieces_done=job.pieces_done + 1, segments=piece_segments)
+
+            segments = [dict(segment, id=i) for i, segment in
+                        enumerate(segment for piece in job.piece_segments for segment in piece)]
+            write_json(job.result_path, {
+                'job_id': job.job_id,
+                'text': " ".join(segment['text'] for segment in segments if segment['text']),
+                'language': language,
+                'language_probability': job.language_probability,
+                'duration': job.duration,
+                'segments': segments,
+                'model': job.model_name,
+                'pieces': len(pieces)
+            })
+            job.piece_segments = []
+            job.update('completed', status='completed')
+            with self.lock:
+                self.completed += 1
+            logger.info(f"Job {job.job_id} completed: {len(segments)} segments")
+        except Exception as e:
+            for future in futures:
+                future.cancel()
+            logger.error(f"Job {job.job_id} failed: {e}")
+            job.update('failed', status='failed', error=str(e))
+            with self.lock:
+                self.failed += 1
+
+    def _detect_language(self, job, audio, pieces):
+        """Detect the language once on the first speech so every piece is decoded in the same language"""
+        sample = np.concatenate([audio[start:end] for start, end in pieces])
+        sample = sample[:int(JOB_LANGUAGE_DETECTION_SECONDS * SAMPLE_RATE)]
+        try:
+            language, probability = self.detect_language_fn(sample, job.model_name)
+        except Exception as e:
+            logger.warning(f"Job {job.job_id}: language detection failed ({e}), detecting per piece")
+            return 'auto'
+        job.update(detected_language=language, language_probability=round(probability, 3))
+        return language
+
+    def expire(self):
+        """Delete finished jobs whose results are older than JOB_TTL_SECONDS (at most once a minute)"""
+        now = time.time()
+        if now - self._last_expiry < JOB_EXPIRY_INTERVAL_SECONDS:
+            return
+        self._last_expiry = now
+        with self.lock:
+            for job_id in [job_id for job_id, job in self.jobs.items()
+                           if job.status in FINISHED_STATUSES and now - job.updated_at > JOB_TTL_SECONDS]:
+                del self.jobs[job_id]
+        try:
+            names = os.listdir(self.jobs_dir)
+        except OSError:
+            return
+        for name in names:
+            status_path = os.path.join(self.jobs_dir, name, 'status.json')
+            try:
+                if now - os.path.getmtime(status_path) <= JOB_TTL_SECONDS:
+                    continue
+            except OSError:
+                continue
+            with self.lock:
+                if name in self.jobs:
+                    continue
+            shutil.rmtree(os.path.join(self.jobs_dir, name), ignore_errors=True)
+            self.expired += 1
+            logger.info(f"Expired job {name}")
+
+    def stats(self):
+        with self.lock:
+            active = sum(1 for job in self.jobs.values() if job.status not in FINISHED_STATUSES)
+            return {
+                'active': active,
+                'workers': self.workers,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'expired': self.expired,
+                'jobs_dir': self.jobs_dir,
+                'ttl_seconds': JOB_TTL_SECONDS
+            }
@@ -0,0 +1,183 @@
+"""
+Per-session language pinning for chunked transcription
+The language of a consultation is detected once over its first seconds of
+speech and reused for every later chunk, so 2-second clips are not each
+re-detected; detection only runs again when transcription confidence drops
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+
+import numpy as np
+
+from audio_processing import SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+LANGUAGE_DETECT_SECONDS = float(os.getenv('LANGUAGE_DETECT_SECONDS', '6'))  # speech needed before pinning
+LANGUAGE_PIN_PROBABILITY = float(os.getenv('LANGUAGE_PIN_PROBABILITY', '0.8'))
+LANGUAGE_RECHECK_LOGPROB = float(os.getenv('LANGUAGE_RECHECK_LOGPROB', '-1.0'))  # mean segment avg_logprob
+LANGUAGE_RECHECK_CHUNKS = int(os.getenv('LANGUAGE_RECHECK_CHUNKS', '2'))  # consecutive low-confidence chunks
+LANGUAGE_SESSION_TTL_SECONDS = float(os.getenv('LANGUAGE_SESSION_TTL_SECONDS', '1800'))
+LANGUAGE_SESSION_MAX = int(os.getenv('LANGUAGE_SESSION_MAX', '1024'))
+
+
+def mean_logprob(segments):
+    """Duration-weighted average log probability of transcribed segments, or None without any"""
+    total = weight = 0.0
+    for segment in segments:
+        avg_logprob = getattr(segment, 'avg_logprob', None)
+        if avg_logprob is None:
+            continue
+        duration = max(getattr(segment, 'end', 0.0) - getattr(segment, 'start', 0.0), 0.01)
+        total += avg_logprob * duration
+        weight += duration
+    return total / weight if weight else None
+
+
+class LanguageSession:
+    """Detection state of one client session"""
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.pinned_language = None
+        self.pinned_probability = None
+        self.detected_language = None
+        self.detected_probability = None
+        self.recheck_pending = False
+        self.low_confidence_chunks = 0
+        self.detections = 0
+        self.switches = 0
+        self.chunks = 0
+        # Most recent LANGUAGE_DETECT_SECONDS of speech, used for detection and re-checks
+        self.recent = deque()
+        self.recent_samples = 0
+        self.lock = threading.Lock()
+        self.last_activity = time.time()
+
+    @property
+    def status(self):
+        if self.pinned_language is None:
+            return 'detecting'
+        return 'rechecking' if self.recheck_pending else 'pinned'
+
+    def _remember(self, speech_audio):
+        self.recent.append(speech_audio)
+        self.recent_samples += len(speech_audio)
+        limit = int(LANGUAGE_DETECT_SECONDS * SAMPLE_RATE)
+        while len(self.recent) > 1 and self.recent_samples - len(self.recent[0]) >= limit:
+            self.recent_samples -= len(self.recent.popleft())
+
+    def choose_language(self, speech_audio, detect_fn):
+        """Language to transcribe this chunk with; detect_fn(audio) returns (language, probability)
+
+        Until a language is pinned, detection runs over the session's recent
+        speech and the best guess is used. Once LANGUAGE_DETECT_SECONDS of
+        speech give a probability of at least LANGUAGE_PIN_PROBABILITY the
+        language is pinned and detection stops until a re-check is due.
+        """
+        with self.lock:
+            self.chunks += 1
+            self.last_activity = time.time()
+            self._remember(speech_audio)
+            if self.pinned_language is not None and not self.recheck_pending:
+                return self.pinned_language
+
+            sample = np.concatenate(self.recent) if len(self.recent) > 1 else self.recent[0]
+            language, probability = detect_fn(sample)
+            self.detections += 1
+            self.detected_language = language
+            self.detected_probability = round(probability, 3)
+
+            enough_speech = self.recent_samples >= LANGUAGE_DETECT_SECONDS * SAMPLE_RATE
+            if probability >= LANGUAGE_PIN_PROBABILITY and (enough_speech or self.recheck_pending):
+                if self.pinned_language is not None and language != self.pinned_language:
+                    self.switches += 1
+                    logger.info(f"Session {self.session_id}: language changed "
+                                f"{self.pinned_language} -> {language} ({probability:.2f})")
+                elif self.pinned_language is None:
+                    logger.info(f"Session {self.session_id}: pinned language {language} ({probability:.2f})")
+                self.pinned_language = language
+                self.pinned_probability = self.detected_probability
+            self.recheck_pending = False
+            return self.pinned_language or language
+
+    def observe(self, logprob):
+        """Schedule a re-check after LANGUAGE_RECHECK_CHUNKS consecutive low-confidence chunks
+
+        logprob is the chunk's mean_logprob(); None (no segments) is ignored.
+        """
+        if logprob is None:
+            return
+        with self.lock:
+            if self.pinned_language is None:
+                return
+            if logprob >= LANGUAGE_RECHECK_LOGPROB:
+                self.low_confidence_chunks = 0
+                return
+            self.low_confidence_chunks += 1
+            if self.low_confidence_chunks >= LANGUAGE_RECHECK_CHUNKS:
+                self.low_confidence_chunks = 0
+                self.recheck_pending = True
+                logger.info(f"Session {self.session_id}: confidence dropped ({logprob:.2f}), re-checking language")
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                'session_id': self.session_id,
+                'status': self.status,
+                'pinned_language': self.pinned_language,
+                'pinned_probability': self.pinned_probability,
+                'detected_language': self.detected_language,
+                'detected_probability': self.detected_probability,
+                'detections': self.detections,
+                'switches': self.switches,
+                'chunks': self.chunks
+            }
+
+
+class LanguageSessionStore:
+    """Sessions by client-provided id, least recently used evicted past LANGUAGE_SESSION_MAX"""
+
+    def __init__(self, max_sessions=LANGUAGE_SESSION_MAX, ttl_seconds=LANGUAGE_SESSION_TTL_SECONDS):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+        self.evicted = 0
+
+    def get(self, session_id):
+        """Return the session for session_id, creating it on first use"""
+        now = time.time()
+        with self.lock:
+            # Least recently used first, so idle sessions are at the front
+            while self.sessions:
+                oldest = next(iter(self.sessions.values()))
+                if now - oldest.last_activity <= self.ttl_seconds:
+                    break
+                self.sessions.popitem(last=False)
+            session = self.sessions.get(session_id)
+            if session is None:
+                session = LanguageSession(session_id)
+                self.sessions[session_id] = session
+            # Every lookup counts as activity, keeping the TTL sweep and LRU order consistent
+            session.last_activity = now
+            self.sessions.move_to_end(session_id)
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+                self.evicted += 1
+            return session
+
+    def stats(self):
+        with self.lock:
+            pinned = sum(1 for session in self.sessions.values() if session.pinned_language is not None)
+            return {
+                'sessions': len(self.sessions),
+                'pinned': pinned,
+                'evicted': self.evicted,
+                'detect_seconds': LANGUAGE_DETECT_SECONDS,
+                'pin_probability': LANGUAGE_PIN_PROBABILITY
+            }
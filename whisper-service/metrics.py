@@ -0,0 +1,129 @@
+"""
+Prometheus metrics for the Whisper service
+Per-stage latency histograms, real-time factor, audio throughput, queue depth,
+in-flight requests and model load times, labelled by model and mode
+"""
+
+import os
+import time
+from contextlib import contextmanager
+
+# prometheus_client writes per-process files into this directory as soon as metrics are created;
+# gunicorn's on_starting hook creates it too, but WHISPER_SERVER=flask, the stub server and the
+# benchmarks never run that hook
+if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+    os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+
+# Stage latencies range from sub-millisecond VAD checks to minutes for long uploads on CPU
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+RTF_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 5)
+
+STAGE_SECONDS = Histogram(
+    'whisper_stage_seconds', 'Time spent in each /transcribe stage',
+    ['stage', 'model', 'mode'], buckets=STAGE_BUCKETS
+)
+REAL_TIME_FACTOR = Histogram(
+    'whisper_real_time_factor', 'Inference seconds per second of uploaded audio',
+    ['model', 'mode'], buckets=RTF_BUCKETS
+)
+AUDIO_SECONDS = Counter(
+    'whisper_audio_seconds_total', 'Seconds of decoded audio received', ['model', 'mode']
+)
+SPEECH_SECONDS = Counter(
+    'whisper_speech_seconds_total', 'Seconds of audio passed to the model after VAD', ['model', 'mode']
+)
+REQUESTS = Counter(
+    'whisper_requests_total', 'Requests by endpoint and outcome', ['endpoint', 'outcome']
+)
+IN_FLIGHT = Gauge(
+    'whisper_requests_in_flight', 'Requests currently being handled', ['endpoint'],
+    multiprocess_mode='livesum'
+)
+QUEUE_DEPTH = Gauge(
+    'whisper_inference_queue_depth', 'Requests waiting for or running model inference', ['model'],
+    multiprocess_mode='livesum'
+)
+ADMISSION_ACTIVE = Gauge(
+    'whisper_admission_active', 'Requests holding an inference slot', multiprocess_mode='livesum'
+)
+ADMISSION_WAITING = Gauge(
+    'whisper_admission_waiting', 'Requests queued for an inference slot', ['priority'],
+    multiprocess_mode='livesum'
+)
+QUEUE_WAIT_SECONDS = Histogram(
+    'whisper_queue_wait_seconds', 'Time spent waiting for an inference slot', ['priority'],
+    buckets=STAGE_BUCKETS
+)
+SHED = Counter(
+    'whisper_requests_shed_total', 'Requests rejected with 429 by admission control', ['reason']
+)
+EXPIRED = Counter(
+    'whisper_requests_expired_total', 'Requests dropped because their deadline passed', ['stage']
+)
+MODEL_LOAD_SECONDS = Gauge(
+    'whisper_model_load_seconds', 'Time taken by the most recent load of each model', ['model'],
+    multiprocess_mode='max'
+)
+
+
+def mode_label(mode):
+    """Collapse free-form mode values so clients cannot inflate label cardinality"""
+    return mode if mode in ('fast', 'accurate') else 'other'
+
+
+def observe_stages(timings, model, mode):
+    """Record stage timings given in milliseconds, e.g. {'decode_ms': 12.3}"""
+    mode = mode_label(mode)
+    for stage, value_ms in timings.items():
+        if stage == 'total_ms':
+            continue
+        STAGE_SECONDS.labels(stage[:-3], model, mode).observe(value_ms / 1000)
+
+
+def observe_audio(model, mode, audio_seconds, speech_seconds, inference_seconds=None):
+    mode = mode_label(mode)
+    AUDIO_SECONDS.labels(model, mode).inc(audio_seconds)
+    SPEECH_SECONDS.labels(model, mode).inc(speech_seconds)
+    if inference_seconds is not None and audio_seconds > 0:
+        REAL_TIME_FACTOR.labels(model, mode).observe(inference_seconds / audio_seconds)
+
+
+def observe_admission(active, waiting):
+    """Slot usage; waiting maps each priority class to its queue length"""
+    ADMISSION_ACTIVE.set(active)
+    for priority, count in waiting.items():
+        ADMISSION_WAITING.labels(priority).set(count)
+
+
+def observe_queue_wait(priority, seconds):
+    QUEUE_WAIT_SECONDS.labels(priority).observe(seconds)
+
+
+@contextmanager
+def queued(model):
+    gauge = QUEUE_DEPTH.labels(model)
+    gauge.inc()
+    try:
+        yield
+    finally:
+        gauge.dec()
+
+
+@contextmanager
+def time_model_load(model):
+    start = time.perf_counter()
+    yield
+    MODEL_LOAD_SECONDS.labels(model).set(time.perf_counter() - start)
+
+
+def render_metrics():
+    """Text exposition of all metrics; aggregates across gunicorn workers when PROMETHEUS_MULTIPROC_DIR is set"""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,129 @@
+"""
+Whisper model pool
+Loads models lazily on first use and evicts the least recently used ones
+when the estimated memory of loaded models exceeds a budget
+"""
+
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Approximate float16 footprint of the CTranslate2 Whisper models in MB
+MODEL_MEMORY_MB = {
+    'tiny': 75, 'tiny.en': 75,
+    'base': 145, 'base.en': 145,
+    'small': 485, 'small.en': 485,
+    'medium': 1530, 'medium.en': 1530,
+    'large': 3090, 'large-v1': 3090, 'large-v2': 3090, 'large-v3': 3090,
+}
+DEFAULT_MODEL_MEMORY_MB = 1500
+
+
+def estimate_model_memory_mb(model_name, compute_type):
+    """Estimated resident size of a model; int8 weights take roughly half of float16"""
+    size = MODEL_MEMORY_MB.get(model_name, DEFAULT_MODEL_MEMORY_MB)
+    if compute_type.startswith('int8'):
+        size /= 2
+    elif compute_type == 'float32':
+        size *= 2
+    return size
+
+
+class ModelPool:
+    """Thread-safe pool of Whisper models with lazy loading and LRU eviction"""
+
+    def __init__(self, loader, budget_mb=0, compute_type='float16', pinned=()):
+        self.loader = loader
+        self.budget_mb = budget_mb
+        self.compute_type = compute_type
+        self.pinned = set(pinned)
+        self._models = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+
+    @property
+    def used_mb(self):
+        return sum(entry['memory_mb'] for entry in self._models.values())
+
+    def get(self, model_name):
+        """Return a loaded model, loading it (once, even under concurrency) on first use"""
+        while True:
+            with self._lock:
+                entry = self._models.get(model_name)
+                if entry is not None:
+                    self._models.move_to_end(model_name)
+                    entry['last_used'] = time.time()
+                    entry['requests'] += 1
+                    return entry['model']
+                loading = self._loading.get(model_name)
+                if loading is None:
+                    loading = self._loading[model_name] = threading.Event()
+                    break
+            # Another request is loading this model; wait for it and retry
+            loading.wait()
+
+        try:
+            memory_mb = estimate_model_memory_mb(model_name, self.compute_type)
+            with self._lock:
+                self._evict_for(memory_mb)
+            start = time.perf_counter()
+            model = self.loader(model_name)
+            load_seconds = time.perf_counter() - start
+            with self._lock:
+                self._models[model_name] = {
+                    'model': model,
+                    'memory_mb': memory_mb,
+                    'load_seconds': round(load_seconds, 2),
+                    'loaded_at': time.time(),
+                    'last_used': time.time(),
+                    'requests': 1
+                }
+                self.loads += 1
+            logger.info(f"Loaded model {model_name} in {load_seconds:.1f}s (~{memory_mb:.0f} MB, pool ~{self.used_mb:.0f} MB)")
+            return model
+        finally:
+            with self._lock:
+                self._loading.pop(model_name).set()
+
+    def _evict_for(self, memory_mb):
+        """Drop least recently used, unpinned models until memory_mb more fits the budget"""
+        if not self.budget_mb:
+            return
+        for model_name in list(self._models):
+            if self.used_mb + memory_mb <= self.budget_mb:
+                break
+            if model_name in self.pinned:
+                continue
+            entry = self._models.pop(model_name)
+            self.evictions += 1
+            logger.info(f"Evicted model {model_name} (~{entry['memory_mb']:.0f} MB) to stay within {self.budget_mb} MB budget")
+        if self.used_mb + memory_mb > self.budget_mb:
+            logger.warning(f"Model pool over budget: ~{self.used_mb + memory_mb:.0f} MB needed, budget {self.budget_mb} MB")
+
+    def is_loaded(self, model_name):
+        with self._lock:
+            return model_name in self._models
+
+    def stats(self):
+        with self._lock:
+            return {
+                'budget_mb': self.budget_mb,
+                'used_mb': round(self.used_mb),
+                'loads': self.loads,
+                'evictions': self.evictions,
+                'pinned': sorted(self.pinned),
+                'loaded': {
+                    model_name: {
+                        'memory_mb': round(entry['memory_mb']),
+                        'load_seconds': entry['load_seconds'],
+                        'requests': entry['requests'],
+                        'idle_seconds': round(time.time() - entry['last_used'], 1)
+                    }
+                    for model_name, entry in self._models.items()
+                }
+            }
@@ -0,0 +1,49 @@
+"""
+Client for the MarianMT translation service used by the fused /pipeline endpoint
+Segments are sent in one /translate_batch call so the translation stays aligned
+with the Whisper segments
+"""
+
+import os
+import logging
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+TRANSLATION_SERVICE_URL = os.getenv('TRANSLATION_SERVICE_URL', 'http://translation-service:9001')
+TRANSLATION_TIMEOUT = float(os.getenv('TRANSLATION_TIMEOUT', '15'))
+TRANSLATION_VERIFY_SSL = os.getenv('TRANSLATION_VERIFY_SSL', 'true').lower() == 'true'
+
+
+class TranslationServiceError(Exception):
+    """Raised when the translation service cannot be reached or rejects a request"""
+
+
+class TranslationClient:
+    """Keeps one pooled HTTP session to the translation service"""
+
+    def __init__(self, base_url=TRANSLATION_SERVICE_URL, timeout=TRANSLATION_TIMEOUT, verify=TRANSLATION_VERIFY_SSL):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.verify = verify
+
+    @property
+    def enabled(self):
+        return bool(self.base_url)
+
+    def translate_batch(self, texts, source_lang, target_lang='en'):
+        """Translate texts in order; raises TranslationServiceError on any failure"""
+        if not texts:
+            return []
+        try:
+            response = self.session.post(f"{self.base_url}/translate_batch", json={
+                'texts': texts,
+                'source_language': source_lang,
+                'target_language': target_lang
+            }, timeout=self.timeout)
+            response.raise_for_status()
+            return [item['translated_text'] for item in response.json()['translations']]
+        except (requests.RequestException, KeyError, ValueError) as e:
+            raise TranslationServiceError(f"Translation service request failed: {e}") from e
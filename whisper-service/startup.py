@@ -0,0 +1,116 @@
+"""
+Startup helpers for the Whisper service
+Detects the inference device once through CTranslate2 (no torch import),
+times startup phases and warms the model up before the service reports ready
+"""
+
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+
+import numpy as np
+import ctranslate2
+from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+from audio_processing import SAMPLE_RATE, VAD_ENABLED
+
+logger = logging.getLogger(__name__)
+
+# Run a synthetic transcription before reporting ready so the first request does not pay one-time costs
+WARMUP_ENABLED = os.getenv('WARMUP_ENABLED', 'true').lower() == 'true'
+WARMUP_SECONDS = float(os.getenv('WARMUP_SECONDS', '2'))
+
+
+@lru_cache(maxsize=1)
+def detect_device():
+    """Pick device and compute type once; CTranslate2 reports CUDA support without loading torch"""
+    cuda_device_count = ctranslate2.get_cuda_device_count()
+    if cuda_device_count > 0:
+        device = "cuda"
+        supported = ctranslate2.get_supported_compute_types("cuda")
+        compute_type = "float16" if "float16" in supported else "int8"
+        if compute_type != "float16":
+            logger.warning("CUDA device does not support float16, falling back to int8")
+    else:
+        device = "cpu"
+        supported = ctranslate2.get_supported_compute_types("cpu")
+        compute_type = "int8"
+    return {
+        'device': device,
+        'compute_type': compute_type,
+        'cuda_available': cuda_device_count > 0,
+        'cuda_device_count': cuda_device_count,
+        'supported_compute_types': sorted(supported)
+    }
+
+
+class StartupState:
+    """Tracks startup progress for the liveness and readiness probes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.phase = 'starting'
+        self.phases = {}
+        self.ready = False
+        self.error = None
+        self.models = {}
+
+    @contextmanager
+    def timed(self, phase):
+        """Record how long a startup phase took and log it"""
+        with self._lock:
+            self.phase = phase
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.phases[phase] = round(elapsed, 3)
+            logger.info(f"Startup phase '{phase}' took {elapsed:.2f}s")
+
+    def set_model_state(self, model_name, state):
+        """Record a startup model's progress: pending, loading, warming_up or ready"""
+        with self._lock:
+            self.models[model_name] = state
+
+    def mark_ready(self):
+        with self._lock:
+            self.phase = 'ready'
+            self.ready = True
+        logger.info(f"Service ready after {time.time() - self.started_at:.1f}s "
+                    f"({', '.join(f'{name}={seconds:.2f}s' for name, seconds in self.phases.items())})")
+
+    def mark_failed(self, error):
+        with self._lock:
+            self.phase = 'failed'
+            self.error = str(error)
+
+    @property
+    def failed(self):
+        return self.error is not None
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'phase': self.phase,
+                'ready': self.ready,
+                'error': self.error,
+                'uptime_seconds': round(time.time() - self.started_at, 1),
+                'phases': dict(self.phases),
+                'models': dict(self.models)
+            }
+
+
+def warm_up(model):
+    """Push a short synthetic clip through VAD, language detection and decoding"""
+    t = np.arange(int(WARMUP_SECONDS * SAMPLE_RATE)) / SAMPLE_RATE
+    audio = (0.1 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+    if VAD_ENABLED:
+        get_speech_timestamps(audio, VadOptions())
+    segments, _ = model.transcribe(audio, beam_size=1, condition_on_previous_text=False)
+    list(segments)
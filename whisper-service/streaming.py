@@ -0,0 +1,362 @@
+"""
+Streaming transcription sessions for the Whisper service
+Keeps a rolling audio buffer per session, re-transcribes only the unconfirmed
+tail and confirms words once two consecutive passes agree on them
+"""
+
+import os
+import json
+import time
+import queue
+import uuid
+import string
+import logging
+import threading
+
+import numpy as np
+
+from audio_processing import SAMPLE_RATE, decode_audio_bytes
+
+logger = logging.getLogger(__name__)
+
+STREAM_MIN_CHUNK_SECONDS = float(os.getenv('STREAM_MIN_CHUNK_SECONDS', '1.0'))
+STREAM_BUFFER_TRIM_SECONDS = float(os.getenv('STREAM_BUFFER_TRIM_SECONDS', '15'))
+STREAM_MAX_BUFFER_SECONDS = float(os.getenv('STREAM_MAX_BUFFER_SECONDS', '28'))
+STREAM_SESSION_TIMEOUT = float(os.getenv('STREAM_SESSION_TIMEOUT', '300'))
+STREAM_MAX_SESSIONS = int(os.getenv('STREAM_MAX_SESSIONS', '64'))
+STREAM_KEEPALIVE_SECONDS = 15
+
+# Every open event stream (/stream and /jobs/<id>/events) holds one of the worker's WORKER_THREADS
+# request threads, so listeners are capped well below it to leave threads for /audio, inference and probes
+WORKER_THREADS = int(os.getenv('WORKER_THREADS', '4'))
+SSE_MAX_LISTENERS = int(os.getenv('SSE_MAX_LISTENERS', '0')) or max(1, WORKER_THREADS // 4)
+
+# Number of characters of confirmed text passed to Whisper as context for the next pass
+PROMPT_CONTEXT_CHARS = 200
+
+
+class SessionError(Exception):
+    """Raised when a request refers to an unknown session"""
+
+
+class SessionLimitError(SessionError):
+    """Raised when STREAM_MAX_SESSIONS sessions are already active"""
+
+
+class ListenerLimitError(Exception):
+    """Raised when SSE_MAX_LISTENERS event streams are already open"""
+
+
+def normalize_word(word):
+    return word.strip().lower().strip(string.punctuation)
+
+
+class StreamingSession:
+    """Rolling-buffer transcription state for one live consultation"""
+
+    def __init__(self, session_id, language='auto', mode='fast', task='translate'):
+        self.session_id = session_id
+        self.language = language
+        self.mode = mode
+        self.task = task
+        self.detected_language = None
+
+        # Unconfirmed audio tail; audio_offset is the absolute time of its first sample
+        self.audio = np.zeros(0, dtype=np.float32)
+        self.audio_offset = 0.0
+        self.total_samples = 0
+        self.samples_at_last_pass = 0
+
+        # Confirmed words (start, end, word, probability) and the latest unconfirmed hypothesis
+        self.committed_until = 0.0
+        self.committed_text = ''
+        self.hypothesis = []
+        self.transcriptions = []
+
+        # First decodable frame, prepended to header-less container fragments (e.g. WebM clusters)
+        self.container_header = None
+        self.header_samples = 0
+
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.process_lock = threading.Lock()
+        self.created_at = time.time()
+        self.last_activity = time.time()
+
+    @property
+    def buffered_seconds(self):
+        return len(self.audio) / SAMPLE_RATE
+
+    def decode_frame(self, data):
+        """Decode a frame on its own, or behind the session's container header if it is a fragment"""
+        try:
+            audio = decode_audio_bytes(data)
+            if self.container_header is None:
+                self.container_header = data
+                self.header_samples = len(audio)
+            return audio
+        except Exception:
+            if self.container_header is None:
+                raise
+            audio = decode_audio_bytes(self.container_header + data)
+            return audio[self.header_samples:]
+
+    def append_audio(self, audio):
+        with self.lock:
+            self.audio = np.concatenate([self.audio, audio.astype(np.float32, copy=False)])
+            self.total_samples += len(audio)
+            self.last_activity = time.time()
+
+    def needs_pass(self):
+        return self.total_samples - self.samples_at_last_pass >= STREAM_MIN_CHUNK_SECONDS * SAMPLE_RATE
+
+    def process(self, transcribe_fn, final=False):
+        """Transcribe the unconfirmed tail, confirm agreed words and publish partial/final events"""
+        with self.lock:
+            audio = self.audio
+            audio_offset = self.audio_offset
+            self.samples_at_last_pass = self.total_samples
+            prompt = self.committed_text[-PROMPT_CONTEXT_CHARS:]
+        if len(audio) == 0:
+            return [], None
+
+        segments, info = transcribe_fn(audio, self.language, self.mode, self.task, prompt)
+        self.detected_language = getattr(info, 'language', self.detected_language)
+
+        words = [
+            (audio_offset + word.start, audio_offset + word.end, word.word, word.probability)
+            for segment in segments for word in (segment.words or [])
+        ]
+        # Skip words that belong to already confirmed audio
+        words = [word for word in words if word[0] > self.committed_until - 0.1]
+
+        overflow = self.buffered_seconds >= STREAM_MAX_BUFFER_SECONDS
+        if final or overflow:
+            confirmed = words
+        else:
+            # LocalAgreement: confirm the longest prefix shared with the previous pass
+            agreed = 0
+            for previous, current in zip(self.hypothesis, words):
+                if normalize_word(previous[2]) != normalize_word(current[2]):
+                    break
+                agreed += 1
+            confirmed = words[:agreed]
+        self.hypothesis = words[len(confirmed):]
+
+        final_events = []
+        if confirmed:
+            final_events.append(self._commit(confirmed))
+        if self.hypothesis and not final:
+            self.publish(self._event('partial', self.hypothesis))
+        self._trim_buffer(force=final or overflow)
+        return final_events, info
+
+    def _commit(self, words):
+        event = self._event('final', words)
+        with self.lock:
+            self.committed_until = words[-1][1]
+            self.committed_text = f"{self.committed_text} {event['text']}".strip()
+            self.transcriptions.append(event)
+        self.publish(event)
+        return event
+
+    def _trim_buffer(self, force=False):
+        """Drop confirmed audio once the buffer grows past the trim threshold"""
+        with self.lock:
+            if force:
+                cut_time = self.audio_offset + self.buffered_seconds
+            elif self.buffered_seconds >= STREAM_BUFFER_TRIM_SECONDS and self.committed_until > self.audio_offset:
+                cut_time = self.committed_until
+            else:
+                return
+            cut = min(int((cut_time - self.audio_offset) * SAMPLE_RATE), len(self.audio))
+            self.audio = self.audio[cut:]
+            self.audio_offset += cut / SAMPLE_RATE
+
+    def _event(self, event_type, words):
+        return {
+            'type': event_type,
+            'session_id': self.session_id,
+            'text': ''.join(word[2] for word in words).strip(),
+            'start': round(words[0][0], 3),
+            'end': round(words[-1][1], 3),
+            'language': self.detected_language,
+            'confidence': round(float(np.mean([word[3] for word in words])), 3),
+            'timestamp': int(time.time() * 1000)
+        }
+
+    def publish(self, event):
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                logger.warning(f"Dropping event for slow subscriber of session {self.session_id}")
+
+    def events(self):
+        """Server-Sent Events generator for this session"""
+        subscriber = queue.Queue(maxsize=256)
+        with self.lock:
+            self.subscribers.append(subscriber)
+        try:
+            yield "retry: 2000\n\n"
+            while True:
+                try:
+                    event = subscriber.get(timeout=STREAM_KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is None:
+                    break
+                yield f"data: {json.dumps(event)}\n\n"
+        finally:
+            with self.lock:
+                if subscriber in self.subscribers:
+                    self.subscribers.remove(subscriber)
+
+    def close(self):
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(None)
+            except queue.Full:
+                pass
+
+    def summary(self):
+        return {
+            'session_id': self.session_id,
+            'language': self.language,
+            'detected_language': self.detected_language,
+            'mode': self.mode,
+            'task': self.task,
+            'text': self.committed_text,
+            'audio_seconds': round(self.total_samples / SAMPLE_RATE, 3),
+            'buffered_seconds': round(self.buffered_seconds, 3),
+            'partial': ''.join(word[2] for word in self.hypothesis).strip()
+        }
+
+
+class SessionManager:
+    """Registry of live streaming sessions with idle expiry"""
+
+    def __init__(self, transcribe_fn):
+        self.transcribe_fn = transcribe_fn
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    def create(self, session_id=None, language='auto', mode='fast', task='translate'):
+        self.expire_idle()
+        with self.lock:
+            if session_id and session_id in self.sessions:
+                return self.sessions[session_id]
+            if len(self.sessions) >= STREAM_MAX_SESSIONS:
+                raise SessionLimitError(f"Too many active sessions (max {STREAM_MAX_SESSIONS})")
+            session = StreamingSession(session_id or uuid.uuid4().hex, language, mode, task)
+            self.sessions[session.session_id] = session
+        logger.info(f"Started streaming session {session.session_id} (language: {language}, mode: {mode}, task: {task})")
+        return session
+
+    def get(self, session_id):
+        with self.lock:
+            session = self.sessions.get(session_id)
+        if session is None:
+            raise SessionError(f"Unknown session: {session_id}")
+        return session
+
+    def add_frame(self, session_id, data):
+        """Append an encoded audio frame and run a pass if enough new audio arrived"""
+        # Frames arrive continuously while any stream is open, so abandoned sessions are reaped here
+        self.expire_idle()
+        session = self.get(session_id)
+        session.append_audio(session.decode_frame(data))
+        final_events = []
+        if session.needs_pass() and session.process_lock.acquire(blocking=False):
+            try:
+                final_events, _ = session.process(self.transcribe_fn)
+            finally:
+                session.process_lock.release()
+        return session, final_events
+
+    def stop(self, session_id):
+        """Flush the remaining audio as final text and close the session"""
+        session = self.get(session_id)
+        # The session is closed even if the final pass fails, so it does not count against STREAM_MAX_SESSIONS
+        try:
+            with session.process_lock:
+                session.process(self.transcribe_fn, final=True)
+            session.publish({'type': 'end', 'session_id': session_id, 'text': session.committed_text,
+                             'timestamp': int(time.time() * 1000)})
+        finally:
+            session.close()
+            with self.lock:
+                self.sessions.pop(session_id, None)
+        logger.info(f"Stopped streaming session {session_id} after {session.total_samples / SAMPLE_RATE:.1f}s of audio")
+        return session
+
+    def expire_idle(self):
+        now = time.time()
+        with self.lock:
+            expired = [session for session in self.sessions.values()
+                       if now - session.last_activity > STREAM_SESSION_TIMEOUT]
+            for session in expired:
+                del self.sessions[session.session_id]
+        for session in expired:
+            logger.info(f"Expiring idle streaming session {session.session_id}")
+            session.close()
+
+    def stats(self):
+        with self.lock:
+            return {'active_sessions': len(self.sessions), 'max_sessions': STREAM_MAX_SESSIONS}
+
+
+class ListenerLimit:
+    """Counts open Server-Sent Events streams across sessions and jobs"""
+
+    def __init__(self, max_listeners=SSE_MAX_LISTENERS):
+        self.max_listeners = max_listeners
+        self.active = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+    def open(self, events):
+        """Take a listener slot for an events generator, or raise ListenerLimitError"""
+        with self.lock:
+            if self.active >= self.max_listeners:
+                self.rejected += 1
+                raise ListenerLimitError(f"Too many open event streams (max {self.max_listeners})")
+            self.active += 1
+        return _Listener(self, events)
+
+    def release(self):
+        with self.lock:
+            self.active -= 1
+
+    def stats(self):
+        with self.lock:
+            return {'active': self.active, 'max': self.max_listeners, 'rejected': self.rejected}
+
+
+class _Listener:
+    """Events iterator that gives its slot back when the response is closed, even if never iterated"""
+
+    def __init__(self, limit, events):
+        self.limit = limit
+        self.events = events
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.events)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.events.close()
+        finally:
+            self.limit.release()
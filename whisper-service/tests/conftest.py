@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The service modules import each other as top-level modules, as they do inside the image
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+# The image copies shared/ (profiling.py) next to the service modules
+sys.path.insert(1, os.path.join(os.path.dirname(SERVICE_DIR), 'shared'))
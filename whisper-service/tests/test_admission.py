@@ -0,0 +1,29 @@
+import app
+from admission import BATCH, INTERACTIVE
+
+
+def request_context(form, headers=None):
+    return app.app.test_request_context('/pipeline', method='POST', data=form, headers=headers or {})
+
+
+def test_clients_can_lower_but_not_raise_their_priority():
+    def priority(form, headers=None):
+        with request_context(form, headers):
+            return app.request_priority()
+
+    assert priority({'mode': 'accurate'}) == BATCH
+    assert priority({'mode': 'accurate'}, {'X-Priority': 'interactive'}) == BATCH
+    assert priority({'mode': 'accurate', 'priority': 'interactive'}) == BATCH
+    assert priority({'mode': 'fast'}) == INTERACTIVE
+    assert priority({'mode': 'fast'}, {'X-Priority': 'Batch'}) == BATCH
+
+
+def test_batch_pipeline_takes_one_slot_for_both_passes():
+    def slots(form, headers=None):
+        with request_context(form, headers):
+            return app.pipeline_slots()
+
+    assert slots({'mode': 'fast', 'language': 'gu'}) == 2
+    assert slots({'mode': 'accurate', 'language': 'gu'}) == 1
+    assert slots({'mode': 'fast', 'language': 'gu'}, {'X-Priority': 'batch'}) == 1
+    assert slots({'mode': 'fast', 'language': 'gu', 'whisper_translation': 'fallback'}) == 1
@@ -0,0 +1,101 @@
+import types
+import logging
+
+import numpy as np
+from faster_whisper.feature_extractor import FeatureExtractor
+from faster_whisper.transcribe import Segment
+
+import batching
+from audio_processing import SAMPLE_RATE
+from batching import BatchRequest, BatchScheduler
+
+
+class FakePipeline:
+    """Stands in for BatchedInferencePipeline, tagging one segment per clip the way faster-whisper does"""
+
+    def __init__(self, model):
+        self.model = model
+
+    def transcribe(self, audio, clip_timestamps, **kwargs):
+        segments = []
+        for clip in clip_timestamps:
+            start_sample, end_sample = int(clip['start'] * SAMPLE_RATE), int(clip['end'] * SAMPLE_RATE)
+            offset = start_sample / SAMPLE_RATE
+            segments.append(Segment(
+                id=len(segments) + 1,
+                seek=int(offset * self.model.frames_per_second),
+                start=round(offset, 3),
+                end=round(end_sample / SAMPLE_RATE, 3),
+                text=f" {clip['start']:.3f}",
+                tokens=[],
+                avg_logprob=-0.1,
+                compression_ratio=1.0,
+                no_speech_prob=0.01,
+                words=None,
+                temperature=0.0,
+            ))
+        return iter(segments), None
+
+
+def test_sub_frame_tail_clip_keeps_segments_with_their_request(monkeypatch):
+    monkeypatch.setattr(batching, 'BatchedInferencePipeline', FakePipeline)
+    scheduler = BatchScheduler(get_model=lambda model_name: None)
+    model = types.SimpleNamespace(frames_per_second=100)
+
+    # 30.005s leaves a 5ms tail clip that starts in the same 10ms frame as the next request
+    long_request = BatchRequest(np.zeros(int(30.005 * SAMPLE_RATE), dtype=np.float32), 'gu', 'fast', 'transcribe', 'small')
+    short_request = BatchRequest(np.zeros(2 * SAMPLE_RATE, dtype=np.float32), 'gu', 'fast', 'transcribe', 'small')
+    scheduler._transcribe_group(model, [(long_request, 0.9), (short_request, 0.9)], 'gu', 'fast', 'transcribe')
+
+    long_segments, long_info = long_request.future.result(timeout=1)
+    short_segments, short_info = short_request.future.result(timeout=1)
+    assert [(segment.start, segment.end) for segment in long_segments] == [(0.0, 30.0), (30.0, 30.005)]
+    assert [(segment.start, segment.end) for segment in short_segments] == [(0.0, 2.0)]
+    assert long_info.duration == 30.005 and short_info.duration == 2.0
+
+
+class FakeHfTokenizer:
+    """Just enough of a tokenizers.Tokenizer for the pipeline to build its suppress list"""
+
+    def token_to_id(self, token):
+        return 50000 + sum(map(ord, token))
+
+    def encode(self, text, add_special_tokens=False):
+        return types.SimpleNamespace(ids=[ord(character) for character in text])
+
+
+def fake_forward(self, features, tokenizer, chunks_metadata, options):
+    """Replaces the encoder/decoder pass with one segment spanning each clip, tagged as faster-whisper tags it"""
+    return [[{
+        'text': f" {chunk['offset']:.3f}",
+        'avg_logprob': -0.1,
+        'no_speech_prob': 0.01,
+        'tokens': [],
+        'start': chunk['offset'],
+        'end': chunk['offset'] + chunk['duration'],
+        'compression_ratio': 1.0,
+        'seek': int(chunk['offset'] * self.model.frames_per_second),
+    }] for chunk in chunks_metadata]
+
+
+def test_real_pipeline_accepts_clip_timestamps_in_seconds(monkeypatch):
+    # Only the model pass is patched, so slicing the audio by our clip timestamps runs in faster-whisper itself
+    monkeypatch.setattr(batching.BatchedInferencePipeline, 'forward', fake_forward)
+    scheduler = BatchScheduler(get_model=lambda model_name: None)
+    model = types.SimpleNamespace(
+        feature_extractor=FeatureExtractor(),
+        frames_per_second=100,
+        hf_tokenizer=FakeHfTokenizer(),
+        logger=logging.getLogger('test_batching'),
+        max_length=448,
+        model=types.SimpleNamespace(is_multilingual=False, n_mels=80),
+    )
+
+    long_request = BatchRequest(np.zeros(int(31.5 * SAMPLE_RATE), dtype=np.float32), 'en', 'fast', 'transcribe', 'small')
+    short_request = BatchRequest(np.zeros(2 * SAMPLE_RATE, dtype=np.float32), 'en', 'fast', 'transcribe', 'small')
+    scheduler._transcribe_group(model, [(long_request, 1.0), (short_request, 1.0)], 'en', 'fast', 'transcribe')
+
+    long_segments, _ = long_request.future.result(timeout=1)
+    short_segments, _ = short_request.future.result(timeout=1)
+    assert [(segment.start, segment.end) for segment in long_segments] == [(0.0, 30.0), (30.0, 31.5)]
+    assert [(segment.start, segment.end) for segment in short_segments] == [(0.0, 2.0)]
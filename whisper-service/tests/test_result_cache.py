@@ -0,0 +1,29 @@
+import io
+
+import app
+
+
+def upload_context(audio_bytes):
+    return app.app.test_request_context('/transcribe', method='POST', data={
+        'audio': (io.BytesIO(audio_bytes), 'chunk.webm'),
+        'mode': 'fast',
+    })
+
+
+def test_one_miss_and_one_hit_are_counted_once_each(monkeypatch):
+    monkeypatch.setattr(app, 'result_cache', app.ResultCache())
+    audio_bytes = b'\x01' * 200
+
+    # A miss is looked up before admission and again by the view
+    with upload_context(audio_bytes):
+        assert app.cached_transcription() is None
+        cache_key = app.transcribe_cache_key(audio_bytes, app.request.form)
+        assert app.lookup_cached_result(cache_key) is None
+    app.result_cache.put(cache_key, {'text': 'kem cho', 'language': 'gu', 'segments': [], 'model': 'small'})
+
+    with upload_context(audio_bytes):
+        response = app.cached_transcription()
+    assert response.headers['X-Cache'] == 'HIT'
+
+    stats = app.result_cache.stats()
+    assert (stats['hits'], stats['misses'], stats['hit_rate']) == (1, 1, 0.5)
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from audio_processing import SAMPLE_RATE
+from streaming import ListenerLimit, ListenerLimitError, SessionManager
+
+
+def events():
+    yield "retry: 2000\n\n"
+    yield "data: {}\n\n"
+
+
+def test_listener_limit_rejects_past_max_and_frees_slot_on_close():
+    limit = ListenerLimit(max_listeners=2)
+    first = limit.open(events())
+    second = limit.open(events())
+    with pytest.raises(ListenerLimitError):
+        limit.open(events())
+
+    # A response closed before it was ever iterated still gives its slot back, once
+    first.close()
+    first.close()
+    assert next(iter(second)) == "retry: 2000\n\n"
+    third = limit.open(events())
+    assert limit.stats() == {'active': 2, 'max': 2, 'rejected': 1}
+
+    second.close()
+    third.close()
+    assert limit.stats()['active'] == 0
+
+
+def test_stop_removes_session_when_final_pass_fails():
+    def failing_transcribe(*args):
+        raise RuntimeError("inference failed")
+
+    manager = SessionManager(failing_transcribe)
+    session = manager.create(session_id='consultation')
+    session.append_audio(np.zeros(SAMPLE_RATE, dtype=np.float32))
+    with pytest.raises(RuntimeError):
+        manager.stop('consultation')
+    assert manager.stats()['active_sessions'] == 0
+
+
+def test_session_cap_does_not_follow_listener_cap():
+    manager = SessionManager(lambda *args: ([], None))
+    for index in range(2):
+        manager.create(session_id=f'consultation-{index}')
+    assert manager.stats() == {'active_sessions': 2, 'max_sessions': 64}